@@ -3,26 +3,65 @@ FastAPI ETL Pipeline Runner
 API para executar pipeline ETL de forma assíncrona
 """
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+import json
+import os
+import threading
 import uuid
 
-from run_sql import run_etl_pipeline, upload_to_ftp, run_single_database_pipeline, run_single_database_supabase_pipeline
+from run_sql import (
+    run_etl_pipeline, run_pipelined_etl_pipeline, upload_to_ftp,
+    run_single_database_pipeline, run_single_database_supabase_pipeline
+)
+from utils.sql_query import SQLQuery
 from utils.upload_supabase import SupabaseUploader
+from utils.ftp_uploader import ForecastFTPUploader
+from utils.job_store import JobStore
+from utils.job_executor import JobExecutor, ALL_DATABASES
+from utils.metrics import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida da aplicação: recupera jobs no startup e libera recursos no shutdown."""
+    # Jobs que estavam pendentes/em execução quando a API parou não serão retomados
+    job_store.fail_interrupted()
+    job_store.evict()
+    yield
+    # Parar de iniciar jobs da fila
+    job_executor.shutdown()
+    # Fechar pools de conexão com o SQL Server
+    SQLQuery.dispose_engines()
+    # Encerrar a sessão SFTP compartilhada entre os jobs
+    ForecastFTPUploader.close_shared()
 
 
 # FastAPI app instance
 app = FastAPI(
     title="ETL Pipeline API",
     description="API para executar pipeline de extração SQL e upload FTP de forma assíncrona",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
     )
 
 
-# In-memory job storage
-jobs: Dict[str, Dict[str, Any]] = {}
+# Armazenamento persistente dos jobs (SQLite) e executor com fila e limite de concorrência
+job_store = JobStore(
+    db_file=os.getenv("JOB_DB_FILE", "state/jobs.db"),
+    retention_days=int(os.getenv("JOB_RETENTION_DAYS", "7")),
+    max_jobs=int(os.getenv("JOB_MAX_HISTORY", "500"))
+)
+job_executor = JobExecutor(job_store, max_concurrent_jobs=int(os.getenv("JOB_MAX_CONCURRENT", "2")))
+# Mensagem devolvida quando a requisição é anexada a um job equivalente em andamento
+REUSED_JOB_MESSAGE = "Job equivalente já pendente/em execução; reutilizando o job existente"
+
+# Serializa a verificação de jobs equivalentes e o registro de novos jobs
+job_submit_lock = threading.Lock()
 
 
 # Pydantic models
@@ -66,6 +105,12 @@ class SupabasePipelineRequest(BaseModel):
     bucket_name: Optional[str] = Field(None, description="Nome do bucket Supabase (default: 013bw-erp-bi )")
     verbose: bool = Field(True, description="Exibir logs detalhados")
     temp_dir: str = Field("temp", description="Diretório temporário para processamento")
+    in_memory: bool = Field(False, description="Serializar e enviar cada query em memória, sem diretório temporário")
+    data_inicio: Optional[date] = Field(None, description="Data inicial das queries (:data_inicio)")
+    data_fim: Optional[date] = Field(None, description="Data final inclusiva das queries (:data_fim)")
+    days_back: Optional[int] = Field(None, description="Janela em dias até hoje (sobrepõe default_days_back; 0 = histórico completo)")
+    empresas: Optional[List[str]] = Field(None, description="Empresas a extrair (:empresas)")
+    limite: Optional[int] = Field(None, description="Máximo de linhas por query (:limite)")
 
 
 class SupabasePipelineResponse(BaseModel):
@@ -82,7 +127,9 @@ def execute_pipeline_task(
     job_id: str,
     output_dir: str,
     forecast_type: str,
-    verbose: bool
+    verbose: bool,
+    query_params: Optional[Dict[str, Any]] = None,
+    pipelined: bool = False
     ):
     """
     Executa o pipeline ETL em background e atualiza o status do job.
@@ -92,18 +139,39 @@ def execute_pipeline_task(
         output_dir: Diretório para salvar arquivos parquet
         forecast_type: Tipo de dados para FTP
         verbose: Exibir logs detalhados
+        query_params: Parâmetros das queries SQL (sobrepõem extraction.params)
+        pipelined: Enviar cada database para o FTP assim que sua extração termina
+                   (sobrepõe extração e upload); False = extrai tudo e depois envia
     """
     try:
         # Atualizar status para running
-        jobs[job_id]["status"] = "running"
+        job_store.update(job_id, status="running")
+        
+        if pipelined:
+            # Extração e upload sobrepostos, com fila limitada entre as etapas
+            results = run_pipelined_etl_pipeline(
+                output_dir=output_dir,
+                forecast_type=forecast_type,
+                verbose=verbose,
+                query_params=query_params
+            )
+            job_store.update(
+                job_id,
+                sql_results=results["sql_results"],
+                ftp_results=results["ftp_results"],
+                status="completed",
+                completed_at=datetime.now().isoformat()
+            )
+            return
         
         # FASE 1: Extração SQL
         sql_results = run_etl_pipeline(
             output_dir=output_dir,
-            verbose=verbose
+            verbose=verbose,
+            query_params=query_params
         )
         
-        jobs[job_id]["sql_results"] = sql_results
+        job_store.update(job_id, sql_results=sql_results)
         
         # FASE 2: Upload FTP (apenas se houver dados extraídos)
         ftp_results = None
@@ -112,17 +180,16 @@ def execute_pipeline_task(
                 data_dir=output_dir,
                 forecast_type=forecast_type
             )
-            jobs[job_id]["ftp_results"] = ftp_results
+            job_store.update(job_id, ftp_results=ftp_results)
         
         # Atualizar status para completed
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        job_store.update(job_id, status="completed", completed_at=datetime.now().isoformat())
         
     except Exception as e:
         # Atualizar status para failed
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=datetime.now().isoformat()
+        )
 
 
 def execute_single_database_task(
@@ -131,7 +198,8 @@ def execute_single_database_task(
     output_dir: str,
     forecast_type: str,
     verbose: bool,
-    upload_ftp: bool
+    upload_ftp: bool,
+    query_params: Optional[Dict[str, Any]] = None
     ):
     """
     Executa o pipeline ETL para um único database em background.
@@ -143,10 +211,11 @@ def execute_single_database_task(
         forecast_type: Tipo de dados para FTP
         verbose: Exibir logs detalhados
         upload_ftp: Fazer upload automático para FTP
+        query_params: Parâmetros das queries SQL (sobrepõem extraction.params)
     """
     try:
         # Atualizar status para running
-        jobs[job_id]["status"] = "running"
+        job_store.update(job_id, status="running")
         
         # Executar pipeline para database específico
         results = run_single_database_pipeline(
@@ -154,26 +223,25 @@ def execute_single_database_task(
             output_dir=output_dir,
             verbose=verbose,
             upload_ftp=upload_ftp,
-            forecast_type=forecast_type
+            forecast_type=forecast_type,
+            query_params=query_params
         )
         
-        jobs[job_id]["sql_results"] = results.get("sql_results")
-        jobs[job_id]["ftp_results"] = results.get("ftp_results")
-        
-        # Atualizar status
-        if results.get("success"):
-            jobs[job_id]["status"] = "completed"
-        else:
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = results.get("error", "Unknown error")
-        
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        # Atualizar resultados e status
+        job_store.update(
+            job_id,
+            sql_results=results.get("sql_results"),
+            ftp_results=results.get("ftp_results"),
+            status="completed" if results.get("success") else "failed",
+            error=None if results.get("success") else results.get("error", "Unknown error"),
+            completed_at=datetime.now().isoformat()
+        )
         
     except Exception as e:
         # Atualizar status para failed
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=datetime.now().isoformat()
+        )
 
 
 def execute_supabase_upload_task(
@@ -193,7 +261,7 @@ def execute_supabase_upload_task(
     """
     try:
         # Atualizar status para running
-        jobs[job_id]["status"] = "running"
+        job_store.update(job_id, status="running")
         
         # Construir caminho do diretório do database
         database_dir = f"{output_dir}/{database}"
@@ -207,23 +275,25 @@ def execute_supabase_upload_task(
             bucket_name=bucket_name
         )
         
-        # Armazenar resultados
-        jobs[job_id]["supabase_results"] = upload_results
+        # Atualizar status baseado nos resultados (com falhas ainda considera completo)
+        error = None
+        if upload_results["failed_uploads"] > 0:
+            error = f"{upload_results['failed_uploads']} arquivo(s) falharam no upload"
         
-        # Atualizar status baseado nos resultados
-        if upload_results["failed_uploads"] == 0:
-            jobs[job_id]["status"] = "completed"
-        else:
-            jobs[job_id]["status"] = "completed"  # Ainda considera completo, mas com falhas
-            jobs[job_id]["error"] = f"{upload_results['failed_uploads']} arquivo(s) falharam no upload"
-        
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        # Armazenar resultados
+        job_store.update(
+            job_id,
+            supabase_results=upload_results,
+            status="completed",
+            error=error,
+            completed_at=datetime.now().isoformat()
+        )
         
     except Exception as e:
         # Atualizar status para failed
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=datetime.now().isoformat()
+        )
 
 
 def execute_supabase_pipeline_task(
@@ -231,7 +301,9 @@ def execute_supabase_pipeline_task(
     database: str,
     bucket_name: str,
     verbose: bool,
-    temp_dir: str
+    temp_dir: str,
+    in_memory: bool = False,
+    query_params: Optional[Dict[str, Any]] = None
     ):
     """
     Executa o pipeline ETL Supabase para um database específico em background.
@@ -242,39 +314,98 @@ def execute_supabase_pipeline_task(
         bucket_name: Nome do bucket Supabase
         verbose: Exibir logs detalhados
         temp_dir: Diretório temporário para processamento
+        in_memory: Enviar cada query direto da memória (sem diretório temporário)
+        query_params: Parâmetros das queries SQL (sobrepõem extraction.params)
     """
     try:
         # Atualizar status para running
-        jobs[job_id]["status"] = "running"
+        job_store.update(job_id, status="running")
         
         # Executar pipeline Supabase
         results = run_single_database_supabase_pipeline(
             database=database,
             bucket_name=bucket_name,
             verbose=verbose,
-            temp_dir=temp_dir
+            temp_dir=temp_dir,
+            in_memory=in_memory,
+            query_params=query_params
         )
         
-        jobs[job_id]["sql_results"] = results.get("sql_results")
-        jobs[job_id]["supabase_results"] = results.get("supabase_results")
-        
-        # Atualizar status baseado nos resultados
-        if results.get("success"):
-            jobs[job_id]["status"] = "completed"
-        else:
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = results.get("error", "Unknown error")
-        
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        # Atualizar resultados e status
+        job_store.update(
+            job_id,
+            sql_results=results.get("sql_results"),
+            supabase_results=results.get("supabase_results"),
+            status="completed" if results.get("success") else "failed",
+            error=None if results.get("success") else results.get("error", "Unknown error"),
+            completed_at=datetime.now().isoformat()
+        )
         
     except Exception as e:
         # Atualizar status para failed
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=datetime.now().isoformat()
+        )
+
+
+def build_query_params(
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    days_back: Optional[int] = None,
+    empresas: Optional[List[str]] = None,
+    limite: Optional[int] = None
+    ) -> Dict[str, Any]:
+    """Parâmetros das queries SQL informados na requisição (apenas os preenchidos)."""
+    params = {
+        "data_inicio": data_inicio.isoformat() if data_inicio else None,
+        "data_fim": data_fim.isoformat() if data_fim else None,
+        "days_back": days_back,
+        "empresas": empresas or None,
+        "limite": limite
+    }
+    return {name: value for name, value in params.items() if value is not None}
+
+
+def job_dedup_key(kind: str, database: Optional[str], params: Dict[str, Any]) -> str:
+    """Chave que identifica jobs equivalentes: tipo, database, destino e parâmetros."""
+    return json.dumps({"kind": kind, "database": database, **params}, sort_keys=True, default=str)
+
+
+def submit_job(kind: str, database: Optional[str], params: Dict[str, Any],
+               job: Dict[str, Any], task, task_kwargs: Dict[str, Any]) -> tuple:
+    """
+    Registra e enfileira um job, ou reaproveita um job equivalente já pendente/em execução.
+    
+    Args:
+        kind: Tipo do job (ex.: 'pipeline', 'supabase_pipeline')
+        database: Database do job (None = todos)
+        params: Parâmetros que definem o resultado (destino, tipo, flags)
+        job: Dados iniciais do job
+        task: Função executada em background
+        task_kwargs: Argumentos da função (job_id é adicionado automaticamente)
+        
+    Returns:
+        Tupla (job_id, dados do job, reaproveitado)
+    """
+    dedup_key = job_dedup_key(kind, database, params)
+    
+    with job_submit_lock:
+        for job_id, active_job in job_store.list(statuses=["pending", "running"]).items():
+            if active_job.get("dedup_key") == dedup_key:
+                return job_id, active_job, True
+        
+        job_id = str(uuid.uuid4())
+        job = {"kind": kind, "dedup_key": dedup_key, **job}
+        job_store.create(job_id, job)
+    
+    # Enfileirar no executor (limite de concorrência e exclusão por database)
+    job_executor.submit(job_id, database or ALL_DATABASES, task, job_id=job_id, **task_kwargs)
+    return job_id, job, False
 
 
 # Endpoints
+# Os que acessam o JobStore (SQLite, bloqueante) são síncronos: o FastAPI os executa no
+# threadpool, sem travar o event loop
 @app.get("/", tags=["Root"])
 async def root():
     """Endpoint raiz com informações básicas da API."""
@@ -297,12 +428,30 @@ async def health_check():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+def prometheus_metrics():
+    """
+    Métricas de execução no formato texto do Prometheus (tempos por fase das queries,
+    linhas/s, bytes/s e tempos de upload por arquivo).
+    """
+    for status in ("pending", "running", "completed", "failed"):
+        metrics.set("etl_jobs", len(job_store.list(statuses=[status])), status=status)
+    metrics.set("etl_jobs_queued", len(job_executor.queued_job_ids()))
+    
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/run-pipeline", response_model=JobStatus, tags=["Pipeline"])
-async def run_pipeline(
-    background_tasks: BackgroundTasks,
+def run_pipeline(
     output_dir: str = "data",
     forecast_type: str = "data",
-    verbose: bool = True
+    verbose: bool = True,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    days_back: Optional[int] = None,
+    empresas: Optional[List[str]] = Query(None),
+    limite: Optional[int] = None,
+    pipelined: bool = False
     ):
     """
     Inicia a execução do pipeline ETL em background.
@@ -311,45 +460,56 @@ async def run_pipeline(
         output_dir: Diretório base para salvar arquivos parquet (default: "data")
         forecast_type: Tipo de dados para FTP (default: "data")
         verbose: Exibir logs detalhados (default: True)
+        data_inicio: Data inicial das queries (default: hoje - extraction.default_days_back)
+        data_fim: Data final inclusiva das queries (default: sem limite)
+        days_back: Janela em dias até hoje (0 = histórico completo)
+        empresas: Empresas a extrair (repetir o parâmetro para várias; default: todas)
+        limite: Máximo de linhas por query (default: sem limite)
+        pipelined: Enviar cada database ao FTP assim que sua extração termina (default: False)
         
     Returns:
         JobStatus com job_id e status inicial
     """
-    # Gerar job ID único
-    job_id = str(uuid.uuid4())
-    
-    # Criar entrada no storage de jobs
-    jobs[job_id] = {
-        "status": "pending",
-        "started_at": datetime.now().isoformat(),
-        "output_dir": output_dir,
-        "forecast_type": forecast_type,
-        "verbose": verbose,
-        "sql_results": None,
-        "ftp_results": None,
-        "error": None,
-        "completed_at": None
-    }
+    query_params = build_query_params(data_inicio, data_fim, days_back, empresas, limite)
     
-    # Adicionar tarefa em background
-    background_tasks.add_task(
-        execute_pipeline_task,
-        job_id=job_id,
-        output_dir=output_dir,
-        forecast_type=forecast_type,
-        verbose=verbose
+    # Criar o job (ou reaproveitar um equivalente já pendente/em execução)
+    job_id, job, reused = submit_job(
+        kind="pipeline",
+        database=None,
+        params={"output_dir": output_dir, "forecast_type": forecast_type, "query_params": query_params},
+        job={
+            "status": "pending",
+            "started_at": datetime.now().isoformat(),
+            "output_dir": output_dir,
+            "forecast_type": forecast_type,
+            "verbose": verbose,
+            "query_params": query_params,
+            "pipelined": pipelined,
+            "sql_results": None,
+            "ftp_results": None,
+            "error": None,
+            "completed_at": None
+        },
+        task=execute_pipeline_task,
+        task_kwargs=dict(
+            output_dir=output_dir,
+            forecast_type=forecast_type,
+            verbose=verbose,
+            query_params=query_params,
+            pipelined=pipelined
+        )
     )
     
     return {
         "job_id": job_id,
-        "status": "pending",
-        "message": "Pipeline ETL iniciado em background",
-        "started_at": jobs[job_id]["started_at"]
+        "status": job["status"],
+        "message": REUSED_JOB_MESSAGE if reused else "Pipeline ETL iniciado em background",
+        "started_at": job["started_at"]
     }
 
 
 @app.get("/jobs/{job_id}", response_model=JobDetail, tags=["Jobs"])
-async def get_job_status(job_id: str):
+def get_job_status(job_id: str):
     """
     Obtém o status e resultados de um job específico.
     
@@ -362,11 +522,10 @@ async def get_job_status(job_id: str):
     Raises:
         HTTPException 404: Job não encontrado
     """
-    if job_id not in jobs:
+    job_data = job_store.get(job_id)
+    if job_data is None:
         raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado")
     
-    job_data = jobs[job_id]
-    
     return {
         "job_id": job_id,
         "status": job_data["status"],
@@ -380,7 +539,7 @@ async def get_job_status(job_id: str):
 
 
 @app.get("/jobs", tags=["Jobs"])
-async def list_jobs():
+def list_jobs():
     """
     Lista todos os jobs e seus status.
     
@@ -388,7 +547,7 @@ async def list_jobs():
         Lista de jobs com informações resumidas
     """
     jobs_list = []
-    for job_id, job_data in jobs.items():
+    for job_id, job_data in job_store.list().items():
         jobs_list.append({
             "job_id": job_id,
             "status": job_data["status"],
@@ -410,13 +569,17 @@ async def list_jobs():
 
 
 @app.post("/run-pipeline/{database}", response_model=JobStatus, tags=["Pipeline"])
-async def run_single_database(
+def run_single_database(
     database: str,
-    background_tasks: BackgroundTasks,
     output_dir: str = "data",
     forecast_type: str = "data",
     verbose: bool = True,
-    upload_ftp: bool = False
+    upload_ftp: bool = False,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    days_back: Optional[int] = None,
+    empresas: Optional[List[str]] = Query(None),
+    limite: Optional[int] = None
     ):
     """
     Inicia a execução do pipeline ETL para um database específico em background.
@@ -427,52 +590,64 @@ async def run_single_database(
         forecast_type: Tipo de dados para FTP (default: "data")
         verbose: Exibir logs detalhados (default: True)
         upload_ftp: Fazer upload automático para FTP após extração (default: False)
+        data_inicio: Data inicial das queries (default: hoje - extraction.default_days_back)
+        data_fim: Data final inclusiva das queries (default: sem limite)
+        days_back: Janela em dias até hoje (0 = histórico completo)
+        empresas: Empresas a extrair (repetir o parâmetro para várias; default: todas)
+        limite: Máximo de linhas por query (default: sem limite)
         
     Returns:
         JobStatus com job_id e status inicial
     """
-    # Gerar job ID único
-    job_id = str(uuid.uuid4())
+    query_params = build_query_params(data_inicio, data_fim, days_back, empresas, limite)
     
-    # Criar entrada no storage de jobs
-    jobs[job_id] = {
-        "status": "pending",
-        "started_at": datetime.now().isoformat(),
-        "database": database,
-        "output_dir": output_dir,
-        "forecast_type": forecast_type,
-        "verbose": verbose,
-        "upload_ftp": upload_ftp,
-        "sql_results": None,
-        "ftp_results": None,
-        "error": None,
-        "completed_at": None
-    }
-    
-    # Adicionar tarefa em background
-    background_tasks.add_task(
-        execute_single_database_task,
-        job_id=job_id,
+    # Criar o job (ou reaproveitar um equivalente já pendente/em execução)
+    job_id, job, reused = submit_job(
+        kind="single_database",
         database=database,
-        output_dir=output_dir,
-        forecast_type=forecast_type,
-        verbose=verbose,
-        upload_ftp=upload_ftp
+        params={
+            "output_dir": output_dir,
+            "forecast_type": forecast_type,
+            "upload_ftp": upload_ftp,
+            "query_params": query_params
+        },
+        job={
+            "status": "pending",
+            "started_at": datetime.now().isoformat(),
+            "database": database,
+            "output_dir": output_dir,
+            "forecast_type": forecast_type,
+            "verbose": verbose,
+            "upload_ftp": upload_ftp,
+            "query_params": query_params,
+            "sql_results": None,
+            "ftp_results": None,
+            "error": None,
+            "completed_at": None
+        },
+        task=execute_single_database_task,
+        task_kwargs=dict(
+            database=database,
+            output_dir=output_dir,
+            forecast_type=forecast_type,
+            verbose=verbose,
+            upload_ftp=upload_ftp,
+            query_params=query_params
+        )
     )
     
     return {
         "job_id": job_id,
-        "status": "pending",
-        "message": f"Pipeline ETL para database '{database}' iniciado em background",
-        "started_at": jobs[job_id]["started_at"]
+        "status": job["status"],
+        "message": REUSED_JOB_MESSAGE if reused else f"Pipeline ETL para database '{database}' iniciado em background",
+        "started_at": job["started_at"]
     }
 
 
 @app.post("/upload-supabase/{database}", response_model=SupabaseUploadResponse, tags=["Supabase"])
-async def upload_to_supabase(
+def upload_to_supabase(
     database: str,
-    request: SupabaseUploadRequest,
-    background_tasks: BackgroundTasks
+    request: SupabaseUploadRequest
     ):
     """
     Inicia o upload de arquivos Parquet de um database para Supabase em background.
@@ -480,7 +655,6 @@ async def upload_to_supabase(
     Args:
         database: Nome do database (diretório contendo os arquivos parquet)
         request: Parâmetros de configuração do upload
-        background_tasks: Tarefas em background do FastAPI
         
     Returns:
         SupabaseUploadResponse com informações do job iniciado
@@ -488,45 +662,43 @@ async def upload_to_supabase(
     # Determinar nome do bucket (usa database se não especificado)
     bucket_name = request.bucket_name or database.lower().replace("_", "-")
     
-    # Gerar job ID único
-    job_id = str(uuid.uuid4())
-    
-    # Criar entrada no storage de jobs
-    jobs[job_id] = {
-        "status": "pending",
-        "started_at": datetime.now().isoformat(),
-        "database": database,
-        "bucket_name": bucket_name,
-        "output_dir": request.output_dir,
-        "supabase_results": None,
-        "error": None,
-        "completed_at": None
-    }
-    
-    # Adicionar tarefa em background
-    background_tasks.add_task(
-        execute_supabase_upload_task,
-        job_id=job_id,
+    # Criar o job (ou reaproveitar um equivalente já pendente/em execução)
+    job_id, job, reused = submit_job(
+        kind="supabase_upload",
         database=database,
-        bucket_name=bucket_name,
-        output_dir=request.output_dir
+        params={"bucket_name": bucket_name, "output_dir": request.output_dir},
+        job={
+            "status": "pending",
+            "started_at": datetime.now().isoformat(),
+            "database": database,
+            "bucket_name": bucket_name,
+            "output_dir": request.output_dir,
+            "supabase_results": None,
+            "error": None,
+            "completed_at": None
+        },
+        task=execute_supabase_upload_task,
+        task_kwargs=dict(
+            database=database,
+            bucket_name=bucket_name,
+            output_dir=request.output_dir
+        )
     )
     
     return {
         "job_id": job_id,
-        "status": "pending",
-        "message": f"Upload para Supabase do database '{database}' iniciado em background",
-        "started_at": jobs[job_id]["started_at"],
+        "status": job["status"],
+        "message": REUSED_JOB_MESSAGE if reused else f"Upload para Supabase do database '{database}' iniciado em background",
+        "started_at": job["started_at"],
         "database": database,
         "bucket_name": bucket_name
     }
 
 
 @app.post("/run-supabase-pipeline/{database}", response_model=SupabasePipelineResponse, tags=["Supabase"])
-async def run_supabase_pipeline(
+def run_supabase_pipeline(
     database: str,
-    request: SupabasePipelineRequest,
-    background_tasks: BackgroundTasks
+    request: SupabasePipelineRequest
 ):
     """
     Inicia a execução do pipeline ETL Supabase para um database específico em background.
@@ -534,46 +706,56 @@ async def run_supabase_pipeline(
     Args:
         database: Nome do database para executar as queries
         request: Parâmetros de configuração do pipeline
-        background_tasks: Tarefas em background do FastAPI
         
     Returns:
         SupabasePipelineResponse com informações do job iniciado
     """
     # Determinar nome do bucket (usa database se não especificado)
     bucket_name = request.bucket_name or database.lower().replace("_", "-")
+    query_params = build_query_params(
+        request.data_inicio, request.data_fim, request.days_back, request.empresas, request.limite
+    )
     
-    # Gerar job ID único
-    job_id = str(uuid.uuid4())
-    
-    # Criar entrada no storage de jobs
-    jobs[job_id] = {
-        "status": "pending",
-        "started_at": datetime.now().isoformat(),
-        "database": database,
-        "bucket_name": bucket_name,
-        "verbose": request.verbose,
-        "temp_dir": request.temp_dir,
-        "sql_results": None,
-        "supabase_results": None,
-        "error": None,
-        "completed_at": None
-    }
-    
-    # Adicionar tarefa em background
-    background_tasks.add_task(
-        execute_supabase_pipeline_task,
-        job_id=job_id,
+    # Criar o job (ou reaproveitar um equivalente já pendente/em execução)
+    job_id, job, reused = submit_job(
+        kind="supabase_pipeline",
         database=database,
-        bucket_name=bucket_name,
-        verbose=request.verbose,
-        temp_dir=request.temp_dir
+        params={
+            "bucket_name": bucket_name,
+            "temp_dir": request.temp_dir,
+            "in_memory": request.in_memory,
+            "query_params": query_params
+        },
+        job={
+            "status": "pending",
+            "started_at": datetime.now().isoformat(),
+            "database": database,
+            "bucket_name": bucket_name,
+            "verbose": request.verbose,
+            "temp_dir": request.temp_dir,
+            "in_memory": request.in_memory,
+            "query_params": query_params,
+            "sql_results": None,
+            "supabase_results": None,
+            "error": None,
+            "completed_at": None
+        },
+        task=execute_supabase_pipeline_task,
+        task_kwargs=dict(
+            database=database,
+            bucket_name=bucket_name,
+            verbose=request.verbose,
+            temp_dir=request.temp_dir,
+            in_memory=request.in_memory,
+            query_params=query_params
+        )
     )
     
     return {
         "job_id": job_id,
-        "status": "pending",
-        "message": f"Pipeline ETL Supabase para database '{database}' iniciado em background",
-        "started_at": jobs[job_id]["started_at"],
+        "status": job["status"],
+        "message": REUSED_JOB_MESSAGE if reused else f"Pipeline ETL Supabase para database '{database}' iniciado em background",
+        "started_at": job["started_at"],
         "database": database,
         "bucket_name": bucket_name
     }
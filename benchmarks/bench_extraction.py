@@ -0,0 +1,298 @@
+"""
+Benchmark da Extração SQL → Parquet
+Mede linhas/s, pico de memória (RSS) e bytes gravados por tipo de query, usando um
+banco SQLite local populado a partir dos parquets de data/*/ em tamanhos escalados.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_extraction.py                      # roda e compara com a baseline
+    python benchmarks/bench_extraction.py --save-baseline      # roda e grava a baseline
+    python benchmarks/bench_extraction.py --queries vendas estoque --scales 1 4 --modes arrow stream
+
+Cada medição roda em um subprocesso próprio, para que o pico de RSS seja o da
+extração medida (e não o acumulado das anteriores).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from glob import glob
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.sql_query import SQLQuery  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows: pico de RSS indisponível
+    resource = None
+
+
+BENCH_DATABASE = "BENCH"
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline_extraction.json"
+
+# execute_query = SQLQuery._execute_query + DataFrame.to_parquet
+# pandas/stream/arrow = execute_queries_for_database com o fetch_mode correspondente
+MODES = ["execute_query", "pandas", "stream", "arrow"]
+
+
+class BenchSQLQuery(SQLQuery):
+    """SQLQuery apontando para o banco SQLite do benchmark, com uma única query por execução."""
+
+    def __init__(self, sqlite_file: str, query_name: str, fetch_mode: str, chunk_size: int,
+                 state_dir: str):
+        self.sqlite_file = sqlite_file
+        self.query_name = query_name
+        super().__init__(config_file=str(ROOT / "config" / "databases.yaml"))
+
+        # Sem incremental/partições/overrides: mede a extração completa no modo escolhido.
+        # Estado (watermarks, durações) no diretório temporário da medição: o database
+        # BENCH não entra no histórico usado para agendar as queries em produção
+        self.config["databases"] = [BENCH_DATABASE]
+        self.config["execution"] = {"parallel": False}
+        self.config["queries"] = {}
+        self.config["extraction"] = {
+            **(self.config.get("extraction") or {}),
+            "fetch_mode": fetch_mode,
+            "chunk_size": chunk_size,
+            "state_dir": state_dir,
+        }
+
+    def _get_engine(self, database=None):
+        cls = type(self)
+        with cls._engine_registry_lock:
+            engine = cls._engine_registry.get(self.sqlite_file)
+            if engine is None:
+                engine = create_engine(f"sqlite:///{self.sqlite_file}")
+                cls._engine_registry[self.sqlite_file] = engine
+            return engine
+
+    def _load_sql_files(self, sql_dir: str = "sql"):
+        return {self.query_name: f'SELECT * FROM "{self.query_name}"'}
+
+
+def find_samples(data_dir: Path) -> dict:
+    """Maior parquet disponível de cada tipo de query ({query: caminho})."""
+    samples = {}
+    for file_path in glob(str(data_dir / "*" / "*.parquet")):
+        query_name = Path(file_path).stem
+        rows = pq.ParquetFile(file_path).metadata.num_rows
+        if query_name not in samples or rows > samples[query_name][1]:
+            samples[query_name] = (file_path, rows)
+    return {query_name: path for query_name, (path, _) in sorted(samples.items())}
+
+
+def seed_database(sqlite_file: str, samples: dict, scale: int) -> dict:
+    """
+    Cria as tabelas do benchmark repetindo cada amostra `scale` vezes.
+
+    Returns:
+        Dicionário {query: linhas na tabela}
+    """
+    engine = create_engine(f"sqlite:///{sqlite_file}")
+    row_counts = {}
+    try:
+        for query_name, file_path in samples.items():
+            df = pd.read_parquet(file_path)
+            if scale > 1:
+                df = pd.concat([df] * scale, ignore_index=True)
+            df.to_sql(query_name, engine, index=False, if_exists="replace", chunksize=50000)
+            row_counts[query_name] = len(df)
+    finally:
+        engine.dispose()
+    return row_counts
+
+
+def peak_rss_mb():
+    """Pico de RSS do processo atual em MB (None se indisponível)."""
+    # No Linux, ru_maxrss é herdado do processo pai no fork/exec; VmHWM é do processo atual
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_worker(spec: dict) -> dict:
+    """Executa uma medição (chamado no subprocesso)."""
+    output_dir = Path(spec["output_dir"])
+    query_name = spec["query"]
+    extractor = BenchSQLQuery(
+        spec["sqlite_file"],
+        query_name,
+        fetch_mode="pandas" if spec["mode"] == "execute_query" else spec["mode"],
+        chunk_size=spec["chunk_size"],
+        state_dir=str(output_dir / "state")
+    )
+
+    start = time.perf_counter()
+    if spec["mode"] == "execute_query":
+        df = extractor._execute_query(BENCH_DATABASE, f'SELECT * FROM "{query_name}"')
+        output_file = output_dir / f"{query_name}.parquet"
+        df.to_parquet(output_file, index=False, engine="pyarrow")
+        elapsed = time.perf_counter() - start
+        rows, timings = len(df), {}
+        output_bytes = output_file.stat().st_size
+    else:
+        stats = extractor.execute_queries_for_database(BENCH_DATABASE, output_dir=str(output_dir))
+        elapsed = time.perf_counter() - start
+        detail = stats["details"][0]
+        if detail["status"] != "success":
+            raise RuntimeError(detail.get("error", "query falhou"))
+        rows, timings = detail["rows"], detail.get("timings", {})
+        output_bytes = detail["bytes"]
+
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes": output_bytes,
+        "timings": timings
+    }
+
+
+def measure(spec: dict, verbose: bool = False) -> dict:
+    """Executa uma medição em um subprocesso e devolve o resultado."""
+    with tempfile.TemporaryDirectory() as output_dir:
+        result_file = Path(output_dir) / "result.json"
+        spec = {**spec, "output_dir": output_dir, "result_file": str(result_file)}
+        completed = subprocess.run(
+            [sys.executable, __file__, "--worker", json.dumps(spec)],
+            cwd=str(ROOT),
+            stdout=None if verbose else subprocess.DEVNULL,
+            stderr=None if verbose else subprocess.PIPE,
+            text=True
+        )
+        if completed.returncode != 0 or not result_file.exists():
+            error_lines = (completed.stderr or "").strip().splitlines()
+            raise RuntimeError(error_lines[-1] if error_lines else "falha no subprocesso")
+        return json.loads(result_file.read_text())
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compara os resultados com a baseline.
+
+    Returns:
+        Lista de regressões (linhas/s abaixo ou pico de RSS acima da tolerância)
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        if result["rows_per_sec"] < reference["rows_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: linhas/s {result['rows_per_sec']:,.0f} < baseline {reference['rows_per_sec']:,.0f}"
+            )
+        if result["peak_rss_mb"] and reference.get("peak_rss_mb") \
+                and result["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: pico RSS {result['peak_rss_mb']} MB > baseline {reference['peak_rss_mb']} MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração SQL → Parquet")
+    parser.add_argument("--data-dir", default=str(ROOT / "data"), help="Pasta com os parquets de amostra")
+    parser.add_argument("--queries", nargs="*", help="Tipos de query (default: todos encontrados)")
+    parser.add_argument("--scales", nargs="*", type=int, default=[1, 4],
+                        help="Multiplicadores do tamanho das amostras")
+    parser.add_argument("--modes", nargs="*", choices=MODES, default=MODES, help="Caminhos medidos")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Linhas por lote (stream/arrow)")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetições (vale a melhor)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Arquivo da baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Tolerância para regressões (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="Exibir os logs da extração")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        spec = json.loads(args.worker)
+        result = run_worker(spec)
+        Path(spec["result_file"]).write_text(json.dumps(result))
+        return 0
+
+    samples = find_samples(Path(args.data_dir))
+    if args.queries:
+        samples = {name: path for name, path in samples.items() if name in args.queries}
+    if not samples:
+        print(f"❌ Nenhum parquet de amostra encontrado em {args.data_dir}")
+        return 1
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in args.scales:
+            sqlite_file = os.path.join(work_dir, f"bench_x{scale}.db")
+            print(f"🗄️  Populando SQLite (escala x{scale})...")
+            row_counts = seed_database(sqlite_file, samples, scale)
+
+            for query_name in samples:
+                for mode in args.modes:
+                    key = f"{query_name}/{mode}/x{scale}"
+                    spec = {
+                        "sqlite_file": sqlite_file,
+                        "query": query_name,
+                        "mode": mode,
+                        "chunk_size": args.chunk_size
+                    }
+                    try:
+                        runs = [measure(spec, args.verbose) for _ in range(max(1, args.repeat))]
+                    except RuntimeError as e:
+                        print(f"  ❌ {key}: {e}")
+                        continue
+
+                    best = max(runs, key=lambda run: run["rows_per_sec"])
+                    best["peak_rss_mb"] = min(
+                        (run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None), default=None
+                    )
+                    results[key] = best
+                    rss = f"{best['peak_rss_mb']:.1f} MB" if best["peak_rss_mb"] is not None else "n/d"
+                    print(f"  📈 {key:<32} {row_counts[query_name]:>9,} linhas | "
+                          f"{best['rows_per_sec']:>11,.0f} linhas/s | pico RSS {rss:>9} | "
+                          f"{best['output_bytes'] / 1024:>9,.1f} KB")
+
+    baseline_file = Path(args.baseline)
+    if args.save_baseline:
+        baseline_file.parent.mkdir(parents=True, exist_ok=True)
+        baseline_file.write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Baseline gravada em {baseline_file}")
+        return 0
+
+    if not baseline_file.exists():
+        print(f"\n⚠️  Sem baseline em {baseline_file} (use --save-baseline para gravar)")
+        return 0
+
+    regressions = compare_with_baseline(results, json.loads(baseline_file.read_text()), args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressão(ões) em relação à baseline:")
+        for regression in regressions:
+            print(f"   • {regression}")
+        return 1
+
+    print(f"\n✅ Sem regressões em relação à baseline (tolerância {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
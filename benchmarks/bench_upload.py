@@ -0,0 +1,358 @@
+"""
+Benchmark dos Uploads SFTP e Supabase
+Mede arquivos/s e MB/s de ForecastFTPUploader.upload_data e
+SupabaseUploader.upload_directory_parquet com os parquets de data/ (distribuição real
+de tamanhos), contra servidores locais: um SFTP paramiko no próprio processo e um stub
+HTTP da API de storage do Supabase, ambos com latência/banda configuráveis.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_upload.py
+    python benchmarks/bench_upload.py --latency-ms 20 --bandwidth-mbps 100 --sftp-channels 1 2 4 8
+    python benchmarks/bench_upload.py --source-dir data/005ATS_ERP_BI --targets supabase --supabase-workers 1 4
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from glob import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import paramiko
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.ftp_uploader import ForecastFTPUploader  # noqa: E402
+from utils.upload_supabase import SupabaseUploader  # noqa: E402
+
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench"
+BENCH_BUCKET = "bench"
+
+
+class Throttle:
+    """Latência por requisição e banda máxima (por conexão) simuladas."""
+
+    def __init__(self, latency_ms: float = 0.0, bandwidth_mbps: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.bytes_per_sec = bandwidth_mbps * 1024 * 1024 / 8 if bandwidth_mbps else 0.0
+
+    def request(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def transfer(self, size: int):
+        if self.bytes_per_sec:
+            time.sleep(size / self.bytes_per_sec)
+
+
+# ---------------------------------------------------------------------------
+# Servidor SFTP local (paramiko)
+# ---------------------------------------------------------------------------
+
+class _StubServer(paramiko.ServerInterface):
+    """Aceita qualquer usuário/senha e canais de sessão (subsystem sftp)."""
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class _StubSFTPHandle(paramiko.SFTPHandle):
+    def __init__(self, throttle: Throttle, flags=0):
+        super().__init__(flags)
+        self.throttle = throttle
+
+    def write(self, offset, data):
+        self.throttle.transfer(len(data))
+        return super().write(offset, data)
+
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.writefile.fileno()))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+
+class _StubSFTPServer(paramiko.SFTPServerInterface):
+    """Sistema de arquivos SFTP sobre um diretório local, com latência por requisição."""
+
+    def __init__(self, server, root: str, throttle: Throttle, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = root
+        self.throttle = throttle
+
+    def _local_path(self, path):
+        return self.root + self.canonicalize(path)
+
+    def stat(self, path):
+        self.throttle.request()
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local_path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def mkdir(self, path, attr):
+        self.throttle.request()
+        try:
+            os.mkdir(self._local_path(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def open(self, path, flags, attr):
+        self.throttle.request()
+        try:
+            fd = os.open(self._local_path(path), flags | getattr(os, "O_BINARY", 0), 0o644)
+            handle = _StubSFTPHandle(self.throttle, flags)
+            handle.writefile = handle.readfile = os.fdopen(fd, "r+b" if flags & os.O_RDWR else "wb")
+            handle.filename = self._local_path(path)
+            return handle
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def remove(self, path):
+        try:
+            os.remove(self._local_path(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+
+class LocalSFTPServer:
+    """Servidor SFTP em 127.0.0.1 (porta livre), gravando em um diretório temporário."""
+
+    def __init__(self, root: str, throttle: Throttle):
+        self.root = root
+        self.throttle = throttle
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(16)
+        self.port = self._socket.getsockname()[1]
+        self._transports = []
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler(
+                "sftp", paramiko.SFTPServer, _StubSFTPServer, self.root, self.throttle
+            )
+            transport.start_server(server=_StubServer())
+            self._transports.append(transport)
+
+    def close(self):
+        self._socket.close()
+        for transport in self._transports:
+            transport.close()
+
+
+# ---------------------------------------------------------------------------
+# Stub HTTP do storage do Supabase
+# ---------------------------------------------------------------------------
+
+class LocalStorageServer:
+    """
+    Stub de POST /storage/v1/object/{bucket}/{path} (upload do storage3):
+    lê o corpo, aplica latência/banda e responde como o Supabase.
+    """
+
+    def __init__(self, throttle: Throttle):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                throttle.request()
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                throttle.transfer(len(body))
+
+                key = self.path.split("/storage/v1/object/", 1)[-1]
+                payload = json.dumps({"Key": key, "Id": key}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_PUT = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# Medições
+# ---------------------------------------------------------------------------
+
+@contextlib.contextmanager
+def quiet(enabled: bool):
+    """Suprime os logs dos uploaders durante a medição."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_sftp(source_dir: Path, files: list, throttle: Throttle, channels: int,
+               work_dir: str, verbose: bool) -> dict:
+    """Upload de todos os arquivos por ForecastFTPUploader.upload_data com N canais."""
+    remote_root = tempfile.mkdtemp(dir=work_dir)
+    server = LocalSFTPServer(remote_root, throttle)
+    uploader = ForecastFTPUploader(
+        host="127.0.0.1", port=server.port, username=BENCH_USER, password=BENCH_PASSWORD,
+        manifest_file=os.path.join(work_dir, f"manifest_sftp_{channels}.json"),
+        max_channels=channels, keepalive_interval=0
+    )
+    try:
+        with quiet(not verbose):
+            if not uploader._connect():
+                raise RuntimeError("Falha ao conectar no SFTP local")
+            start = time.perf_counter()
+            result = uploader.upload_data(
+                database_name="BENCH", forecast_type="data",
+                file_paths=[str(f) for f in files], local_base_dir=str(source_dir)
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        with quiet(not verbose):
+            uploader.disconnect()
+        server.close()
+
+    return {"elapsed": elapsed, "uploaded": len(result["uploaded_files"]),
+            "failed": len(result["failed_files"])}
+
+
+def bench_supabase(source_dir: Path, throttle: Throttle, workers: int,
+                   work_dir: str, verbose: bool) -> dict:
+    """Upload do diretório por SupabaseUploader.upload_directory_parquet com N workers."""
+    server = LocalStorageServer(throttle)
+    uploader = SupabaseUploader(
+        url=server.url, key="bench-key",
+        manifest_file=os.path.join(work_dir, f"manifest_supabase_{workers}.json")
+    )
+    try:
+        with quiet(not verbose):
+            start = time.perf_counter()
+            result = uploader.upload_directory_parquet(
+                str(source_dir), BENCH_BUCKET, skip_unchanged=False, max_workers=workers
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        server.close()
+
+    return {"elapsed": elapsed, "uploaded": result["successful_uploads"],
+            "failed": result["failed_uploads"]}
+
+
+def report(label: str, run: dict, total_bytes: int):
+    files_per_sec = run["uploaded"] / run["elapsed"] if run["elapsed"] > 0 else 0.0
+    mb_per_sec = total_bytes / (1024 * 1024) / run["elapsed"] if run["elapsed"] > 0 else 0.0
+    failed = f" | ❌ {run['failed']} falhas" if run["failed"] else ""
+    print(f"  📈 {label:<22} {run['elapsed']:>7.2f}s | {files_per_sec:>7.1f} arquivos/s | "
+          f"{mb_per_sec:>7.2f} MB/s{failed}")
+    return {"seconds": round(run["elapsed"], 4), "files_per_sec": round(files_per_sec, 2),
+            "mb_per_sec": round(mb_per_sec, 2), "failed": run["failed"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos uploads SFTP e Supabase")
+    parser.add_argument("--source-dir", default=str(ROOT / "data"),
+                        help="Pasta com os parquets enviados (default: data/)")
+    parser.add_argument("--targets", nargs="*", choices=["sftp", "supabase"], default=["sftp", "supabase"])
+    parser.add_argument("--sftp-channels", nargs="*", type=int, default=[1, 4],
+                        help="Canais SFTP simultâneos a comparar (1 = sequencial)")
+    parser.add_argument("--supabase-workers", nargs="*", type=int, default=[1, 4],
+                        help="Workers de upload Supabase a comparar (1 = sequencial)")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latência por requisição (ms)")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0,
+                        help="Banda por conexão em Mbit/s (0 = sem limite)")
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    parser.add_argument("--verbose", action="store_true", help="Exibir os logs dos uploaders")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Conexões encerradas pelo cliente geram logs de erro no transporte do servidor
+        logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+
+    source_dir = Path(args.source_dir)
+    files = sorted(Path(f) for f in glob(str(source_dir / "**" / "*.parquet"), recursive=True))
+    if not files:
+        print(f"❌ Nenhum arquivo .parquet encontrado em {source_dir}")
+        return 1
+
+    sizes = [f.stat().st_size for f in files]
+    total_bytes = sum(sizes)
+    throttle = Throttle(args.latency_ms, args.bandwidth_mbps)
+    print(f"📁 {len(files)} arquivos | {total_bytes / (1024 * 1024):.1f} MB | tamanho "
+          f"mín {min(sizes) / 1024:.1f} KB, mediana {statistics.median(sizes) / 1024:.1f} KB, "
+          f"máx {max(sizes) / 1024:.1f} KB")
+    bandwidth = f"{args.bandwidth_mbps:g} Mbit/s" if args.bandwidth_mbps else "sem limite"
+    print(f"⏱️  Latência {args.latency_ms:g} ms por requisição | banda {bandwidth}\n")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        if "sftp" in args.targets:
+            print("📤 SFTP (ForecastFTPUploader.upload_data)")
+            for channels in args.sftp_channels:
+                run = bench_sftp(source_dir, files, throttle, channels, work_dir, args.verbose)
+                results[f"sftp/channels={channels}"] = report(f"{channels} canal(is)", run, total_bytes)
+            print()
+
+        if "supabase" in args.targets:
+            print("📤 Supabase (SupabaseUploader.upload_directory_parquet)")
+            for workers in args.supabase_workers:
+                run = bench_supabase(source_dir, throttle, workers, work_dir, args.verbose)
+                results[f"supabase/workers={workers}"] = report(f"{workers} worker(s)", run, total_bytes)
+            print()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "files": len(files),
+            "total_bytes": total_bytes,
+            "latency_ms": args.latency_ms,
+            "bandwidth_mbps": args.bandwidth_mbps,
+            "results": results
+        }, indent=2))
+        print(f"💾 Resultados gravados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
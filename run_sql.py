@@ -11,15 +11,21 @@ from typing import Dict, Any, List, Optional
 import time
 import tempfile
 import shutil
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
-def run_etl_pipeline(output_dir: str = "data", verbose: bool = True) -> Dict[str, Any]:
+def run_etl_pipeline(output_dir: str = "data", verbose: bool = True,
+                     query_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Executa pipeline de extração de dados SQL.
     
     Args:
         output_dir: Diretório base para salvar os arquivos parquet
         verbose: Exibir logs detalhados
+        query_params: Parâmetros das queries (data_inicio, days_back, empresas, limite)
+                      sobrepondo extraction.params
         
     Returns:
         Dicionário com estatísticas de execução
@@ -32,6 +38,7 @@ def run_etl_pipeline(output_dir: str = "data", verbose: bool = True) -> Dict[str
         # Instanciar SQLQuery
         extractor = SQLQuery()
         extractor.verbose = verbose
+        extractor.param_overrides = query_params or {}
         
         # Executar todas as queries
         results = extractor.execute_all_queries(output_base_dir=output_dir)
@@ -49,13 +56,218 @@ def run_etl_pipeline(output_dir: str = "data", verbose: bool = True) -> Dict[str
         }
 
 
-def upload_to_ftp(data_dir: str = "data", forecast_type: str = "data") -> Dict[str, Any]:
+def run_pipelined_etl_pipeline(
+    output_dir: str = "data",
+    forecast_type: str = "data",
+    verbose: bool = True,
+    skip_unchanged: bool = True,
+    query_params: Optional[Dict[str, Any]] = None,
+    max_pending_databases: int = 2
+    ) -> Dict[str, Any]:
+    """
+    Pipeline com extração e upload sobrepostos: cada database entra na fila de upload
+    FTP/SFTP assim que todas as suas queries terminam, enquanto os seguintes são extraídos.
+    
+    A fila entre as etapas é limitada: com max_pending_databases databases aguardando
+    envio, a extração espera o upload liberar espaço. O tempo total tende a
+    max(extração, upload) em vez da soma das duas fases. Databases sem nenhuma query
+    concluída nesta execução não são enviados (a pasta só teria arquivos antigos).
+    
+    Args:
+        output_dir: Diretório base para salvar os arquivos parquet
+        forecast_type: Tipo de dados para FTP
+        verbose: Exibir logs detalhados
+        skip_unchanged: Pular arquivos idênticos ao último upload (manifesto local)
+        query_params: Parâmetros das queries (data_inicio, days_back, empresas, limite)
+                      sobrepondo extraction.params
+        max_pending_databases: Databases extraídos aguardando upload antes de pausar a extração
+        
+    Returns:
+        Dicionário com 'success', 'sql_results' (mesmo formato de run_etl_pipeline) e
+        'ftp_results' (mesmo formato de upload_to_ftp)
+    """
+    print("=" * 80)
+    print("📊 PIPELINE ETL: EXTRAÇÃO E UPLOAD SOBREPOSTOS")
+    print("=" * 80)
+    
+    upload_stats = new_upload_stats()
+    pending = queue.Queue(maxsize=max(1, max_pending_databases))
+    
+    def upload_worker():
+        # Sessão SFTP compartilhada (uma única conexão para todos os databases)
+        ftp = session = None
+        try:
+            ftp = session = ForecastFTPUploader.shared()
+            if not ftp._connect():
+                print("❌ Falha ao conectar no servidor FTP")
+                upload_stats['error'] = 'FTP connection failed'
+                ftp = None
+        except Exception as e:
+            print(f"❌ Erro ao conectar no servidor FTP: {e}")
+            upload_stats['error'] = str(e)
+            ftp = None
+        
+        try:
+            while True:
+                db_folder = pending.get()
+                if db_folder is None:
+                    break
+                if ftp is None:
+                    # Continua consumindo a fila para não travar a extração
+                    continue
+                print(f"\n📤 [upload] {db_folder.name} liberado para envio")
+                try:
+                    upload_database_folder(ftp, db_folder, forecast_type, skip_unchanged, upload_stats)
+                except Exception as e:
+                    print(f"   ❌ Erro no upload de {db_folder.name}: {e}")
+                    upload_stats['errors'].append(f"Erro no upload de {db_folder.name}: {e}")
+        finally:
+            if session is not None:
+                ForecastFTPUploader.release_shared()
+    
+    def enqueue_database(database: str, db_output_dir: Path, successful: int):
+        if successful == 0:
+            print(f"\n⏭️  [upload] {database} sem queries concluídas nesta execução; upload ignorado")
+            return
+        pending.put(Path(db_output_dir))
+    
+    uploader_thread = threading.Thread(target=upload_worker, name="ftp-upload", daemon=True)
+    uploader_thread.start()
+    
+    try:
+        extractor = SQLQuery()
+        extractor.verbose = verbose
+        extractor.param_overrides = query_params or {}
+        
+        sql_results = extractor.execute_all_queries(
+            output_base_dir=output_dir,
+            on_database_complete=enqueue_database
+        )
+    except Exception as e:
+        print(f"\n❌ Erro na extração de dados: {e}")
+        sql_results = {
+            'success': False,
+            'error': str(e),
+            'successful': 0,
+            'failed': 0,
+            'total_executions': 0
+        }
+    finally:
+        # Sinaliza o fim da extração e aguarda os uploads pendentes
+        pending.put(None)
+        uploader_thread.join()
+    
+    upload_stats['success'] = 'error' not in upload_stats and upload_stats['failed_uploads'] == 0
+    return {
+        'success': sql_results.get('success', False),
+        'sql_results': sql_results,
+        'ftp_results': upload_stats
+    }
+
+
+def list_parquet_files(db_folder: Path) -> List[Path]:
+    """
+    Lista os arquivos parquet de uma pasta de database, incluindo datasets particionados.
+    
+    Caminhos com componentes ocultos (ex.: diretórios temporários '.vendas.tmp')
+    são ignorados.
+    
+    Args:
+        db_folder: Pasta do database (ex.: data/005ATS_ERP_BI)
+        
+    Returns:
+        Lista de caminhos dos arquivos parquet
+    """
+    return sorted(
+        f for f in db_folder.rglob('*.parquet')
+        if not any(part.startswith('.') for part in f.relative_to(db_folder).parts)
+    )
+
+
+def new_upload_stats() -> Dict[str, Any]:
+    """Estatísticas de upload FTP/SFTP zeradas."""
+    return {
+        'total_uploads': 0,
+        'successful_uploads': 0,
+        'failed_uploads': 0,
+        'skipped_uploads': 0,
+        'databases_processed': [],
+        'errors': [],
+        'timings': {}
+    }
+
+
+def upload_database_folder(ftp: ForecastFTPUploader, db_folder: Path, forecast_type: str,
+                           skip_unchanged: bool, upload_stats: Dict[str, Any]):
+    """
+    Envia os arquivos parquet da pasta de um database e acumula o resultado em upload_stats.
+    
+    Args:
+        ftp: Uploader já conectado
+        db_folder: Pasta do database (ex.: data/005ATS_ERP_BI)
+        forecast_type: Tipo de dados ('data', 'vendas', 'volume', etc)
+        skip_unchanged: Pular arquivos idênticos ao último upload (manifesto local)
+        upload_stats: Estatísticas de upload (ver new_upload_stats)
+    """
+    database_name = db_folder.name
+    print(f"📊 Processando database: {database_name}")
+    
+    # Coletar arquivos parquet (incluindo datasets particionados)
+    parquet_files = list_parquet_files(db_folder)
+    
+    if not parquet_files:
+        print(f"   ⚠️  Nenhum arquivo parquet encontrado em {db_folder}")
+        return
+    
+    print(f"   📄 {len(parquet_files)} arquivos encontrados")
+    
+    # Converter para lista de strings (caminhos completos)
+    file_paths = [str(f) for f in parquet_files]
+    
+    try:
+        # Upload para FTP
+        result = ftp.upload_data(
+            database_name=database_name,
+            forecast_type=forecast_type,
+            file_paths=file_paths,
+            local_base_dir=str(db_folder),
+            skip_unchanged=skip_unchanged
+        )
+        
+        upload_stats['total_uploads'] += len(parquet_files)
+        upload_stats['skipped_uploads'] += len(result.get('skipped_files', []))
+        upload_stats['timings'][database_name] = result.get('timings', {})
+        
+        if result['success']:
+            upload_stats['successful_uploads'] += len(result['uploaded_files'])
+            upload_stats['databases_processed'].append(database_name)
+            print(f"   ✅ {result['message']}")
+        else:
+            failed_count = len(result.get('failed_files', []))
+            upload_stats['failed_uploads'] += failed_count
+            upload_stats['successful_uploads'] += len(result['uploaded_files'])
+            print(f"   ⚠️  {result['message']}")
+            if result.get('failed_files'):
+                upload_stats['errors'].append(f"{database_name}: {failed_count} arquivos falharam")
+        
+    except Exception as e:
+        error_msg = f"Erro no upload de {database_name}: {str(e)}"
+        print(f"   ❌ {error_msg}")
+        upload_stats['errors'].append(error_msg)
+        upload_stats['failed_uploads'] += len(parquet_files)
+    
+    print()  # Linha em branco
+
+
+def upload_to_ftp(data_dir: str = "data", forecast_type: str = "data",
+                  skip_unchanged: bool = True) -> Dict[str, Any]:
     """
     Faz upload dos arquivos parquet gerados para FTP/SFTP.
     
     Args:
         data_dir: Diretório base contendo as pastas de databases
         forecast_type: Tipo de dados ('data', 'vendas', 'volume', etc)
+        skip_unchanged: Pular arquivos idênticos ao último upload (manifesto local)
         
     Returns:
         Dicionário com estatísticas de upload
@@ -77,17 +289,12 @@ def upload_to_ftp(data_dir: str = "data", forecast_type: str = "data") -> Dict[s
         }
     
     # Estatísticas
-    upload_stats = {
-        'total_uploads': 0,
-        'successful_uploads': 0,
-        'failed_uploads': 0,
-        'databases_processed': [],
-        'errors': []
-    }
+    upload_stats = new_upload_stats()
     
+    ftp = None
     try:
-        # Criar conexão FTP
-        ftp = ForecastFTPUploader()
+        # Sessão SFTP compartilhada (uma única conexão para todos os databases)
+        ftp = ForecastFTPUploader.shared()
         
         if not ftp._connect():
             print("❌ Falha ao conectar no servidor FTP")
@@ -104,7 +311,6 @@ def upload_to_ftp(data_dir: str = "data", forecast_type: str = "data") -> Dict[s
         
         if not database_folders:
             print(f"⚠️  Nenhuma pasta de database encontrada em {data_dir}")
-            ftp.disconnect()
             return {
                 'success': False,
                 'error': 'No database folders found',
@@ -114,54 +320,9 @@ def upload_to_ftp(data_dir: str = "data", forecast_type: str = "data") -> Dict[s
         print(f"📁 Encontradas {len(database_folders)} pastas de databases\n")
         
         for db_folder in database_folders:
-            database_name = db_folder.name
-            print(f"📊 Processando database: {database_name}")
-            
-            # Coletar arquivos parquet
-            parquet_files = list(db_folder.glob('*.parquet'))
-            
-            if not parquet_files:
-                print(f"   ⚠️  Nenhum arquivo parquet encontrado em {db_folder}")
-                continue
-            
-            print(f"   📄 {len(parquet_files)} arquivos encontrados")
-            
-            # Converter para lista de strings (caminhos completos)
-            file_paths = [str(f) for f in parquet_files]
-            
-            try:
-                # Upload para FTP
-                result = ftp.upload_data(
-                    database_name=database_name,
-                    forecast_type=forecast_type,
-                    file_paths=file_paths
-                )
-                
-                upload_stats['total_uploads'] += len(parquet_files)
-                
-                if result['success']:
-                    upload_stats['successful_uploads'] += len(result['uploaded_files'])
-                    upload_stats['databases_processed'].append(database_name)
-                    print(f"   ✅ {result['message']}")
-                else:
-                    failed_count = len(result.get('failed_files', []))
-                    upload_stats['failed_uploads'] += failed_count
-                    upload_stats['successful_uploads'] += len(result['uploaded_files'])
-                    print(f"   ⚠️  {result['message']}")
-                    if result.get('failed_files'):
-                        upload_stats['errors'].append(f"{database_name}: {failed_count} arquivos falharam")
-                
-            except Exception as e:
-                error_msg = f"Erro no upload de {database_name}: {str(e)}"
-                print(f"   ❌ {error_msg}")
-                upload_stats['errors'].append(error_msg)
-                upload_stats['failed_uploads'] += len(parquet_files)
-            
-            print()  # Linha em branco
-        
-        # Desconectar FTP
-        ftp.disconnect()
+            upload_database_folder(ftp, db_folder, forecast_type, skip_unchanged, upload_stats)
         
+        # A sessão compartilhada permanece aberta para os próximos uploads
         upload_stats['success'] = upload_stats['failed_uploads'] == 0
         return upload_stats
         
@@ -172,6 +333,9 @@ def upload_to_ftp(data_dir: str = "data", forecast_type: str = "data") -> Dict[s
             'error': str(e),
             **upload_stats
         }
+    finally:
+        if ftp is not None:
+            ForecastFTPUploader.release_shared()
 
 
 def run_single_database_pipeline(
@@ -179,7 +343,9 @@ def run_single_database_pipeline(
     output_dir: str = "data",
     verbose: bool = True,
     upload_ftp: bool = True,
-    forecast_type: str = "data"
+    forecast_type: str = "data",
+    skip_unchanged: bool = True,
+    query_params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
     """
     Executa pipeline de extração de dados SQL para um único database.
@@ -190,6 +356,9 @@ def run_single_database_pipeline(
         verbose: Exibir logs detalhados
         upload_ftp: Fazer upload automático para FTP após extração
         forecast_type: Tipo de dados para FTP (usado se upload_ftp=True)
+        skip_unchanged: Pular arquivos idênticos ao último upload (manifesto local)
+        query_params: Parâmetros das queries (data_inicio, days_back, empresas, limite)
+                      sobrepondo extraction.params
         
     Returns:
         Dicionário com estatísticas de execução SQL e FTP (se habilitado)
@@ -202,6 +371,7 @@ def run_single_database_pipeline(
         # Instanciar SQLQuery
         extractor = SQLQuery()
         extractor.verbose = verbose
+        extractor.param_overrides = query_params or {}
         
         # Executar queries para o database específico
         sql_results = extractor.execute_queries_for_database(
@@ -225,8 +395,9 @@ def run_single_database_pipeline(
             print("📤 UPLOAD PARA FTP/SFTP")
             print("=" * 80)
             
+            ftp = None
             try:
-                ftp = ForecastFTPUploader()
+                ftp = ForecastFTPUploader.shared()
                 
                 if not ftp._connect():
                     print("❌ Falha ao conectar no servidor FTP")
@@ -239,7 +410,7 @@ def run_single_database_pipeline(
                     
                     # Coletar arquivos parquet do database
                     db_dir = Path(output_dir) / database
-                    parquet_files = list(db_dir.glob('*.parquet'))
+                    parquet_files = list_parquet_files(db_dir)
                     
                     if parquet_files:
                         print(f"📄 {len(parquet_files)} arquivos encontrados")
@@ -249,14 +420,18 @@ def run_single_database_pipeline(
                         result = ftp.upload_data(
                             database_name=database,
                             forecast_type=forecast_type,
-                            file_paths=file_paths
+                            file_paths=file_paths,
+                            local_base_dir=str(db_dir),
+                            skip_unchanged=skip_unchanged
                         )
                         
                         ftp_results = {
                             'success': result['success'],
                             'uploaded_files': len(result.get('uploaded_files', [])),
                             'failed_files': len(result.get('failed_files', [])),
-                            'message': result['message']
+                            'skipped_files': len(result.get('skipped_files', [])),
+                            'message': result['message'],
+                            'timings': result.get('timings', {})
                         }
                         
                         print(f"{'✅' if result['success'] else '⚠️'} {result['message']}")
@@ -266,14 +441,15 @@ def run_single_database_pipeline(
                             'error': 'No parquet files found'
                         }
                     
-                    ftp.disconnect()
-                    
             except Exception as e:
                 print(f"❌ Erro no upload FTP: {e}")
                 ftp_results = {
                     'success': False,
                     'error': str(e)
                 }
+            finally:
+                if ftp is not None:
+                    ForecastFTPUploader.release_shared()
         
         return {
             'success': True,
@@ -293,11 +469,101 @@ def run_single_database_pipeline(
         }
 
 
+def run_in_memory_supabase_pipeline(
+    database: str,
+    bucket_name: str,
+    verbose: bool = True,
+    max_pending_uploads: int = 2,
+    query_params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+    """
+    Pipeline Supabase direto: cada query é serializada em um buffer parquet em memória
+    e enviada em seguida, sem diretório temporário.
+    
+    O upload de uma query roda em background enquanto a próxima é extraída; no máximo
+    max_pending_uploads buffers ficam em memória aguardando envio.
+    
+    Args:
+        database: Nome do database para executar as queries
+        bucket_name: Nome do bucket Supabase
+        verbose: Exibir logs detalhados
+        max_pending_uploads: Número máximo de uploads em andamento/aguardando
+        query_params: Parâmetros das queries (data_inicio, days_back, empresas, limite)
+                      sobrepondo extraction.params
+        
+    Returns:
+        Dicionário com estatísticas de execução SQL e Supabase
+    """
+    extractor = SQLQuery()
+    extractor.verbose = verbose
+    extractor.param_overrides = query_params or {}
+    uploader = SupabaseUploader()
+    
+    upload_slots = threading.BoundedSemaphore(max_pending_uploads)
+    uploads = {}
+    timings = {}
+    
+    with ThreadPoolExecutor(max_workers=max_pending_uploads) as executor:
+        def submit_upload(query_name, buffer):
+            # Bloqueia a extração se já houver buffers demais aguardando envio
+            upload_slots.acquire()
+            storage_path = f"{query_name}.parquet"
+            print(f"  📤 Enviando {storage_path} para o bucket {bucket_name} em background")
+            future = executor.submit(
+                uploader.upload_parquet_buffer, bucket_name, buffer, storage_path, timings=timings
+            )
+            future.add_done_callback(lambda _: upload_slots.release())
+            uploads[storage_path] = future
+        
+        sql_results = extractor.execute_queries_to_buffers(database, submit_upload)
+        statuses = {storage_path: future.result() for storage_path, future in uploads.items()}
+    
+    if not sql_results.get('success'):
+        return {
+            'success': False,
+            'database': database,
+            'bucket_name': bucket_name,
+            'sql_results': sql_results,
+            'supabase_results': None
+        }
+    
+    successful_files = [path for path, status in statuses.items() if status == "success"]
+    failed_files = [path for path, status in statuses.items() if status == "failed"]
+    skipped_files = [path for path, status in statuses.items() if status == "skipped"]
+    
+    supabase_results = {
+        'total_files': len(statuses),
+        'successful_uploads': len(successful_files),
+        'failed_uploads': len(failed_files),
+        'skipped_uploads': len(skipped_files),
+        'successful_files': successful_files,
+        'failed_files': failed_files,
+        'skipped_files': skipped_files,
+        'timings': timings,
+        'success': len(statuses) > 0 and not failed_files,
+        'database': database,
+        'bucket_name': bucket_name
+    }
+    
+    print(f"{'✅' if supabase_results['success'] else '⚠️ '} Upload para Supabase (em memória): "
+          f"{len(successful_files)} enviados, {len(skipped_files)} sem alteração, {len(failed_files)} falhas")
+    
+    return {
+        'success': True,
+        'database': database,
+        'bucket_name': bucket_name,
+        'sql_results': sql_results,
+        'supabase_results': supabase_results
+    }
+
+
 def run_single_database_supabase_pipeline(
     database: str,
     bucket_name: Optional[str] = None,
     verbose: bool = True,
-    temp_dir: str = "temp"
+    temp_dir: str = "temp",
+    in_memory: bool = False,
+    query_params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
     """
     Executa pipeline de extração de dados SQL para um único database e faz upload direto para Supabase.
@@ -307,6 +573,10 @@ def run_single_database_supabase_pipeline(
         bucket_name: Nome do bucket Supabase (default: nome do database)
         verbose: Exibir logs detalhados
         temp_dir: Diretório temporário para processamento (default: "temp")
+        in_memory: Serializar cada query em memória e enviar sem passar pelo
+                   diretório temporário, sobrepondo upload e extração
+        query_params: Parâmetros das queries (data_inicio, days_back, empresas, limite)
+                      sobrepondo extraction.params
         
     Returns:
         Dicionário com estatísticas de execução SQL e Supabase
@@ -319,6 +589,22 @@ def run_single_database_supabase_pipeline(
     if bucket_name is None:
         bucket_name = database.lower().replace("_", "-")
     
+    if in_memory:
+        try:
+            return run_in_memory_supabase_pipeline(
+                database, bucket_name, verbose=verbose, query_params=query_params
+            )
+        except Exception as e:
+            print(f"\n❌ Erro no pipeline Supabase: {e}")
+            return {
+                'success': False,
+                'database': database,
+                'bucket_name': bucket_name,
+                'error': str(e),
+                'sql_results': None,
+                'supabase_results': None
+            }
+    
     temp_path = None
     supabase_results = None
     
@@ -326,6 +612,7 @@ def run_single_database_supabase_pipeline(
         # Instanciar SQLQuery
         extractor = SQLQuery()
         extractor.verbose = verbose
+        extractor.param_overrides = query_params or {}
         
         # Executar queries para o database específico
         sql_results = extractor.execute_queries_for_database(
@@ -374,7 +661,7 @@ def run_single_database_supabase_pipeline(
             }
         
         # Verificar se há arquivos Parquet no diretório temporário
-        parquet_files = list(temp_path.glob('*.parquet'))
+        parquet_files = list_parquet_files(temp_path)
         if not parquet_files:
             print(f"⚠️  Nenhum arquivo Parquet encontrado em {temp_path}")
             return {
@@ -490,6 +777,8 @@ def print_summary(sql_results: Dict[str, Any], ftp_results: Dict[str, Any] = Non
         print("\n📤 UPLOAD FTP:")
         if ftp_results.get('success'):
             print(f"   ✅ Sucesso: {ftp_results.get('successful_uploads', 0)}/{ftp_results.get('total_uploads', 0)} arquivos")
+            if ftp_results.get('skipped_uploads'):
+                print(f"   ⏭️  Sem alteração: {ftp_results['skipped_uploads']} arquivos")
             print(f"   📁 Databases processados: {len(ftp_results.get('databases_processed', []))}")
             if ftp_results.get('databases_processed'):
                 for db in ftp_results['databases_processed']:
@@ -510,7 +799,8 @@ def print_summary(sql_results: Dict[str, Any], ftp_results: Dict[str, Any] = Non
     # Status geral
     overall_success = (
         sql_results.get('success', False) and 
-        (ftp_results is None or ftp_results.get('successful_uploads', 0) > 0)
+        (ftp_results is None or
+         ftp_results.get('successful_uploads', 0) + ftp_results.get('skipped_uploads', 0) > 0)
     )
     
     if overall_success:
@@ -36,6 +36,7 @@ FROM sljest a
     LEFT JOIN sljgccr d ON a.grupos = d.codigos
     LEFT JOIN Taxas t ON b.moecusfs = t.cmoes
 WHERE d.tipoinvs IN (1, 2)
+    AND (:filtrar_empresas = 0 OR a.emps IN :empresas)
 GROUP BY
     a.emps,
     a.grupos,
@@ -15,6 +15,7 @@ FROM (
             ORDER BY a.emps
         ) as rn
     FROM sljremvd as a
+    WHERE (:filtrar_empresas = 0 OR a.emps IN :empresas)
 ) t
 WHERE rn = 1
 ORDER BY Empresa, Usuario, Data_Inicio;
\ No newline at end of file
@@ -13,6 +13,7 @@ FROM (
             ORDER BY a.emps
         ) as rn
     FROM sljremvc as a
+    WHERE (:filtrar_empresas = 0 OR a.emps IN :empresas)
 ) t
 WHERE rn = 1
 ORDER BY Empresa, Data_Inicio;
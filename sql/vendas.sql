@@ -1,4 +1,4 @@
-SELECT
+SELECT TOP (:limite)
     RTRIM(vendas.emps) AS Empresa,
     RTRIM(empresa.class) AS Classificacao_Emp,
     RTRIM(vendas.dopes) AS Operacao,
@@ -29,6 +29,9 @@ LEFT JOIN sljeest AS g WITH (NOLOCK) ON vendas.empdopnums = g.empdopnums
 LEFT JOIN SLJCLI AS consultora ON consultora.ICLIS = vendas.VENDS
 LEFT JOIN sljevent AS ev ON g.codevents = ev.codevents
 WHERE vendas.tipoops < 90
+    AND (:data_inicio IS NULL OR vendas.datas >= :data_inicio)
+    AND (:data_fim IS NULL OR vendas.datas < DATEADD(DAY, 1, :data_fim))
+    AND (:filtrar_empresas = 0 OR vendas.emps IN :empresas)
 GROUP BY
     vendas.emps,
     empresa.class,
@@ -46,4 +49,5 @@ GROUP BY
     vendas.codtams,
     g.codevents,
     ev.desevents
-ORDER BY vendas.datas DESC;
\ No newline at end of file
+ORDER BY vendas.datas DESC
+OPTION (RECOMPILE);
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Fixtures dos testes: SQLQuery apontando para um banco SQLite local (mesma ideia do
+benchmarks/bench_extraction.py), sem SQL Server nem driver ODBC.
+
+Colunas declaradas como DATE, TIMESTAMP e DECIMAL voltam do SQLite como date,
+datetime e Decimal, como no pyodbc.
+"""
+
+import sqlite3
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.sql_query import SQLQuery  # noqa: E402
+
+TEST_DATABASE = "TESTE_BI"
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, datetime.isoformat)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+
+
+class SQLiteSQLQuery(SQLQuery):
+    """SQLQuery sobre um banco SQLite, com as queries informadas no lugar de sql/*.sql."""
+
+    def __init__(self, sqlite_file: str, sql_files: dict):
+        self.sqlite_file = sqlite_file
+        self.sql_files = sql_files
+        super().__init__(config_file=str(ROOT / "config" / "databases.yaml"))
+
+        self.config["databases"] = [TEST_DATABASE]
+        self.config["execution"] = {"parallel": False}
+        self.config["queries"] = {}
+
+    def _get_engine(self, database=None):
+        cls = type(self)
+        with cls._engine_registry_lock:
+            engine = cls._engine_registry.get(self.sqlite_file)
+            if engine is None:
+                engine = create_engine(
+                    f"sqlite:///{self.sqlite_file}",
+                    connect_args={"detect_types": sqlite3.PARSE_DECLTYPES, "check_same_thread": False}
+                )
+                cls._engine_registry[self.sqlite_file] = engine
+            return engine
+
+    def _load_sql_files(self, sql_dir: str = "sql"):
+        return dict(self.sql_files)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """
+    Banco SQLite vazio; o diretório de trabalho passa a ser tmp_path (data/ e state/).
+
+    Returns:
+        Conexão sqlite3 para criar e popular as tabelas do teste
+    """
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect(tmp_path / "teste.db")
+    yield conn
+    conn.close()
+    SQLQuery.dispose_engines()
+
+
+@pytest.fixture
+def make_extractor(tmp_path, sqlite_db):
+    """
+    Cria extratores sobre o banco do teste.
+
+    Uso: make_extractor({"vendas": "SELECT ..."}, queries={...}, extraction={...})
+    """
+    def make(sql_files: dict, queries: dict = None, extraction: dict = None) -> SQLiteSQLQuery:
+        sqlite_db.commit()
+        extractor = SQLiteSQLQuery(str(tmp_path / "teste.db"), sql_files)
+        extractor.config["queries"] = queries or {}
+        extractor.config["extraction"] = {**extractor.config["extraction"], **(extraction or {})}
+        return extractor
+
+    return make
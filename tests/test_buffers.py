@@ -0,0 +1,24 @@
+"""Pipeline em memória: cada query serializada em um buffer parquet."""
+
+import pyarrow.parquet as pq
+
+from conftest import TEST_DATABASE
+
+
+def test_failed_pandas_query_is_not_delivered_as_empty_buffer(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE itens (id INTEGER)")
+    sqlite_db.executemany("INSERT INTO itens VALUES (?)", [(1,), (2,)])
+    extractor = make_extractor(
+        {"itens": "SELECT id FROM itens", "quebrada": "SELECT id FROM tabela_inexistente"},
+        extraction={"fetch_mode": "pandas"}
+    )
+    delivered = {}
+
+    stats = extractor.execute_queries_to_buffers(
+        TEST_DATABASE, lambda query_name, buffer: delivered.update({query_name: buffer})
+    )
+
+    assert stats["successful"] == 1
+    assert stats["failed"] == 1
+    assert list(delivered) == ["itens"]
+    assert pq.read_table(delivered["itens"]).num_rows == 2
@@ -0,0 +1,129 @@
+"""Otimização de tipos do modo pandas: schema estável e compatível com o perfil de gravação."""
+
+import decimal
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yaml
+
+from conftest import ROOT, TEST_DATABASE
+from utils.dtype_optimizer import column_types_from_cursor, optimize_dtypes
+from utils.sql_query import SQLQuery
+
+DESCRIPTION = [
+    ("Empresa", str, None, 2, 2, 0, True),
+    ("Qtd", decimal.Decimal, None, 12, 12, 0, True),
+    ("Total_Liq", decimal.Decimal, None, 14, 14, 2, True),
+    ("No_Oper", int, None, 10, 10, 0, True),
+    ("Loja", int, None, 5, 5, 0, True),
+]
+
+
+def shipped_query_config(name):
+    with open(ROOT / "config" / "databases.yaml", encoding="utf-8") as f:
+        return (yaml.safe_load(f)["queries"] or {})[name]
+
+
+def test_types_come_from_cursor_metadata_not_values():
+    column_types = column_types_from_cursor(DESCRIPTION)
+    small = pd.DataFrame({
+        "Empresa": ["01", "01"], "Qtd": [Decimal("1"), Decimal("2")],
+        "Total_Liq": [Decimal("1.5"), Decimal("2")], "No_Oper": [1, 2], "Loja": [1, 2],
+    })
+    large = pd.DataFrame({
+        "Empresa": ["01", "02"], "Qtd": [Decimal("100000"), None],
+        "Total_Liq": [Decimal("123456.78"), None], "No_Oper": [10 ** 9, None], "Loja": [300, 301],
+    })
+
+    schemas = []
+    for df in (small, large):
+        optimized, _ = optimize_dtypes(df, column_types=column_types)
+        schemas.append(SQLQuery._frame_to_table(optimized).schema)
+
+    assert schemas[0] == schemas[1]
+    assert schemas[0].field("Qtd").type == pa.int64()
+    assert schemas[0].field("Total_Liq").type == pa.float64()
+    assert schemas[0].field("No_Oper").type == pa.int32()
+    assert schemas[0].field("Loja").type == pa.int16()
+
+
+def test_fixed_decimals_are_opt_in():
+    column_types = column_types_from_cursor(DESCRIPTION)
+    df = pd.DataFrame({"Total_Liq": [Decimal("1.5"), None]})
+
+    default, _ = optimize_dtypes(df, column_types=column_types)
+    fixed, _ = optimize_dtypes(df, {"decimals": "fixed"}, column_types=column_types)
+
+    assert default["Total_Liq"].dtype == "float64"
+    assert SQLQuery._frame_to_table(fixed).schema.field("Total_Liq").type == pa.decimal128(14, 2)
+
+
+def test_decimals_without_metadata_become_float():
+    df = pd.DataFrame({"Valor": [Decimal("1.25"), None]})
+
+    optimized, summary = optimize_dtypes(df, {"decimals": "fixed"})
+
+    assert optimized["Valor"].dtype == "float64"
+    assert summary["decimal"] == ["Valor"]
+
+
+def test_execute_query_keeps_decimals(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE precos (Cod_Prod TEXT, Preco DECIMAL(10, 2))")
+    sqlite_db.execute("INSERT INTO precos VALUES ('A', '12.34')")
+    extractor = make_extractor({})
+
+    df = extractor._execute_query(TEST_DATABASE, "SELECT Cod_Prod, Preco FROM precos")
+
+    assert df["Preco"].tolist() == [Decimal("12.34")]
+    assert "column_types" in df.attrs
+
+
+def test_categorical_sort_columns_with_shipped_estoque_profile(make_extractor):
+    extractor = make_extractor({}, queries={"estoque": shipped_query_config("estoque")})
+    query_config = extractor._query_config("estoque")
+    df = pd.DataFrame({
+        "Empresa": ["02", "01", "02", "01"] * 3,
+        "Cod_Prod": ["B", "C", "A", "A"] * 3,
+        "Saldo": range(12),
+    })
+
+    optimized = extractor._optimize_frame(df, query_config)
+    assert isinstance(optimized["Empresa"].dtype, pd.CategoricalDtype)
+    table = SQLQuery._sort_table(SQLQuery._frame_to_table(optimized), query_config["parquet"])
+
+    assert table["Empresa"].to_pylist()[:6] == ["01"] * 6
+    assert table["Cod_Prod"].to_pylist()[:6] == ["A", "A", "A", "C", "C", "C"]
+
+
+def test_sort_table_accepts_dictionary_columns():
+    table = pa.table({
+        "Empresa": pa.array(["02", "01", "02"]).dictionary_encode(),
+        "Cod_Prod": ["B", "C", "A"],
+    })
+
+    ordered = SQLQuery._sort_table(table, {"sort_by": ["Empresa", ["Cod_Prod", "descending"]]})
+
+    assert ordered["Empresa"].to_pylist() == ["01", "02", "02"]
+    assert ordered["Cod_Prod"].to_pylist() == ["C", "B", "A"]
+    assert pa.types.is_dictionary(ordered.schema.field("Empresa").type)
+
+
+def test_shipped_estoque_profile_end_to_end(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE estoque (Empresa TEXT, Cod_Prod TEXT, Saldo INTEGER)")
+    sqlite_db.executemany(
+        "INSERT INTO estoque VALUES (?, ?, ?)",
+        [(empresa, f"P{index % 5}", index) for index in range(40) for empresa in ("02", "01")]
+    )
+    extractor = make_extractor(
+        {"estoque": "SELECT Empresa, Cod_Prod, Saldo FROM estoque"},
+        queries={"estoque": shipped_query_config("estoque")}
+    )
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["successful"] == 1, stats["errors"]
+    table = pq.read_table(f"data/{TEST_DATABASE}/estoque.parquet")
+    keys = list(zip(table["Empresa"].to_pylist(), table["Cod_Prod"].to_pylist()))
+    assert keys == sorted(keys)
@@ -0,0 +1,122 @@
+"""Leitura em lotes (fetch_mode stream/arrow): schema único entre lotes."""
+
+import decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import TEST_DATABASE
+from utils import sql_query
+from utils.sql_query import SQLQuery
+
+
+@pytest.fixture
+def mixed_nulls(sqlite_db):
+    """Tabela cuja coluna 'obs' só tem nulos nos primeiros lotes."""
+    sqlite_db.execute("CREATE TABLE itens (id INTEGER, obs TEXT)")
+    sqlite_db.executemany(
+        "INSERT INTO itens VALUES (?, ?)",
+        [(1, None), (2, None), (3, None), (4, "a"), (5, None), (6, "b")]
+    )
+
+
+@pytest.mark.parametrize("fetch_mode", ["stream", "arrow"])
+def test_column_null_in_first_batch_is_typed_by_later_batches(make_extractor, mixed_nulls, fetch_mode):
+    extractor = make_extractor(
+        {"itens": "SELECT id, obs FROM itens ORDER BY id"},
+        extraction={"fetch_mode": fetch_mode, "chunk_size": 2}
+    )
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["successful"] == 1, stats["errors"]
+    table = pq.read_table(f"data/{TEST_DATABASE}/itens.parquet")
+    assert pa.types.is_string(table.schema.field("obs").type) or \
+        pa.types.is_large_string(table.schema.field("obs").type)
+    assert table["obs"].to_pylist() == [None, None, None, "a", None, "b"]
+
+
+@pytest.mark.parametrize("fetch_mode", ["stream", "arrow"])
+def test_column_null_in_every_batch_keeps_null_type(make_extractor, sqlite_db, fetch_mode):
+    sqlite_db.execute("CREATE TABLE itens (id INTEGER, obs TEXT)")
+    sqlite_db.executemany("INSERT INTO itens VALUES (?, ?)", [(1, None), (2, None), (3, None)])
+    extractor = make_extractor(
+        {"itens": "SELECT id, obs FROM itens ORDER BY id"},
+        extraction={"fetch_mode": fetch_mode, "chunk_size": 2}
+    )
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["successful"] == 1, stats["errors"]
+    assert pq.read_table(f"data/{TEST_DATABASE}/itens.parquet").num_rows == 3
+
+
+def test_cursor_types_are_applied_per_column():
+    description = [
+        ("Cod_Prod", str, None, 20, 20, 0, True),
+        ("Total", decimal.Decimal, None, 12, 12, 2, True),
+        ("Extra", object, None, None, None, None, True),
+    ]
+    types = SQLQuery._arrow_types_from_cursor(description)
+
+    assert types == [pa.string(), pa.decimal128(12, 2), None]
+    assert SQLQuery._output_types(types) == [pa.string(), pa.float64(), None]
+    assert SQLQuery._output_types(types, {"decimals": "fixed"}) == types
+    batch = SQLQuery._rows_to_record_batch(
+        [("A", decimal.Decimal("1.50"), None), ("B", None, 3)], ["Cod_Prod", "Total", "Extra"], types
+    )
+    assert batch.schema.field("Total").type == pa.decimal128(12, 2)
+    assert batch.schema.field("Extra").type == pa.int64()
+
+
+@pytest.mark.parametrize("decimals, total_type", [("float", pa.float64()), ("fixed", pa.decimal128(14, 2))])
+def test_fetch_modes_write_the_same_decimal_schema(make_extractor, sqlite_db, monkeypatch, decimals, total_type):
+    # O SQLite não informa tipo/precisão no cursor: usa a descrição que o pyodbc daria
+    description = [
+        ("Empresa", str, None, 2, 2, 0, True),
+        ("Qtd", decimal.Decimal, None, 12, 12, 0, True),
+        ("Total_Liq", decimal.Decimal, None, 14, 14, 2, True),
+    ]
+    arrow_types = SQLQuery._arrow_types_from_cursor
+    column_types = sql_query.column_types_from_cursor
+    monkeypatch.setattr(SQLQuery, "_arrow_types_from_cursor", staticmethod(lambda _: arrow_types(description)))
+    monkeypatch.setattr(sql_query, "column_types_from_cursor", lambda _: column_types(description))
+    sqlite_db.execute("CREATE TABLE vendas (Empresa TEXT, Qtd DECIMAL(12, 0), Total_Liq DECIMAL(14, 2))")
+    sqlite_db.executemany("INSERT INTO vendas VALUES (?, ?, ?)", [("01", "3", "10.50"), ("02", None, None)])
+
+    schemas = {}
+    for fetch_mode in ("pandas", "stream", "arrow"):
+        extractor = make_extractor(
+            {"vendas": "SELECT Empresa, Qtd, Total_Liq FROM vendas"},
+            extraction={"fetch_mode": fetch_mode, "dtypes": {"decimals": decimals}}
+        )
+        stats = extractor.execute_queries_for_database(TEST_DATABASE)
+        assert stats["successful"] == 1, stats["errors"]
+        schemas[fetch_mode] = pq.read_schema(f"data/{TEST_DATABASE}/vendas.parquet")
+
+    for schema in schemas.values():
+        assert schema.field("Qtd").type == pa.int64()
+        assert schema.field("Total_Liq").type == total_type
+
+
+@pytest.mark.parametrize("partition", [None, {"column": "Data", "by": ["year"]}])
+def test_failed_batch_leaves_no_temporary_output(make_extractor, sqlite_db, tmp_path, monkeypatch, partition):
+    sqlite_db.execute("CREATE TABLE itens (id INTEGER, Data DATE)")
+    sqlite_db.executemany("INSERT INTO itens VALUES (?, ?)", [(i, f"2024-01-0{i}") for i in range(1, 5)])
+    query_config = {"fetch_mode": "arrow", "chunk_size": 2}
+    if partition:
+        query_config["partition"] = partition
+
+    def first_batch_then_fail(tables):
+        yield next(iter(tables))
+        raise RuntimeError("conexão perdida")
+
+    monkeypatch.setattr(SQLQuery, "_unify_table_schemas", staticmethod(first_batch_then_fail))
+    extractor = make_extractor({"itens": "SELECT id, Data FROM itens ORDER BY id"}, queries={"itens": query_config})
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["failed"] == 1
+    output_dir = tmp_path / "data" / TEST_DATABASE
+    assert [path.name for path in output_dir.iterdir() if "tmp" in path.name] == []
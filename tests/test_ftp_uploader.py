@@ -0,0 +1,281 @@
+"""Sessão SFTP compartilhada: contagem de usuários e reconexão sem derrubar canais."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from utils import ftp_uploader
+from utils.ftp_uploader import ForecastFTPUploader
+
+
+@pytest.fixture
+def shared_session(monkeypatch):
+    """Sessão compartilhada sem rede; registra as desconexões."""
+    closed = []
+    monkeypatch.setattr(ForecastFTPUploader, "disconnect", lambda self: closed.append(self))
+    yield closed
+    ForecastFTPUploader._shared_instance = None
+    ForecastFTPUploader._shared_users = 0
+    ForecastFTPUploader._shared_closing = False
+
+
+def test_close_waits_for_the_last_user(shared_session):
+    first = ForecastFTPUploader.shared()
+    second = ForecastFTPUploader.shared()
+    assert first is second
+
+    ForecastFTPUploader.close_shared()
+    assert shared_session == []
+
+    ForecastFTPUploader.release_shared()
+    assert shared_session == []
+    ForecastFTPUploader.release_shared()
+    assert shared_session == [first]
+    assert ForecastFTPUploader._shared_instance is None
+
+
+def test_close_without_users_disconnects_immediately(shared_session):
+    session = ForecastFTPUploader.shared()
+    ForecastFTPUploader.release_shared()
+
+    ForecastFTPUploader.close_shared()
+
+    assert shared_session == [session]
+
+
+class FakeTransport:
+    def __init__(self, active):
+        self.active = active
+
+    def is_active(self):
+        return self.active
+
+
+class FakeClient:
+    """Cliente SSH/SFTP mínimo para o teste de reconexão."""
+
+    def __init__(self, transport=None, channel_closed=False):
+        self.transport = transport
+        self.channel = SimpleNamespace(closed=channel_closed)
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def get_channel(self):
+        return self.channel
+
+    def close(self):
+        self.closed = True
+
+
+def test_dead_main_channel_is_reopened_on_the_live_transport(monkeypatch, tmp_path):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"))
+    transport = FakeTransport(active=True)
+    uploader.ssh_client = FakeClient(transport)
+    uploader.sftp_client = FakeClient(channel_closed=True)
+    uploader._connected = True
+    reopened = FakeClient()
+    monkeypatch.setattr(ftp_uploader.paramiko.SFTPClient, "from_transport", lambda t: reopened)
+    monkeypatch.setattr(uploader, "_open_connection", lambda: pytest.fail("reconectou o transporte"))
+
+    assert uploader._connect()
+
+    assert uploader.sftp_client is reopened
+    assert not uploader.ssh_client.closed
+
+
+def test_dead_transport_is_replaced(monkeypatch, tmp_path):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"))
+    old_ssh = FakeClient(FakeTransport(active=False))
+    uploader.ssh_client = old_ssh
+    uploader.sftp_client = FakeClient()
+    uploader._connected = True
+    monkeypatch.setattr(uploader, "_open_connection", lambda: True)
+
+    assert uploader._connect()
+
+    assert old_ssh.closed
+
+
+class RacingSFTP:
+    """Canal em que outro upload cria o diretório final entre o stat e o mkdir."""
+
+    def __init__(self, created_elsewhere):
+        self.dirs = {"ai", "ai/TESTE_BI"}
+        self.created_elsewhere = created_elsewhere
+
+    def stat(self, path):
+        if path not in self.dirs:
+            raise FileNotFoundError(path)
+        return SimpleNamespace(st_mode=0o040755)
+
+    def mkdir(self, path):
+        if self.created_elsewhere:
+            self.dirs.add(path)
+        raise IOError(f"Failure: {path}")
+
+
+@pytest.mark.parametrize("created_elsewhere, expected", [(True, True), (False, False)])
+def test_final_directory_mkdir_race_is_tolerated(tmp_path, created_elsewhere, expected):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"))
+    uploader.sftp_client = RacingSFTP(created_elsewhere)
+
+    assert uploader._ensure_directory("ai/TESTE_BI/data") is expected
+
+
+class MemorySFTP:
+    """Canal SFTP em memória: registra os envios; com fail_puts, o envio falha e derruba a conexão."""
+
+    def __init__(self, fail_puts=False, on_fail=None):
+        self.dirs = set()
+        self.puts = []
+        self.fail_puts = fail_puts
+        self.on_fail = on_fail
+        self.closed = False
+
+    def stat(self, path):
+        if path not in self.dirs:
+            raise FileNotFoundError(path)
+        return SimpleNamespace(st_mode=0o040755)
+
+    def mkdir(self, path):
+        self.dirs.add(path)
+
+    def put(self, local_path, remote_path):
+        if self.fail_puts:
+            if self.on_fail:
+                self.on_fail()
+            raise EOFError("conexão encerrada")
+        self.puts.append(remote_path)
+        with open(local_path, "rb") as f:
+            return SimpleNamespace(st_size=len(f.read()))
+
+    def close(self):
+        self.closed = True
+
+
+def write_files(tmp_path, count):
+    paths = []
+    for index in range(count):
+        path = tmp_path / f"arquivo{index}.parquet"
+        path.write_bytes(b"x" * (index + 1))
+        paths.append(str(path))
+    return paths
+
+
+def test_files_are_spread_over_extra_channels_that_are_closed_after(monkeypatch, tmp_path):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"), max_channels=3)
+    main = MemorySFTP()
+    uploader.sftp_client = main
+    uploader.ssh_client = FakeClient(FakeTransport(active=True))
+    uploader._connect = lambda: True
+    extra = []
+
+    def open_channel(transport):
+        extra.append(MemorySFTP())
+        return extra[-1]
+
+    monkeypatch.setattr(ftp_uploader.paramiko.SFTPClient, "from_transport", open_channel)
+    files = write_files(tmp_path, 6)
+
+    result = uploader.upload_data("TESTE_BI", "data", files)
+
+    assert result["success"]
+    assert sorted(result["uploaded_files"]) == [f"arquivo{index}.parquet" for index in range(6)]
+    assert len(extra) == 2
+    assert sorted(main.puts + extra[0].puts + extra[1].puts) == [
+        f"ai/TESTE_BI/data/arquivo{index}.parquet" for index in range(6)
+    ]
+    assert all(channel.closed for channel in extra)
+    assert not main.closed
+
+
+def test_failed_files_are_resent_after_reconnect(tmp_path):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"), max_channels=1)
+    state = {"alive": True}
+    reconnected = MemorySFTP()
+    dropped = MemorySFTP(fail_puts=True, on_fail=lambda: state.update(alive=False))
+    uploader.sftp_client = dropped
+
+    def connect():
+        if not state["alive"]:
+            uploader.sftp_client = reconnected
+            state["alive"] = True
+        return True
+
+    uploader._connect = connect
+    uploader._is_alive = lambda: state["alive"]
+    files = write_files(tmp_path, 2)
+
+    result = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+
+    assert result["success"]
+    assert result["failed_files"] == []
+    assert sorted(reconnected.puts) == ["ai/TESTE_BI/data/arquivo0.parquet", "ai/TESTE_BI/data/arquivo1.parquet"]
+    # Reenviados e verificados: entram no manifesto e não são reenviados na próxima vez
+    again = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+    assert sorted(again["skipped_files"]) == ["arquivo0.parquet", "arquivo1.parquet"]
+
+
+def test_failed_files_are_reported_when_reconnect_fails(tmp_path):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"), max_channels=1)
+    state = {"alive": True, "connects": 0}
+    uploader.sftp_client = MemorySFTP(fail_puts=True, on_fail=lambda: state.update(alive=False))
+
+    def connect():
+        state["connects"] += 1
+        return state["alive"]
+
+    uploader._connect = connect
+    uploader._is_alive = lambda: state["alive"]
+    files = write_files(tmp_path, 1)
+
+    result = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+
+    assert not result["success"]
+    assert result["failed_files"] == files
+    assert state["connects"] == 2
+    assert uploader.manifest.get(f"sftp://{uploader.host}:{uploader.port}/ai/TESTE_BI/data", "arquivo0.parquet") is None
+
+
+class TruncatingSFTP(MemorySFTP):
+    """Canal cujo arquivo remoto fica menor: o put(confirm=True) do paramiko levanta IOError."""
+
+    def put(self, local_path, remote_path):
+        raise IOError("size mismatch in put!  1 != 2")
+
+
+def test_size_mismatch_is_a_failed_upload_and_not_recorded(tmp_path):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"), max_channels=1)
+    uploader.sftp_client = TruncatingSFTP()
+    uploader._connect = lambda: True
+    uploader._is_alive = lambda: True
+    files = write_files(tmp_path, 1)
+
+    result = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+
+    assert not result["success"]
+    assert result["failed_files"] == files
+    # Fora do manifesto: o próximo envio não é pulado
+    uploader.sftp_client = MemorySFTP()
+    again = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+    assert again["uploaded_files"] == ["arquivo0.parquet"]
+
+
+def test_files_are_hashed_only_to_compare_or_record(tmp_path, monkeypatch):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "manifest.json"), max_channels=1)
+    uploader._connect = lambda: True
+    uploader._is_alive = lambda: True
+    hashed = []
+    fingerprint = uploader.manifest.fingerprint
+    monkeypatch.setattr(uploader.manifest, "fingerprint", lambda path: hashed.append(path) or fingerprint(path))
+    files = write_files(tmp_path, 2)
+
+    uploader.sftp_client = TruncatingSFTP()
+    assert uploader.upload_data("TESTE_BI", "data", files)["failed_files"] == files
+    assert hashed == []
+
+    uploader.sftp_client = MemorySFTP()
+    assert uploader.upload_data("TESTE_BI", "data", files)["success"]
+    assert sorted(hashed) == files
@@ -0,0 +1,135 @@
+"""Extração incremental: merge a partir do watermark com janela de look-back."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import TEST_DATABASE
+from utils.sql_query import SQLQuery
+from utils.watermarks import WatermarkStore
+
+QUERY = """
+SELECT Data, Valor FROM movimentos
+WHERE (:data_inicio IS NULL OR Data >= :data_inicio)
+ORDER BY Data
+"""
+
+INCREMENTAL = {"fetch_mode": "arrow", "incremental": {"enabled": True, "column": "Data", "lookback_days": 7}}
+
+
+def test_incremental_run_replaces_rows_from_cutoff(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE movimentos (Data DATE, Valor INTEGER)")
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(20)]
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, 1)", [(day,) for day in days])
+
+    def make():
+        return make_extractor(
+            {"movimentos": QUERY}, queries={"movimentos": INCREMENTAL}, extraction={"default_days_back": None}
+        )
+
+    first = make().execute_queries_for_database(TEST_DATABASE)
+    assert first["details"][0].get("mode") is None
+    watermarks = WatermarkStore("state/watermarks.json")
+    assert watermarks.get(TEST_DATABASE, "movimentos") == "2024-01-20"
+
+    # Alteração dentro do look-back (corte = 2024-01-13), outra fora dele e dois dias novos
+    sqlite_db.execute("UPDATE movimentos SET Valor = 2 WHERE Data >= '2024-01-15'")
+    sqlite_db.execute("UPDATE movimentos SET Valor = 3 WHERE Data = '2024-01-05'")
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, 2)", [(date(2024, 1, 21),), (date(2024, 1, 22),)])
+
+    second = make().execute_queries_for_database(TEST_DATABASE)
+
+    detail = second["details"][0]
+    assert detail["mode"] == "incremental"
+    assert detail["new_rows"] == 10
+    table = pq.read_table(f"data/{TEST_DATABASE}/movimentos.parquet")
+    values = dict(zip(table["Data"].to_pylist(), table["Valor"].to_pylist()))
+    assert len(values) == table.num_rows == 22
+    assert values[date(2024, 1, 5)] == 1
+    assert values[date(2024, 1, 14)] == 1
+    assert values[date(2024, 1, 15)] == 2
+    assert values[date(2024, 1, 22)] == 2
+    assert watermarks.get(TEST_DATABASE, "movimentos") == "2024-01-22"
+
+
+def test_incremental_merge_drops_rows_before_the_window(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE movimentos (Data DATE, Valor INTEGER)")
+    today = date.today()
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, 1)", [(today - timedelta(days=i),) for i in range(5)])
+
+    def make():
+        return make_extractor(
+            {"movimentos": QUERY}, queries={"movimentos": INCREMENTAL}, extraction={"default_days_back": 30}
+        )
+
+    make().execute_queries_for_database(TEST_DATABASE)
+
+    # Linha armazenada de uma execução antiga, anterior à janela de 30 dias
+    output_file = f"data/{TEST_DATABASE}/movimentos.parquet"
+    stored = pq.read_table(output_file)
+    old_row = pa.table({"Data": [today - timedelta(days=40)], "Valor": [9]}).cast(stored.schema)
+    pq.write_table(pa.concat_tables([old_row, stored]), output_file)
+
+    stats = make().execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["details"][0]["mode"] == "incremental"
+    table = pq.read_table(output_file)
+    assert sorted(table["Data"].to_pylist()) == sorted(today - timedelta(days=i) for i in range(5))
+
+
+def test_watermark_writes_from_separate_instances_are_not_lost(tmp_path):
+    state_file = str(tmp_path / "watermarks.json")
+
+    def write(index):
+        WatermarkStore(state_file).set(f"DB{index}", "movimentos", f"2024-01-{index + 1:02d}")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(20)))
+
+    store = WatermarkStore(state_file)
+    assert all(store.get(f"DB{index}", "movimentos") for index in range(20))
+    assert list(tmp_path.iterdir()) == [tmp_path / "watermarks.json"]
+
+
+def test_filtered_run_forces_next_normal_run_to_be_complete(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE movimentos (Data DATE, Valor INTEGER)")
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(20)]
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, 1)", [(day,) for day in days])
+
+    def make(**overrides):
+        extractor = make_extractor(
+            {"movimentos": QUERY}, queries={"movimentos": INCREMENTAL}, extraction={"default_days_back": None}
+        )
+        extractor.param_overrides = overrides
+        return extractor
+
+    make().execute_queries_for_database(TEST_DATABASE)
+    watermarks = WatermarkStore("state/watermarks.json")
+    assert watermarks.get(TEST_DATABASE, "movimentos") == "2024-01-20"
+
+    # Execução filtrada (ex.: data_inicio da API) grava só parte do histórico
+    make(data_inicio=date(2024, 1, 18)).execute_queries_for_database(TEST_DATABASE)
+    assert pq.read_table(f"data/{TEST_DATABASE}/movimentos.parquet").num_rows == 3
+    assert watermarks.get(TEST_DATABASE, "movimentos") is None
+
+    normal = make().execute_queries_for_database(TEST_DATABASE)
+
+    assert normal["details"][0].get("mode") is None
+    assert pq.read_table(f"data/{TEST_DATABASE}/movimentos.parquet").num_rows == 20
+    assert watermarks.get(TEST_DATABASE, "movimentos") == "2024-01-20"
+
+
+@pytest.mark.parametrize("statistics", [True, ["Valor"]])
+def test_max_value_uses_row_group_statistics_or_reads_column(tmp_path, statistics):
+    # Com statistics restrito a Valor, Data não tem min/max e a coluna é lida
+    table = pa.table({
+        "Data": [date(2024, 1, 3), date(2024, 1, 9), None, date(2024, 1, 5), None, None],
+        "Valor": [1, 2, 3, 4, 5, 6],
+    })
+    parquet_file = tmp_path / "movimentos.parquet"
+    pq.write_table(table, parquet_file, row_group_size=2, write_statistics=statistics)
+
+    assert SQLQuery._max_value_from_parquet(parquet_file, "Data") == "2024-01-09"
@@ -0,0 +1,187 @@
+"""Jobs da API: fila com exclusão por database, jobs equivalentes e retenção do histórico."""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.job_executor import ALL_DATABASES, JobExecutor
+from utils.job_store import JobStore
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), retention_days=7, max_jobs=3)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def executor(store):
+    executor = JobExecutor(store, max_concurrent_jobs=3)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+class Jobs:
+    """Jobs de teste que só terminam quando liberados, registrando quando iniciaram."""
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def _event(self, kind: str, job_id: str) -> threading.Event:
+        with self._lock:
+            return self._events.setdefault((kind, job_id), threading.Event())
+
+    def submit(self, executor: JobExecutor, job_id: str, database: str):
+        self.store.create(job_id, {"status": "pending", "started_at": datetime.now().isoformat()})
+        executor.submit(job_id, database, self.run, job_id=job_id)
+
+    def run(self, job_id: str):
+        self._event("started", job_id).set()
+        assert self._event("release", job_id).wait(TIMEOUT)
+        self.store.update(job_id, status="completed")
+
+    def has_started(self, job_id: str, timeout: float = TIMEOUT) -> bool:
+        return self._event("started", job_id).wait(timeout)
+
+    def finish(self, job_id: str):
+        self._event("release", job_id).set()
+
+
+def wait_idle(executor: JobExecutor):
+    deadline = datetime.now() + timedelta(seconds=TIMEOUT)
+    while executor.running_databases() or executor.queued_job_ids():
+        assert datetime.now() < deadline, "jobs não terminaram"
+        time.sleep(0.01)
+
+
+def test_same_database_runs_serially_and_different_databases_in_parallel(store, executor):
+    jobs = Jobs(store)
+    jobs.submit(executor, "a1", "DB_A")
+    jobs.submit(executor, "a2", "DB_A")
+    jobs.submit(executor, "b1", "DB_B")
+
+    assert jobs.has_started("a1")
+    assert jobs.has_started("b1")
+    assert not jobs.has_started("a2", timeout=0)
+    assert executor.queued_job_ids() == ["a2"]
+    assert executor.running_databases() == {"DB_A", "DB_B"}
+
+    jobs.finish("a1")
+    assert jobs.has_started("a2")
+    jobs.finish("a2")
+    jobs.finish("b1")
+    wait_idle(executor)
+    assert {store.get(job_id)["status"] for job_id in ("a1", "a2", "b1")} == {"completed"}
+
+
+def test_all_databases_job_waits_for_running_jobs_and_holds_later_ones(store, executor):
+    jobs = Jobs(store)
+    jobs.submit(executor, "a1", "DB_A")
+    assert jobs.has_started("a1")
+
+    # O pipeline completo conflita com qualquer job; o de DB_B chegou depois e espera por ele
+    jobs.submit(executor, "all", ALL_DATABASES)
+    jobs.submit(executor, "b1", "DB_B")
+    assert executor.queued_job_ids() == ["all", "b1"]
+
+    jobs.finish("a1")
+    assert jobs.has_started("all")
+    assert executor.queued_job_ids() == ["b1"]
+    assert not jobs.has_started("b1", timeout=0)
+
+    jobs.finish("all")
+    assert jobs.has_started("b1")
+    jobs.finish("b1")
+    wait_idle(executor)
+
+
+def test_unexpected_job_error_marks_job_failed_and_frees_the_database(store, executor):
+    def broken(job_id):
+        raise RuntimeError("falha inesperada")
+
+    store.create("broken", {"status": "pending", "started_at": datetime.now().isoformat()})
+    executor.submit("broken", "DB_A", broken, job_id="broken")
+    wait_idle(executor)
+
+    job = store.get("broken")
+    assert job["status"] == "failed"
+    assert job["error"] == "falha inesperada"
+
+    jobs = Jobs(store)
+    jobs.submit(executor, "a1", "DB_A")
+    assert jobs.has_started("a1")
+    jobs.finish("a1")
+    wait_idle(executor)
+
+
+def test_duplicate_submit_returns_the_existing_job(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOB_DB_FILE", str(tmp_path / "api_jobs.db"))
+    api = pytest.importorskip("api")
+    store = JobStore(str(tmp_path / "jobs.db"))
+    executor = JobExecutor(store, max_concurrent_jobs=2)
+    monkeypatch.setattr(api, "job_store", store)
+    monkeypatch.setattr(api, "job_executor", executor)
+    jobs = Jobs(store)
+
+    def submit(database, params):
+        job = {"status": "pending", "started_at": datetime.now().isoformat()}
+        job_id, _, reused = api.submit_job("pipeline", database, params, job, jobs.run, {})
+        return job_id, reused
+
+    try:
+        first, reused = submit("DB_A", {"upload_ftp": True})
+        assert not reused
+        assert jobs.has_started(first)
+
+        assert submit("DB_A", {"upload_ftp": True}) == (first, True)
+        other, reused = submit("DB_A", {"upload_ftp": False})
+        assert not reused and other != first
+        assert executor.queued_job_ids() == [other]
+
+        jobs.finish(first)
+        jobs.finish(other)
+        wait_idle(executor)
+
+        # Job equivalente já concluído não é reaproveitado
+        again, reused = submit("DB_A", {"upload_ftp": True})
+        assert not reused and again != first
+        jobs.finish(again)
+        wait_idle(executor)
+    finally:
+        executor.shutdown(wait=True)
+        store.close()
+
+
+def test_evict_removes_finished_jobs_past_retention_and_history_limit(store):
+    now = datetime.now()
+    for index in range(5):
+        store.create(f"recent{index}", {
+            "status": "completed", "started_at": (now - timedelta(minutes=index)).isoformat()
+        })
+    store.create("expired", {"status": "failed", "started_at": (now - timedelta(days=8)).isoformat()})
+    store.create("old_running", {"status": "running", "started_at": (now - timedelta(days=30)).isoformat()})
+
+    assert store.evict() == 3
+
+    # Os 3 finalizados mais recentes ficam; jobs ativos nunca são removidos
+    assert set(store.list()) == {"recent0", "recent1", "recent2", "old_running"}
+
+
+def test_fail_interrupted_marks_pending_and_running_jobs(store):
+    started_at = datetime.now().isoformat()
+    store.create("pending", {"status": "pending", "started_at": started_at})
+    store.create("running", {"status": "running", "started_at": started_at})
+    store.create("done", {"status": "completed", "started_at": started_at})
+
+    assert store.fail_interrupted() == 2
+
+    assert store.get("pending")["status"] == "failed"
+    assert store.get("running")["status"] == "failed"
+    assert store.get("done")["status"] == "completed"
@@ -0,0 +1,16 @@
+"""Métricas de upload exportadas no formato do Prometheus."""
+
+from utils.metrics import metrics, record_upload_metrics
+
+
+def test_upload_series_do_not_grow_with_each_file():
+    for index in range(3):
+        timing = record_upload_metrics("sftp", "teste_metricas", 2.0, 1000 + index, "success")
+        assert timing == {"seconds": 2.0, "bytes": 1000 + index, "bytes_per_sec": 500.0 + index / 2}
+
+    lines = [line for line in metrics.render().splitlines() if 'destination="teste_metricas"' in line]
+
+    assert not any("file=" in line for line in lines)
+    assert 'etl_upload_seconds_count{destination="teste_metricas",target="sftp"} 3' in lines
+    assert 'etl_upload_files_total{destination="teste_metricas",status="success",target="sftp"} 3.0' in lines
+    assert sum(line.startswith("etl_upload_bytes_per_second{") for line in lines) == 1
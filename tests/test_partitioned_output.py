@@ -0,0 +1,119 @@
+"""Saída particionada (hive) por ano/mês da coluna de data."""
+
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import TEST_DATABASE
+
+QUERY = """
+SELECT Data, Valor FROM movimentos
+WHERE (:data_inicio IS NULL OR Data >= :data_inicio)
+ORDER BY Data
+"""
+
+PARTITION = {"column": "Data", "by": ["year", "month"]}
+
+
+@pytest.fixture
+def movimentos(sqlite_db):
+    sqlite_db.execute("CREATE TABLE movimentos (Data DATE, Valor INTEGER)")
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, 1)", [
+        (date(2023, 12, 30),), (date(2024, 1, 5),), (date(2024, 1, 20),), (date(2024, 2, 1),),
+    ])
+
+
+def partitions(dataset_dir):
+    return sorted(path.relative_to(dataset_dir).as_posix()
+                  for path in dataset_dir.glob("year=*/month=*") if path.is_dir())
+
+
+@pytest.mark.parametrize("fetch_mode", ["pandas", "arrow"])
+def test_full_extraction_writes_one_directory_per_month(make_extractor, movimentos, tmp_path, fetch_mode):
+    extractor = make_extractor(
+        {"movimentos": QUERY},
+        queries={"movimentos": {"fetch_mode": fetch_mode, "partition": PARTITION}},
+        extraction={"default_days_back": None}
+    )
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["successful"] == 1, stats["errors"]
+    dataset_dir = tmp_path / "data" / TEST_DATABASE / "movimentos"
+    assert partitions(dataset_dir) == ["year=2023/month=12", "year=2024/month=1", "year=2024/month=2"]
+    table = ds.dataset(dataset_dir, format="parquet", partitioning="hive").to_table()
+    assert table.num_rows == 4
+    assert not (tmp_path / "data" / TEST_DATABASE / "movimentos.parquet").exists()
+
+
+def test_incremental_rewrites_only_affected_partitions(make_extractor, movimentos, sqlite_db, tmp_path):
+    def make():
+        return make_extractor(
+            {"movimentos": QUERY},
+            queries={"movimentos": {
+                "fetch_mode": "arrow",
+                "partition": PARTITION,
+                "incremental": {"enabled": True, "column": "Data", "lookback_days": 3},
+            }},
+            extraction={"default_days_back": None}
+        )
+
+    make().execute_queries_for_database(TEST_DATABASE)
+    dataset_dir = tmp_path / "data" / TEST_DATABASE / "movimentos"
+    untouched = dataset_dir / "year=2023" / "month=12" / "part-0.parquet"
+    before = untouched.stat().st_mtime_ns
+
+    sqlite_db.execute("UPDATE movimentos SET Valor = 2 WHERE Data = '2024-02-01'")
+    sqlite_db.execute("INSERT INTO movimentos VALUES ('2024-03-02', 2)")
+    stats = make().execute_queries_for_database(TEST_DATABASE)
+
+    detail = stats["details"][0]
+    assert detail["mode"] == "incremental"
+    assert partitions(dataset_dir)[-1] == "year=2024/month=3"
+    assert untouched.stat().st_mtime_ns == before
+    table = ds.dataset(dataset_dir, format="parquet", partitioning="hive").to_table()
+    values = dict(zip(table["Data"].to_pylist(), table["Valor"].to_pylist()))
+    assert values == {
+        date(2023, 12, 30): 1, date(2024, 1, 5): 1, date(2024, 1, 20): 1,
+        date(2024, 2, 1): 2, date(2024, 3, 2): 2,
+    }
+
+
+def test_incremental_drops_partitions_before_the_window(make_extractor, sqlite_db, tmp_path):
+    today = date.today()
+    sqlite_db.execute("CREATE TABLE movimentos (Data DATE, Valor INTEGER)")
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, 1)", [(today - timedelta(days=i),) for i in range(3)])
+
+    def make():
+        return make_extractor(
+            {"movimentos": QUERY},
+            queries={"movimentos": {
+                "fetch_mode": "arrow",
+                "partition": PARTITION,
+                "incremental": {"enabled": True, "column": "Data", "lookback_days": 1},
+            }},
+            extraction={"default_days_back": 100}
+        )
+
+    make().execute_queries_for_database(TEST_DATABASE)
+
+    # Partição de uma execução antiga, inteiramente anterior à janela de 100 dias
+    dataset_dir = tmp_path / "data" / TEST_DATABASE / "movimentos"
+    old_day = today - timedelta(days=400)
+    old_partition = dataset_dir / f"year={old_day.year}" / f"month={old_day.month}"
+    old_partition.mkdir(parents=True)
+    schema = ds.dataset(dataset_dir, format="parquet", partitioning="hive").schema
+    pq.write_table(
+        pa.table({"Data": [old_day], "Valor": [9]}).cast(pa.schema([schema.field("Data"), schema.field("Valor")])),
+        old_partition / "part-0.parquet"
+    )
+
+    stats = make().execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["details"][0]["mode"] == "incremental"
+    assert not old_partition.exists()
+    table = ds.dataset(dataset_dir, format="parquet", partitioning="hive").to_table()
+    assert sorted(table["Data"].to_pylist()) == sorted(today - timedelta(days=i) for i in range(3))
@@ -0,0 +1,42 @@
+"""Callback on_database_complete usado pelo pipeline com extração e upload sobrepostos."""
+
+from pathlib import Path
+
+import pytest
+
+from conftest import TEST_DATABASE
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_callback_receives_successful_query_count(make_extractor, sqlite_db, parallel):
+    sqlite_db.execute("CREATE TABLE itens (id INTEGER)")
+    sqlite_db.execute("INSERT INTO itens VALUES (1)")
+    extractor = make_extractor(
+        {"itens": "SELECT id FROM itens", "quebrada": "SELECT id FROM tabela_inexistente"},
+        extraction={"fetch_mode": "arrow"}
+    )
+    calls = []
+
+    extractor.execute_all_queries(
+        parallel=parallel, max_workers=2,
+        on_database_complete=lambda database, db_output_dir, successful: calls.append((database, successful))
+    )
+
+    assert calls == [(TEST_DATABASE, 1)]
+
+
+@pytest.mark.parametrize("fetch_mode", ["pandas", "stream", "arrow"])
+def test_callback_reports_database_without_successful_queries(make_extractor, sqlite_db, fetch_mode):
+    # Erro de query em qualquer modo conta como falha (nada de arquivo vazio para enviar)
+    extractor = make_extractor(
+        {"quebrada": "SELECT id FROM tabela_inexistente"},
+        extraction={"fetch_mode": fetch_mode}
+    )
+    calls = []
+
+    extractor.execute_all_queries(
+        on_database_complete=lambda database, db_output_dir, successful: calls.append((database, successful))
+    )
+
+    assert calls == [(TEST_DATABASE, 0)]
+    assert not Path(f"data/{TEST_DATABASE}/quebrada.parquet").exists()
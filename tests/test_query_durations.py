@@ -0,0 +1,60 @@
+"""Histórico de durações: registro das queries e despacho longest-first."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import TEST_DATABASE
+from utils.query_durations import QueryDurationStore
+
+
+def test_duration_store_error_does_not_fail_the_query(make_extractor, sqlite_db, monkeypatch):
+    sqlite_db.execute("CREATE TABLE itens (id INTEGER)")
+    sqlite_db.execute("INSERT INTO itens VALUES (1)")
+    extractor = make_extractor({"itens": "SELECT id FROM itens"})
+
+    def broken(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(QueryDurationStore, "record", broken)
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["successful"] == 1
+    assert stats["details"][0]["status"] == "success"
+
+
+def test_successful_queries_are_recorded(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE itens (id INTEGER)")
+    extractor = make_extractor(
+        {"itens": "SELECT id FROM itens", "falha": "SELECT * FROM inexistente"},
+        queries={"falha": {"fetch_mode": "arrow"}}
+    )
+
+    extractor.execute_queries_for_database(TEST_DATABASE)
+
+    durations = QueryDurationStore("state/query_durations.json").durations()
+    assert list(durations[TEST_DATABASE]) == ["itens"]
+
+
+def test_longest_expected_pairs_are_dispatched_first(make_extractor):
+    extractor = make_extractor({})
+    store = extractor._get_durations()
+    store.record("DB1", "vendas", 120)
+    store.record("DB1", "clientes", 5)
+    store.record("DB2", "clientes", 15)
+
+    pending = [("DB1", "clientes"), ("DB2", "vendas"), ("DB2", "clientes"), ("DB1", "estoque")]
+    ordered = extractor._order_longest_first(pending)
+
+    # DB2/vendas usa a média de vendas nos outros databases; estoque sem histórico vai primeiro
+    assert ordered == [("DB1", "estoque"), ("DB2", "vendas"), ("DB2", "clientes"), ("DB1", "clientes")]
+
+
+def test_records_from_separate_stores_are_not_lost(tmp_path):
+    state_file = str(tmp_path / "query_durations.json")
+
+    def record(index):
+        QueryDurationStore(state_file).record(f"DB{index}", "vendas", index)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record, range(20)))
+
+    assert len(QueryDurationStore(state_file).durations()) == 20
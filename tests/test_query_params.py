@@ -0,0 +1,94 @@
+"""Parâmetros nomeados dos templates SQL (:data_inicio, :empresas, :limite...)."""
+
+from datetime import date, timedelta
+
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import TEST_DATABASE
+from utils.sql_query import NO_ROW_LIMIT
+
+QUERY = """
+SELECT Empresa, Data FROM movimentos
+WHERE (:data_inicio IS NULL OR Data >= :data_inicio)
+  AND (:data_fim IS NULL OR Data <= :data_fim)
+  AND (:filtrar_empresas = 0 OR Empresa IN :empresas)
+ORDER BY Data, Empresa
+LIMIT :limite
+"""
+
+
+@pytest.fixture
+def movimentos(sqlite_db):
+    sqlite_db.execute("CREATE TABLE movimentos (Empresa TEXT, Data DATE)")
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, ?)", [
+        (empresa, date(2024, 1, day)) for day in range(1, 11) for empresa in ("01", "02", "03")
+    ])
+
+
+def test_defaults_bind_every_name_in_the_sql(make_extractor):
+    extractor = make_extractor({}, extraction={"default_days_back": 30, "params": {"empresas": [], "limite": None}})
+
+    params = extractor._query_params("movimentos", QUERY)
+
+    assert params == {
+        "data_inicio": date.today() - timedelta(days=30),
+        "data_fim": None,
+        "filtrar_empresas": 0,
+        "empresas": [],
+        "limite": NO_ROW_LIMIT,
+    }
+
+
+def test_run_overrides_take_precedence_over_query_and_extraction(make_extractor):
+    extractor = make_extractor(
+        {},
+        queries={"movimentos": {"params": {"empresas": ["01"], "limite": 10}}},
+        extraction={"params": {"empresas": ["09"], "data_inicio": "2023-01-01"}}
+    )
+    extractor.param_overrides = {"empresas": "02", "days_back": 5}
+
+    params = extractor._query_params("movimentos", QUERY)
+
+    assert params["empresas"] == ["02"]
+    assert params["filtrar_empresas"] == 1
+    assert params["limite"] == 10
+    # days_back da execução prevalece sobre a data_inicio fixa da configuração
+    assert params["data_inicio"] == date.today() - timedelta(days=5)
+
+
+def test_only_names_used_by_the_sql_are_returned(make_extractor):
+    extractor = make_extractor({})
+
+    assert extractor._query_params("produtos", "SELECT * FROM produtos") == {}
+    assert set(extractor._query_params("x", "SELECT * FROM t WHERE c <= :data_fim")) == {"data_fim"}
+
+
+def test_bound_params_filter_the_extraction(make_extractor, movimentos):
+    extractor = make_extractor(
+        {"movimentos": QUERY},
+        queries={"movimentos": {"fetch_mode": "arrow"}},
+        extraction={"default_days_back": None}
+    )
+    extractor.param_overrides = {
+        "data_inicio": "2024-01-03", "data_fim": "2024-01-06", "empresas": ["01", "03"], "limite": 5
+    }
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["successful"] == 1, stats["errors"]
+    table = pq.read_table(f"data/{TEST_DATABASE}/movimentos.parquet")
+    assert table["Empresa"].to_pylist() == ["01", "03", "01", "03", "01"]
+    assert table["Data"].to_pylist()[0] == date(2024, 1, 3)
+
+
+def test_empty_company_list_disables_the_filter(make_extractor, movimentos):
+    extractor = make_extractor(
+        {"movimentos": QUERY},
+        queries={"movimentos": {"fetch_mode": "arrow"}},
+        extraction={"default_days_back": None, "params": {"empresas": [], "limite": None}}
+    )
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["details"][0]["rows"] == 30
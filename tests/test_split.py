@@ -0,0 +1,88 @@
+"""Extração em faixas paralelas (split): limites das faixas e conexões."""
+
+from datetime import date, timedelta
+
+import pyarrow.parquet as pq
+
+from conftest import TEST_DATABASE
+
+QUERY = """
+SELECT Empresa, Data FROM movimentos
+WHERE (:data_inicio IS NULL OR Data >= :data_inicio)
+  AND (:data_fim IS NULL OR Data <= :data_fim)
+  AND (:filtrar_empresas = 0 OR Empresa IN :empresas)
+"""
+
+SPLIT_BY_MONTH = {"split": {"by": "month", "max_workers": 3}}
+
+
+def month_slices(make_extractor, **params):
+    extractor = make_extractor({}, queries={"movimentos": SPLIT_BY_MONTH})
+    base = {"data_inicio": None, "data_fim": None, "empresas": [], "filtrar_empresas": 0, "limite": 2 ** 63 - 1}
+    return extractor._query_slices("movimentos", extractor._query_config("movimentos"), {**base, **params})
+
+
+def test_month_slices_are_contiguous_and_bounded_by_data_fim(make_extractor):
+    slices = month_slices(make_extractor, data_inicio=date(2024, 1, 15), data_fim=date(2024, 3, 10))
+
+    assert [(s["data_inicio"], s["data_fim"]) for s in slices] == [
+        (date(2024, 1, 15), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 3, 1), date(2024, 3, 10)),
+    ]
+
+
+def test_last_month_slice_is_open_ended_without_data_fim(make_extractor):
+    start = (date.today().replace(day=1) - timedelta(days=40)).replace(day=1)
+
+    slices = month_slices(make_extractor, data_inicio=start)
+
+    assert slices[-1]["data_fim"] is None
+    assert slices[-1]["data_inicio"] == date.today().replace(day=1)
+    for previous, current in zip(slices, slices[1:]):
+        assert previous["data_fim"] + timedelta(days=1) == current["data_inicio"]
+
+
+def test_split_extraction_keeps_rows_dated_after_today(make_extractor, sqlite_db):
+    today = date.today()
+    days = [today - timedelta(days=70), today - timedelta(days=35), today, today + timedelta(days=45)]
+    sqlite_db.execute("CREATE TABLE movimentos (Empresa TEXT, Data DATE)")
+    sqlite_db.executemany("INSERT INTO movimentos VALUES ('01', ?)", [(day,) for day in days])
+    extractor = make_extractor(
+        {"movimentos": QUERY},
+        queries={"movimentos": {"fetch_mode": "arrow", **SPLIT_BY_MONTH}},
+        extraction={"default_days_back": 80}
+    )
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["successful"] == 1, stats["errors"]
+    table = pq.read_table(f"data/{TEST_DATABASE}/movimentos.parquet")
+    assert sorted(table["Data"].to_pylist()) == days
+
+
+def test_company_slices_write_every_company(make_extractor, sqlite_db):
+    sqlite_db.execute("CREATE TABLE movimentos (Empresa TEXT, Data DATE)")
+    sqlite_db.executemany("INSERT INTO movimentos VALUES (?, '2024-01-01')", [("01",), ("02",), ("02",), ("03",)])
+    extractor = make_extractor(
+        {"movimentos": QUERY},
+        queries={"movimentos": {"fetch_mode": "stream", "split": {"by": "empresas", "values": ["01", "02", "03"]}}},
+        extraction={"default_days_back": None}
+    )
+
+    stats = extractor.execute_queries_for_database(TEST_DATABASE)
+
+    assert stats["details"][0]["rows"] == 4
+
+
+def test_pool_fits_every_slice_of_concurrent_queries(make_extractor):
+    extractor = make_extractor({}, queries={"vendas": {"split": {"by": "month", "max_workers": 4}}})
+    extractor.config["execution"] = {"max_concurrent_queries": 6, "max_queries_per_database": 2}
+    extractor.config["connection"] = {"pool_size": 2, "max_overflow": 2}
+
+    pool = extractor._pool_config()
+
+    assert pool["pool_size"] + pool["max_overflow"] == 6
+
+    extractor.config["queries"] = {}
+    assert extractor._pool_config()["max_overflow"] == 2
@@ -0,0 +1,77 @@
+"""Manifesto de uploads: arquivos inalterados não são reenviados."""
+
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.ftp_uploader import ForecastFTPUploader
+from utils.upload_manifest import UploadManifest
+
+
+class FakeSFTP:
+    """Canal SFTP em memória: registra os envios e devolve o tamanho do arquivo local."""
+
+    def __init__(self):
+        self.dirs = set()
+        self.puts = []
+
+    def stat(self, path):
+        if path not in self.dirs:
+            raise FileNotFoundError(path)
+        return SimpleNamespace(st_mode=stat.S_IFDIR)
+
+    def mkdir(self, path):
+        self.dirs.add(path)
+
+    def put(self, local_path, remote_path):
+        self.puts.append(remote_path)
+        with open(local_path, "rb") as f:
+            return SimpleNamespace(st_size=len(f.read()))
+
+
+def make_uploader(tmp_path, sftp):
+    uploader = ForecastFTPUploader(manifest_file=str(tmp_path / "state" / "manifest.json"), max_channels=1)
+    uploader.sftp_client = sftp
+    uploader._connect = lambda: True
+    return uploader
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    files = []
+    for name, values in [("vendas", [1, 2]), ("estoque", [3])]:
+        path = tmp_path / f"{name}.parquet"
+        pq.write_table(pa.table({"x": values}), path)
+        files.append(str(path))
+    sftp = FakeSFTP()
+    uploader = make_uploader(tmp_path, sftp)
+
+    first = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+    assert sorted(first["uploaded_files"]) == ["estoque.parquet", "vendas.parquet"]
+
+    second = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+    assert second["uploaded_files"] == []
+    assert sorted(second["skipped_files"]) == ["estoque.parquet", "vendas.parquet"]
+
+    pq.write_table(pa.table({"x": [1, 2, 3]}), files[0])
+    third = uploader.upload_data("TESTE_BI", "data", files, skip_unchanged=True)
+    assert third["uploaded_files"] == ["vendas.parquet"]
+    assert third["skipped_files"] == ["estoque.parquet"]
+    assert len(sftp.puts) == 3
+
+
+def test_records_from_separate_manifests_are_not_lost(tmp_path):
+    manifest_file = str(tmp_path / "manifest.json")
+    fingerprint = {"sha256": "abc", "size": 1, "rows": 1}
+
+    def record(index):
+        UploadManifest(manifest_file).record("sftp://destino", f"arquivo{index}.parquet", fingerprint)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record, range(20)))
+
+    manifest = UploadManifest(manifest_file)
+    assert all(manifest.get("sftp://destino", f"arquivo{index}.parquet") for index in range(20))
+    assert list(tmp_path.iterdir()) == [tmp_path / "manifest.json"]
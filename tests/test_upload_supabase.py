@@ -0,0 +1,158 @@
+"""Uploads e downloads paralelos do Supabase, com manifesto e verificação de tamanho/eTag."""
+
+import hashlib
+import threading
+
+import pytest
+
+from utils import upload_supabase
+from utils.upload_supabase import SupabaseUploader
+
+BUCKET = "teste-bi"
+
+
+class FakeBucket:
+    """Bucket em memória: registra uploads e downloads."""
+
+    def __init__(self, objects=None, barrier=None):
+        self.objects = dict(objects or {})
+        self.uploads = []
+        self.downloads = []
+        self.barrier = barrier
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def upload(self, path, file, options):
+        if self.fail:
+            raise RuntimeError("503 Service Unavailable")
+        data = file if isinstance(file, bytes) else file.read()
+        if self.barrier:
+            # Só passa se os uploads estiverem em paralelo
+            self.barrier.wait()
+        with self._lock:
+            self.objects[path] = data
+            self.uploads.append(path)
+        return {"Key": f"{BUCKET}/{path}"}
+
+    def download(self, path):
+        with self._lock:
+            self.downloads.append(path)
+        return self.objects.get(path)
+
+    def list(self, folder=""):
+        return [
+            {"name": name, "metadata": {"size": len(data), "eTag": f'"{hashlib.md5(data).hexdigest()}"'}}
+            for name, data in sorted(self.objects.items())
+        ]
+
+
+class FakeClient:
+    def __init__(self, bucket):
+        self.storage = self
+        self.bucket = bucket
+
+    def from_(self, bucket_name):
+        assert bucket_name == BUCKET
+        return self.bucket
+
+
+@pytest.fixture
+def make_uploader(tmp_path, monkeypatch):
+    def make(bucket: FakeBucket) -> SupabaseUploader:
+        monkeypatch.setattr(upload_supabase, "create_client", lambda url, key: FakeClient(bucket))
+        return SupabaseUploader(
+            url="https://supabase.teste/", key="chave", manifest_file=str(tmp_path / "manifest.json")
+        )
+
+    return make
+
+
+def write_directory(directory):
+    files = {
+        "produtos.parquet": b"produtos",
+        "estoque.parquet": b"estoque",
+        "vendas/year=2024/month=1/part-0.parquet": b"vendas",
+    }
+    for name, data in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return files
+
+
+def test_directory_upload_is_parallel_and_skips_unchanged_files(make_uploader, tmp_path):
+    directory = tmp_path / "data"
+    files = write_directory(directory)
+    bucket = FakeBucket(barrier=threading.Barrier(3, timeout=5))
+    uploader = make_uploader(bucket)
+
+    first = uploader.upload_directory_parquet(str(directory), BUCKET, max_workers=3)
+
+    assert first["failed_files"] == []
+    assert sorted(first["successful_files"]) == sorted(files)
+    assert bucket.objects == files
+    assert sorted(first["timings"]) == sorted(files)
+
+    bucket.barrier = None
+    second = uploader.upload_directory_parquet(str(directory), BUCKET, max_workers=3)
+    assert second["successful_files"] == []
+    assert sorted(second["skipped_files"]) == sorted(files)
+
+    (directory / "estoque.parquet").write_bytes(b"estoque alterado")
+    third = uploader.upload_directory_parquet(str(directory), BUCKET, max_workers=3)
+    assert third["successful_files"] == ["estoque.parquet"]
+    assert len(bucket.uploads) == 4
+
+
+def test_failed_upload_is_not_recorded_in_the_manifest(make_uploader, tmp_path):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    (directory / "produtos.parquet").write_bytes(b"produtos")
+    bucket = FakeBucket()
+    uploader = make_uploader(bucket)
+    bucket.fail = True
+
+    failed = uploader.upload_directory_parquet(str(directory), BUCKET)
+    assert failed["failed_files"] == ["produtos.parquet"]
+
+    bucket.fail = False
+    retried = uploader.upload_directory_parquet(str(directory), BUCKET)
+    assert retried["successful_files"] == ["produtos.parquet"]
+
+
+def test_download_skips_current_copies_and_refetches_on_etag_mismatch(make_uploader, tmp_path):
+    bucket = FakeBucket({
+        "atual.parquet": b"conteudo atual",
+        "alterado.parquet": b"conteudo novo!",
+        "novo.parquet": b"novo",
+    })
+    local = tmp_path / "downloads"
+    local.mkdir()
+    (local / "atual.parquet").write_bytes(b"conteudo atual")
+    # Mesmo tamanho do remoto, conteúdo diferente: só o eTag revela a diferença
+    (local / "alterado.parquet").write_bytes(b"conteudo velho")
+    uploader = make_uploader(bucket)
+
+    result = uploader.download_directory_parquet(BUCKET, str(local), max_workers=3)
+
+    assert result["skipped_files"] == ["atual.parquet"]
+    assert sorted(result["successful_files"]) == ["alterado.parquet", "novo.parquet"]
+    assert sorted(bucket.downloads) == ["alterado.parquet", "novo.parquet"]
+    assert (local / "alterado.parquet").read_bytes() == b"conteudo novo!"
+    assert not list(local.glob("*.tmp"))
+
+
+@pytest.mark.parametrize("local_data, metadata, expected", [
+    (b"abc", {"size": 3, "eTag": f'"{hashlib.md5(b"abc").hexdigest()}"'}, True),
+    (b"abd", {"size": 3, "eTag": f'"{hashlib.md5(b"abc").hexdigest()}"'}, False),
+    (b"abcd", {"size": 3}, False),
+    # eTag de upload multipart não é MD5 do conteúdo: vale só o tamanho
+    (b"abc", {"contentLength": 3, "eTag": '"d41d8cd98f00b204e9800998ecf8427e-2"'}, True),
+    (b"abc", {}, False),
+])
+def test_local_copy_is_current_only_if_size_and_etag_match(tmp_path, local_data, metadata, expected):
+    local_path = tmp_path / "arquivo.parquet"
+    local_path.write_bytes(local_data)
+
+    assert SupabaseUploader._is_local_copy_current({"metadata": metadata}, str(local_path)) is expected
+    assert SupabaseUploader._is_local_copy_current({"metadata": metadata}, str(tmp_path / "x")) is False
@@ -0,0 +1,198 @@
+"""
+Otimização de Tipos dos DataFrames Extraídos
+Converte strings de baixa cardinalidade em categóricas e ajusta inteiros e Decimals aos
+tipos declarados no SQL (metadados do cursor), de modo que o schema gravado não dependa
+dos valores de cada execução
+"""
+
+import decimal
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+
+DEFAULT_OPTIONS = {
+    "enabled": True,
+    "category_max_unique": 1000,   # Máximo de valores distintos para virar categórica
+    "category_max_ratio": 0.5,     # Máximo de distintos / linhas não nulas
+    "downcast_integers": True,     # Inteiros na largura declarada no SQL (int16/int32/int64)
+    "decimals": "float",           # float = float64 | fixed = decimal Arrow (pd.ArrowDtype)
+}
+
+# Precisão máxima do decimal128 do Arrow
+MAX_DECIMAL_PRECISION = 38
+
+# Menor inteiro com sinal que comporta N dígitos decimais (tinyint, de 0 a 255, fica em int16)
+INTEGER_TYPES_BY_DIGITS = [(4, pa.int16()), (9, pa.int32()), (18, pa.int64())]
+
+# Largura dos inteiros do SQL Server pela precisão informada pelo ODBC
+INTEGER_TYPES_BY_PRECISION = {3: pa.int16(), 5: pa.int16(), 10: pa.int32(), 19: pa.int64()}
+
+
+def _integer_type_for_digits(digits: int) -> Optional[pa.DataType]:
+    """Menor inteiro Arrow que comporta qualquer valor com até N dígitos."""
+    for max_digits, arrow_type in INTEGER_TYPES_BY_DIGITS:
+        if digits <= max_digits:
+            return arrow_type
+    return None
+
+
+def column_types_from_cursor(description) -> Dict[str, pa.DataType]:
+    """
+    Tipos declarados das colunas numéricas, a partir de cursor.description (PEP 249).
+
+    - inteiros: largura pela precisão da coluna (tinyint/smallint → int16,
+      int → int32, bigint → int64)
+    - Decimal: decimal128(precisão, escala) da coluna
+
+    Colunas sem metadados suficientes ficam de fora (e não têm o tipo alterado).
+
+    Returns:
+        Dicionário {coluna: tipo Arrow}
+    """
+    types = {}
+    for column in description or []:
+        name, type_code, precision, scale = column[0], column[1], column[4], column[5]
+        if type_code is int:
+            types[name] = INTEGER_TYPES_BY_PRECISION.get(precision, pa.int64())
+        elif type_code is decimal.Decimal and precision and 0 < precision <= MAX_DECIMAL_PRECISION:
+            types[name] = pa.decimal128(precision, scale or 0)
+    return types
+
+
+def _resolve_options(options: Optional[dict]) -> dict:
+    """Opções completas (ausentes usam DEFAULT_OPTIONS), com o modo de decimais validado."""
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    if options["decimals"] not in ("fixed", "float"):
+        raise ValueError(f"Modo de decimais não suportado: {options['decimals']}")
+    return options
+
+
+def decimal_arrow_type(declared: pa.DataType, options: Optional[dict] = None) -> pa.DataType:
+    """
+    Tipo gravado para uma coluna Decimal declarada no SQL.
+
+    Regra única dos modos pandas e stream/arrow, para que gravem o mesmo schema:
+    escala 0 → menor inteiro que comporta a precisão (downcast_integers), demais
+    → float64 ('float') ou o próprio decimal128 declarado ('fixed').
+
+    Args:
+        declared: decimal128(precisão, escala) da coluna (ver column_types_from_cursor)
+        options: Opções (ver DEFAULT_OPTIONS); ausentes usam o padrão
+
+    Returns:
+        Tipo Arrow da coluna gravada (o declarado quando a otimização está desligada)
+    """
+    options = _resolve_options(options)
+    if not options["enabled"]:
+        return declared
+    integer_type = _integer_type_for_digits(declared.precision) if declared.scale == 0 else None
+    if integer_type is not None and options["downcast_integers"]:
+        return integer_type
+    if options["decimals"] == "float":
+        return pa.float64()
+    return declared
+
+
+def _to_integer(series: pd.Series, arrow_type: pa.DataType) -> pd.Series:
+    """Converte para o inteiro indicado (nullable Int quando há nulos)."""
+    if series.dtype == object:
+        series = series.map(int, na_action="ignore")
+    bits = arrow_type.bit_width
+    return series.astype(f"int{bits}" if series.notna().all() else f"Int{bits}")
+
+
+def _to_fixed_decimal(series: pd.Series, decimal_type: pa.DataType) -> pd.Series:
+    """Converte para pd.ArrowDtype(decimal128) com a precisão/escala declaradas."""
+    values = pa.array(series.tolist(), from_pandas=True)
+    return pd.Series(pd.arrays.ArrowExtensionArray(values.cast(decimal_type)), index=series.index)
+
+
+def _object_kind(series: pd.Series) -> Optional[str]:
+    """Identifica colunas object homogêneas: 'string', 'decimal' ou None."""
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    return kind if kind in ("string", "decimal") else None
+
+
+def optimize_dtypes(df: pd.DataFrame, options: Optional[dict] = None,
+                    column_types: Optional[Dict[str, pa.DataType]] = None,
+                    measure_memory: bool = False) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Otimiza os tipos das colunas de um DataFrame extraído.
+
+    - strings com poucos valores distintos → category
+    - inteiros → largura declarada no SQL; Decimals de escala 0 → menor inteiro
+      que comporta a precisão declarada
+    - demais Decimals → float64 ('float', padrão) ou pd.ArrowDtype(decimal128) com a
+      precisão/escala declaradas ('fixed'); sem metadados da coluna, float64
+
+    Os tipos numéricos vêm só dos metadados (column_types), nunca dos valores, para
+    que execuções e databases diferentes gravem o mesmo schema.
+
+    Args:
+        df: DataFrame extraído (Decimals preservados como objetos)
+        options: Opções (ver DEFAULT_OPTIONS); ausentes usam o padrão
+        column_types: Tipos declarados das colunas (ver column_types_from_cursor)
+        measure_memory: Medir a memória antes/depois (memory_usage deep, custa uma passada nas strings)
+
+    Returns:
+        Tupla (DataFrame otimizado, resumo com as colunas convertidas e a memória antes/depois)
+    """
+    options = _resolve_options(options)
+    column_types = column_types or {}
+    summary = {"categorical": [], "integer": [], "decimal": [], "memory_before": None, "memory_after": None}
+    if not options["enabled"] or df.empty:
+        return df, summary
+
+    if measure_memory:
+        summary["memory_before"] = int(df.memory_usage(deep=True).sum())
+    converted = {}
+
+    for column in df.columns:
+        series = df[column]
+        declared = column_types.get(column)
+
+        if declared is not None and pa.types.is_integer(declared):
+            if options["downcast_integers"]:
+                converted[column] = _to_integer(series, declared)
+                summary["integer"].append(column)
+            continue
+
+        if declared is not None and pa.types.is_decimal(declared):
+            target = decimal_arrow_type(declared, options)
+            if pa.types.is_integer(target):
+                converted[column] = _to_integer(series, target)
+                summary["integer"].append(column)
+            elif pa.types.is_floating(target):
+                converted[column] = series.astype("float64")
+                summary["decimal"].append(column)
+            else:
+                converted[column] = _to_fixed_decimal(series, declared)
+                summary["decimal"].append(column)
+            continue
+
+        if isinstance(series.dtype, pd.StringDtype):
+            kind = "string"  # pandas >= 3: strings chegam com dtype 'str'
+        elif series.dtype == object:
+            kind = _object_kind(series)
+        else:
+            continue
+
+        if kind == "string":
+            non_null = series.notna().sum()
+            unique = series.nunique(dropna=True)
+            if unique <= options["category_max_unique"] and unique <= non_null * options["category_max_ratio"]:
+                converted[column] = series.astype("category")
+                summary["categorical"].append(column)
+
+        elif kind == "decimal":
+            # Sem precisão/escala declaradas não há decimal fixo estável entre execuções
+            converted[column] = series.astype("float64")
+            summary["decimal"].append(column)
+
+    if converted:
+        df = df.assign(**converted)
+    if measure_memory:
+        summary["memory_after"] = int(df.memory_usage(deep=True).sum())
+    return df, summary
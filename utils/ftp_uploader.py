@@ -6,35 +6,139 @@ Envia automaticamente os CSVs para o servidor SFTP na estrutura ai/{database}/{t
 import paramiko
 import os
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import stat
 
+from utils.metrics import record_upload_metrics
+from utils.upload_manifest import UploadManifest
+
 
 class ForecastFTPUploader:
     """Classe simplificada para upload dos resultados de forecasting."""
     
+    # Sessão SFTP compartilhada pelo processo (fase de upload e jobs da API), com
+    # contagem de usuários: o encerramento espera o último upload em andamento
+    _shared_instance = None
+    _shared_users = 0
+    _shared_closing = False
+    _shared_lock = threading.Lock()
+    
     def __init__(self, host: str = "192.168.49.30", port: int = 8887, 
-                 username: str = "sftp_ia01", password: str = "#6U9Fv@C!Yk6VqNbaM8B"):
+                 username: str = "sftp_ia01", password: str = "#6U9Fv@C!Yk6VqNbaM8B",
+                 manifest_file: str = "state/upload_manifest.json",
+                 max_channels: int = 4, keepalive_interval: int = 30):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        # Canais SFTP simultâneos sobre o mesmo transporte SSH (1 = sequencial)
+        self.max_channels = max(1, int(max_channels))
+        self.keepalive_interval = keepalive_interval
+        self._connection_lock = threading.RLock()
+        # Diretórios remotos já confirmados nesta sessão
+        self._known_dirs = set()
+        self._known_dirs_lock = threading.Lock()
         self.ssh_client = None
         self.sftp_client = None
         self._connected = False
+        self.manifest = UploadManifest(manifest_file)
+    
+    @classmethod
+    def shared(cls, **kwargs) -> "ForecastFTPUploader":
+        """
+        Retorna a sessão SFTP compartilhada do processo, criando-a no primeiro uso.
+        
+        A conexão é mantida aberta (keepalive) entre databases e entre jobs da API,
+        e é refeita automaticamente se o transporte cair. Cada chamada registra um
+        usuário da sessão, que deve ser liberado com release_shared() ao terminar.
+        
+        Args:
+            **kwargs: Parâmetros do construtor (usados apenas na criação)
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls(**kwargs)
+            cls._shared_users += 1
+            return cls._shared_instance
+    
+    @classmethod
+    def release_shared(cls):
+        """Libera um usuário da sessão compartilhada (encerra se o fechamento estiver pendente)."""
+        with cls._shared_lock:
+            cls._shared_users = max(0, cls._shared_users - 1)
+            if cls._shared_users == 0 and cls._shared_closing:
+                cls._close_shared_locked()
+    
+    @classmethod
+    def close_shared(cls):
+        """
+        Encerra a sessão SFTP compartilhada (ex.: no shutdown da API).
+        
+        Com uploads em andamento, o encerramento fica pendente até o último
+        usuário liberar a sessão.
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                return
+            if cls._shared_users:
+                print(f"⏳ Sessão SFTP em uso por {cls._shared_users} upload(s); encerrando ao final")
+                cls._shared_closing = True
+            else:
+                cls._close_shared_locked()
+    
+    @classmethod
+    def _close_shared_locked(cls):
+        """Desconecta e descarta a sessão compartilhada (chamado com _shared_lock)."""
+        cls._shared_instance.disconnect()
+        cls._shared_instance = None
+        cls._shared_closing = False
+    
+    def _is_alive(self) -> bool:
+        """Verifica a conexão pelo estado do transporte SSH e do canal principal, sem round-trip ao servidor."""
+        if not (self._connected and self.sftp_client and self.ssh_client):
+            return False
+        transport = self.ssh_client.get_transport()
+        channel = self.sftp_client.get_channel()
+        return transport is not None and transport.is_active() and channel is not None and not channel.closed
     
     def _connect(self) -> bool:
-        """Conecta ao servidor SFTP."""
-        try:
-            if self._connected and self.sftp_client:
-                # Testa se a conexão ainda está ativa
-                try:
-                    self.sftp_client.listdir('.')
+        """Conecta ao servidor SFTP (reaproveita a conexão se o transporte estiver ativo)."""
+        with self._connection_lock:
+            if self._is_alive():
+                return True
+            if self._connected:
+                if self._reopen_main_channel():
                     return True
-                except:
-                    self._disconnect()
-            
+                # Transporte caiu: os canais sobre ele já estão fechados
+                print("🔄 Conexão SFTP perdida, reconectando...")
+                self._disconnect()
+            return self._open_connection()
+    
+    def _reopen_main_channel(self) -> bool:
+        """
+        Reabre apenas o canal SFTP principal quando o transporte SSH continua ativo.
+        
+        O transporte não é fechado: na sessão compartilhada ele pode ter canais de
+        outros uploads em uso (chamado com _connection_lock).
+        """
+        transport = self.ssh_client.get_transport() if self.ssh_client else None
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            self.sftp_client = paramiko.SFTPClient.from_transport(transport)
+            print("🔄 Canal SFTP principal reaberto")
+            return True
+        except Exception as e:
+            print(f"⚠️ Não foi possível reabrir o canal SFTP: {e}")
+            return False
+    
+    def _open_connection(self) -> bool:
+        """Abre a conexão SSH e o canal SFTP principal."""
+        try:
             print(f"🔗 Conectando ao SFTP {self.host}:{self.port}")
             
             self.ssh_client = paramiko.SSHClient()
@@ -50,6 +154,10 @@ class ForecastFTPUploader:
                 allow_agent=False
             )
             
+            # Keepalive mantém a sessão aberta entre databases e jobs
+            if self.keepalive_interval:
+                self.ssh_client.get_transport().set_keepalive(self.keepalive_interval)
+            
             self.sftp_client = self.ssh_client.open_sftp()
             self._connected = True
             print("✅ Conectado ao SFTP com sucesso")
@@ -76,47 +184,102 @@ class ForecastFTPUploader:
         self.ssh_client = None
         self.sftp_client = None
         self._connected = False
+        with self._known_dirs_lock:
+            self._known_dirs.clear()
+    
+    def _remote_dir_exists(self, remote_path: str) -> bool:
+        """Verifica se um diretório remoto existe com um único stat (sem listar o conteúdo)."""
+        try:
+            return stat.S_ISDIR(self.sftp_client.stat(remote_path).st_mode)
+        except FileNotFoundError:
+            return False
     
     def _ensure_directory(self, remote_path: str) -> bool:
-        """Garante que o diretório remoto existe."""
+        """Garante que o diretório remoto existe (com cache dos diretórios da sessão)."""
+        remote_path = remote_path.strip('/') if remote_path else remote_path
         if not remote_path or remote_path in ['.', '/']:
             return True
-            
-        try:
-            # Verifica se já existe
-            try:
-                self.sftp_client.listdir(remote_path)
+        
+        with self._known_dirs_lock:
+            if remote_path in self._known_dirs:
                 return True
-            except FileNotFoundError:
-                pass
-            
-            # Cria recursivamente
-            dirs = remote_path.strip('/').split('/')
-            current_path = ''
+        
+        try:
+            dirs = [d for d in remote_path.split('/') if d]
+            prefixes = ['/'.join(dirs[:i]) for i in range(1, len(dirs) + 1)]
             
-            for dir_name in dirs:
-                if not dir_name:
-                    continue
-                
-                current_path += f'/{dir_name}' if current_path else dir_name
-                
-                try:
-                    self.sftp_client.listdir(current_path)
-                except FileNotFoundError:
-                    try:
-                        self.sftp_client.mkdir(current_path)
-                        print(f"📁 Criado diretório: {current_path}")
-                    except:
-                        pass
+            # Caminho completo já existe: um único stat confirma todos os níveis
+            if not self._remote_dir_exists(remote_path):
+                for current_path in prefixes:
+                    with self._known_dirs_lock:
+                        if current_path in self._known_dirs:
+                            continue
+                    
+                    if current_path == remote_path or not self._remote_dir_exists(current_path):
+                        try:
+                            self.sftp_client.mkdir(current_path)
+                            print(f"📁 Criado diretório: {current_path}")
+                        except IOError:
+                            # Pode ter sido criado por outro upload em paralelo
+                            if not self._remote_dir_exists(current_path):
+                                raise
+                    
+                    with self._known_dirs_lock:
+                        self._known_dirs.add(current_path)
             
+            with self._known_dirs_lock:
+                self._known_dirs.update(prefixes)
             return True
             
         except Exception as e:
             print(f"❌ Erro ao criar diretório {remote_path}: {e}")
             return False
     
+    def _open_channels(self, count: int) -> List[paramiko.SFTPClient]:
+        """
+        Abre canais SFTP adicionais sobre o transporte SSH já autenticado.
+        
+        Args:
+            count: Número total de canais desejado (inclui o canal principal)
+            
+        Returns:
+            Lista de canais SFTP (o primeiro é sempre o canal principal)
+        """
+        channels = [self.sftp_client]
+        transport = self.ssh_client.get_transport() if self.ssh_client else None
+        
+        for _ in range(count - 1):
+            try:
+                channels.append(paramiko.SFTPClient.from_transport(transport))
+            except Exception as e:
+                print(f"⚠️ Não foi possível abrir canal SFTP adicional: {e}")
+                break
+        
+        return channels
+    
+    def _put_file(self, sftp: paramiko.SFTPClient, file_path: str, filename: str,
+                  remote_path: str) -> Tuple[str, Optional[int]]:
+        """
+        Envia um arquivo por um canal SFTP e verifica o tamanho remoto.
+        
+        Returns:
+            Tupla (status, tamanho remoto): status 'verified' ou 'failed'
+        """
+        try:
+            print(f"📤 Upload: {filename} → {remote_path}")
+            # put() faz o stat remoto (confirm=True) e levanta IOError se o tamanho diferir
+            attrs = sftp.put(file_path, remote_path)
+            print(f"✅ Upload verificado: {filename}")
+            return 'verified', attrs.st_size
+            
+        except Exception as e:
+            print(f"❌ Erro no upload de {filename}: {e}")
+            time.sleep(0.5)  # Pequena pausa antes de continuar
+            return 'failed', None
+    
     def upload_data(self, database_name: str, forecast_type: str, 
-                               file_paths: List[str]) -> Dict[str, Any]:
+                               file_paths: List[str], local_base_dir: Optional[str] = None,
+                               skip_unchanged: bool = False) -> Dict[str, Any]:
         """
         Faz upload dos resultados de forecasting.
         
@@ -124,6 +287,11 @@ class ForecastFTPUploader:
             database_name: Nome do database (ex: '001RR_BI')
             forecast_type: Tipo do forecast ('vendas' ou 'volume')
             file_paths: Lista de caminhos dos arquivos locais
+            local_base_dir: Diretório base local; se informado, o caminho relativo
+                            (ex.: datasets particionados vendas/year=2024/...) é
+                            preservado no destino
+            skip_unchanged: Pular arquivos cujo hash é igual ao do último upload
+                            bem-sucedido para o mesmo destino (manifesto local)
             
         Returns:
             Dict com resultado do upload
@@ -148,6 +316,9 @@ class ForecastFTPUploader:
         
         uploaded_files = []
         failed_files = []
+        skipped_files = []
+        pending = []
+        manifest_target = f"sftp://{self.host}:{self.port}/{remote_folder}"
         
         for file_path in file_paths:
             if not Path(file_path).exists():
@@ -155,39 +326,86 @@ class ForecastFTPUploader:
                 failed_files.append(file_path)
                 continue
             
-            filename = Path(file_path).name
+            if local_base_dir:
+                filename = Path(file_path).relative_to(local_base_dir).as_posix()
+            else:
+                filename = Path(file_path).name
             remote_path = f"{remote_folder}/{filename}"
             
+            # Arquivo inalterado desde o último upload bem-sucedido (hash só quando vai comparar)
+            fingerprint = self.manifest.fingerprint(file_path) if skip_unchanged else None
+            if fingerprint and self.manifest.is_unchanged(manifest_target, filename, fingerprint):
+                print(f"⏭️  Sem alteração: {filename}")
+                skipped_files.append(filename)
+                continue
+            
+            # Subpastas (datasets particionados)
+            if '/' in filename and not self._ensure_directory(remote_path.rsplit('/', 1)[0]):
+                failed_files.append(file_path)
+                continue
+            
+            pending.append((file_path, filename, remote_path, fingerprint))
+        
+        # Upload em paralelo: cada worker usa um canal SFTP próprio do pool
+        channels = self._open_channels(min(self.max_channels, len(pending))) if pending else []
+        channel_pool = queue.Queue()
+        for channel in channels:
+            channel_pool.put(channel)
+        
+        def upload_one(item):
+            file_path, filename, remote_path, _ = item
+            sftp = channel_pool.get()
             try:
-                print(f"📤 Upload: {filename} → {remote_path}")
-                self.sftp_client.put(file_path, remote_path)
-                
-                # Verifica se upload foi bem sucedido
+                start = time.perf_counter()
+                status, size = self._put_file(sftp, file_path, filename, remote_path)
+                return status, size, time.perf_counter() - start
+            finally:
+                channel_pool.put(sftp)
+        
+        try:
+            if len(channels) > 1:
+                print(f"🔀 Upload paralelo com {len(channels)} canais SFTP")
+                with ThreadPoolExecutor(max_workers=len(channels)) as executor:
+                    results = list(executor.map(upload_one, pending))
+            else:
+                results = [upload_one(item) for item in pending]
+        finally:
+            # Fecha apenas os canais adicionais; o principal continua aberto
+            for channel in channels[1:]:
                 try:
-                    local_size = Path(file_path).stat().st_size
-                    remote_stat = self.sftp_client.stat(remote_path)
-                    
-                    if remote_stat.st_size == local_size:
-                        print(f"✅ Upload verificado: {filename}")
-                        uploaded_files.append(filename)
-                    else:
-                        print(f"⚠️ Tamanho diferente: {filename}")
-                        uploaded_files.append(filename)  # Considera como sucesso
-                        
+                    channel.close()
                 except:
-                    print(f"✅ Upload concluído: {filename}")
-                    uploaded_files.append(filename)
-                    
-            except Exception as e:
-                print(f"❌ Erro no upload de {filename}: {e}")
+                    pass
+        
+        # Transporte caiu durante o envio: reconecta e reenvia os arquivos que falharam
+        retry = [i for i, (status, _, _) in enumerate(results) if status == 'failed']
+        if retry and not self._is_alive() and self._connect():
+            print(f"🔁 Reenviando {len(retry)} arquivo(s) após reconexão")
+            for i in retry:
+                file_path, filename, remote_path, _ = pending[i]
+                start = time.perf_counter()
+                status, size = self._put_file(self.sftp_client, file_path, filename, remote_path)
+                results[i] = (status, size, results[i][2] + time.perf_counter() - start)
+        
+        timings = {}
+        for (file_path, filename, _, fingerprint), (status, _, elapsed) in zip(pending, results):
+            timings[filename] = record_upload_metrics(
+                "sftp", remote_folder, elapsed, os.path.getsize(file_path),
+                "failed" if status == 'failed' else "success"
+            )
+            if status == 'failed':
                 failed_files.append(file_path)
-                time.sleep(0.5)  # Pequena pausa antes de continuar
+                continue
+            uploaded_files.append(filename)
+            self.manifest.record(manifest_target, filename, fingerprint or self.manifest.fingerprint(file_path))
         
         success = len(failed_files) == 0
         total_files = len(file_paths)
         success_count = len(uploaded_files)
         
         message = f"Upload {forecast_type}: {success_count}/{total_files} arquivos"
+        if skipped_files:
+            message += f" ({len(skipped_files)} sem alteração)"
         if database_name:
             message += f" para ai/{database_name}/{forecast_type}/"
         
@@ -196,7 +414,9 @@ class ForecastFTPUploader:
             'message': message,
             'uploaded_files': uploaded_files,
             'failed_files': failed_files,
-            'remote_path': remote_folder
+            'skipped_files': skipped_files,
+            'remote_path': remote_folder,
+            'timings': timings
         }
     
     def disconnect(self):
@@ -0,0 +1,120 @@
+"""
+Executor de Jobs da API
+Executa os jobs em um pool limitado de threads, com fila e exclusão mútua por database
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+
+from utils.job_store import JobStore
+
+
+# Chave de "database" dos jobs que abrangem todos os databases (pipeline completo)
+ALL_DATABASES = "*"
+
+
+class JobExecutor:
+    """
+    Fila de jobs com limite de concorrência.
+
+    Um job só inicia quando há vaga no pool e nenhum job em execução usa o mesmo
+    database; jobs de todos os databases (ALL_DATABASES) conflitam com qualquer outro.
+    Jobs bloqueados continuam na fila, na ordem de chegada; um pipeline completo
+    aguardando vaga segura os jobs que chegaram depois dele.
+    """
+
+    def __init__(self, store: JobStore, max_concurrent_jobs: int = 2):
+        """
+        Args:
+            store: Armazenamento persistente dos jobs
+            max_concurrent_jobs: Número máximo de jobs executando ao mesmo tempo
+        """
+        self.store = store
+        self.max_concurrent_jobs = max(1, int(max_concurrent_jobs))
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_jobs, thread_name_prefix="etl-job"
+        )
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._running_databases: List[str] = []
+        self._shutdown = False
+
+    def submit(self, job_id: str, database: Optional[str], func: Callable, /, **kwargs):
+        """
+        Enfileira um job.
+
+        Args:
+            job_id: ID do job (já registrado no store)
+            database: Database usado pelo job (ALL_DATABASES para todos)
+            func: Função do job, chamada com **kwargs
+        """
+        with self._lock:
+            self._pending.append((job_id, database or ALL_DATABASES, func, kwargs))
+            self._dispatch()
+
+    def _conflicts(self, database: str) -> bool:
+        """Verifica se o database conflita com algum job em execução."""
+        if not self._running_databases:
+            return False
+        if database == ALL_DATABASES or ALL_DATABASES in self._running_databases:
+            return True
+        return database in self._running_databases
+
+    def _dispatch(self):
+        """Inicia os jobs da fila que cabem no pool e não conflitam; chamado com o lock."""
+        if self._shutdown:
+            return
+
+        index = 0
+        while index < len(self._pending) and len(self._running_databases) < self.max_concurrent_jobs:
+            job_id, database, func, kwargs = self._pending[index]
+            if self._conflicts(database):
+                if database == ALL_DATABASES:
+                    # Jobs posteriores esperam, para não adiar indefinidamente o pipeline completo
+                    break
+                index += 1
+                continue
+
+            self._pending.pop(index)
+            self._running_databases.append(database)
+            self._pool.submit(self._run, job_id, database, func, kwargs)
+
+    def _run(self, job_id: str, database: str, func: Callable, kwargs: dict):
+        """Executa um job e libera sua vaga ao final."""
+        try:
+            func(**kwargs)
+        except Exception as e:
+            # As funções de job tratam seus erros; isto cobre falhas inesperadas
+            self.store.update(
+                job_id, status="failed", error=str(e), completed_at=datetime.now().isoformat()
+            )
+        finally:
+            with self._lock:
+                self._running_databases.remove(database)
+                self._dispatch()
+            try:
+                self.store.evict()
+            except Exception as e:
+                print(f"⚠️ Erro ao limpar histórico de jobs: {e}")
+
+    def queued_job_ids(self) -> List[str]:
+        """IDs dos jobs aguardando na fila, na ordem de execução."""
+        with self._lock:
+            return [job_id for job_id, _, _, _ in self._pending]
+
+    def running_databases(self) -> Set[str]:
+        """Databases com jobs em execução."""
+        with self._lock:
+            return set(self._running_databases)
+
+    def shutdown(self, wait: bool = False):
+        """
+        Para de iniciar novos jobs. Jobs ainda na fila permanecem 'pending' no store
+        e são marcados como 'failed' no próximo startup.
+        """
+        with self._lock:
+            self._shutdown = True
+            self._pending.clear()
+        self._pool.shutdown(wait=wait)
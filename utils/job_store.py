@@ -0,0 +1,150 @@
+"""
+Armazenamento Persistente de Jobs da API
+Guarda os jobs (status, parâmetros e resultados) em SQLite, com retenção e limite de histórico
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+
+class JobStore:
+    """Persistência dos jobs em SQLite: {job_id: dados do job em JSON}."""
+
+    def __init__(self, db_file: str = "state/jobs.db", retention_days: int = 7,
+                 max_jobs: int = 500):
+        """
+        Args:
+            db_file: Caminho do banco SQLite
+            retention_days: Dias que jobs finalizados são mantidos
+            max_jobs: Número máximo de jobs finalizados mantidos no histórico
+        """
+        self.db_file = Path(db_file)
+        self.retention_days = retention_days
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    started_at TEXT NOT NULL,
+                    completed_at TEXT,
+                    data TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_started_at ON jobs (started_at)")
+
+    def _save(self, job_id: str, job: Dict[str, Any]):
+        """Grava (insere ou substitui) um job; deve ser chamado com o lock."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, started_at, completed_at, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    job["status"],
+                    job["started_at"],
+                    job.get("completed_at"),
+                    json.dumps(job, default=str, ensure_ascii=False)
+                )
+            )
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Lê um job; deve ser chamado com o lock."""
+        row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create(self, job_id: str, job: Dict[str, Any]):
+        """Registra um novo job."""
+        with self._lock:
+            self._save(job_id, job)
+
+    def update(self, job_id: str, **fields):
+        """Atualiza campos de um job existente (ex.: status, resultados, erro)."""
+        with self._lock:
+            job = self._load(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            self._save(job_id, job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna os dados de um job (None se não existir)."""
+        with self._lock:
+            return self._load(job_id)
+
+    def list(self, statuses: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Lista os jobs, do mais recente para o mais antigo.
+
+        Args:
+            statuses: Filtrar pelos status informados (ex.: ['pending', 'running'])
+
+        Returns:
+            Dicionário {job_id: dados do job}
+        """
+        query = "SELECT job_id, data FROM jobs"
+        params = ()
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' for _ in statuses)})"
+            params = tuple(statuses)
+        query += " ORDER BY started_at DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return {job_id: json.loads(data) for job_id, data in rows}
+
+    def fail_interrupted(self) -> int:
+        """
+        Marca como 'failed' os jobs que ficaram pendentes ou em execução
+        (ex.: API reiniciada no meio da execução).
+
+        Returns:
+            Número de jobs marcados
+        """
+        interrupted = self.list(statuses=["pending", "running"])
+        now = datetime.now().isoformat()
+        for job_id in interrupted:
+            self.update(
+                job_id,
+                status="failed",
+                error="Job interrompido pelo reinício da API",
+                completed_at=now
+            )
+        if interrupted:
+            print(f"⚠️ {len(interrupted)} job(s) interrompido(s) marcado(s) como failed")
+        return len(interrupted)
+
+    def evict(self) -> int:
+        """
+        Remove jobs finalizados além da retenção (dias) e do limite de histórico.
+
+        Returns:
+            Número de jobs removidos
+        """
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        finished = "status NOT IN ('pending', 'running')"
+
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                f"DELETE FROM jobs WHERE {finished} AND started_at < ?", (cutoff,)
+            ).rowcount
+            removed += self._conn.execute(
+                f"DELETE FROM jobs WHERE {finished} AND job_id NOT IN ("
+                f"SELECT job_id FROM jobs WHERE {finished} ORDER BY started_at DESC LIMIT ?)",
+                (self.max_jobs,)
+            ).rowcount
+        return removed
+
+    def close(self):
+        """Fecha a conexão com o banco."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,194 @@
+"""
+Métricas de Execução
+Registro em memória de tempos e volumes (queries e uploads), exportado no formato texto do Prometheus
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+
+class PhaseTimer:
+    """Acumula o tempo gasto em cada fase de uma operação (ex.: connect, execute, fetch)."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float):
+        """Soma um intervalo de tempo à fase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase: str):
+        """Mede o bloco e soma o tempo à fase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def total(self) -> float:
+        """Tempo total registrado em todas as fases."""
+        return sum(self.phases.values())
+
+    def as_dict(self) -> Dict[str, float]:
+        """Tempos por fase arredondados (para os resultados dos jobs)."""
+        return {phase: round(seconds, 4) for phase, seconds in self.phases.items()}
+
+
+class MetricsRegistry:
+    """
+    Registro thread-safe de métricas no estilo Prometheus.
+
+    - counter: valor acumulado (ex.: linhas extraídas)
+    - gauge: último valor observado (ex.: linhas/s da última execução)
+    - summary: contagem e soma das observações (ex.: segundos por fase)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[Tuple, float]] = {}
+        self._summaries: Dict[str, Dict[Tuple, list]] = {}
+
+    def describe(self, name: str, metric_type: str, help_text: str):
+        """Registra tipo e descrição de uma métrica."""
+        with self._lock:
+            self._help[name] = (metric_type, help_text)
+
+    @staticmethod
+    def _label_key(labels: dict) -> Tuple:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Incrementa um counter."""
+        key = self._label_key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Define o valor de um gauge."""
+        with self._lock:
+            self._values.setdefault(name, {})[self._label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Registra uma observação em um summary (contagem e soma)."""
+        key = self._label_key(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            count_sum = series.setdefault(key, [0, 0.0])
+            count_sum[0] += 1
+            count_sum[1] += value
+
+    @staticmethod
+    def _format_labels(key: Tuple) -> str:
+        if not key:
+            return ""
+        escaped = []
+        for label, value in key:
+            value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            escaped.append(f'{label}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        """Exporta todas as métricas no formato texto do Prometheus."""
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._values) | set(self._summaries)):
+                metric_type, help_text = self._help.get(
+                    name, ("summary" if name in self._summaries else "gauge", name)
+                )
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+                for key, value in sorted(self._values.get(name, {}).items()):
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+                for key, (count, total) in sorted(self._summaries.get(name, {}).items()):
+                    labels = self._format_labels(key)
+                    lines.append(f"{name}_count{labels} {count}")
+                    lines.append(f"{name}_sum{labels} {total}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Registro compartilhado pelo processo (extração, uploads e API)
+metrics = MetricsRegistry()
+
+metrics.describe("etl_query_phase_seconds", "summary", "Tempo por fase de cada query (connect, execute, fetch, serialize, write)")
+metrics.describe("etl_query_seconds", "summary", "Tempo total de cada query")
+metrics.describe("etl_query_runs_total", "counter", "Execuções de query por status")
+metrics.describe("etl_query_rows_total", "counter", "Linhas extraídas")
+metrics.describe("etl_query_bytes_total", "counter", "Bytes de parquet gravados")
+metrics.describe("etl_query_rows_per_second", "gauge", "Linhas por segundo da última execução da query")
+metrics.describe("etl_query_bytes_per_second", "gauge", "Bytes de parquet por segundo da última execução da query")
+metrics.describe("etl_upload_seconds", "summary", "Tempo de upload dos arquivos por destino")
+metrics.describe("etl_upload_files_total", "counter", "Uploads de arquivo por status")
+metrics.describe("etl_upload_bytes_total", "counter", "Bytes enviados")
+metrics.describe("etl_upload_bytes_per_second", "gauge", "Bytes por segundo do último upload no destino")
+metrics.describe("etl_jobs", "gauge", "Jobs da API por status")
+metrics.describe("etl_jobs_queued", "gauge", "Jobs da API aguardando na fila do executor")
+
+
+def record_query_metrics(database: str, query: str, timer: PhaseTimer, elapsed: float,
+                         rows: int, size_bytes: int) -> Dict[str, float]:
+    """
+    Registra as métricas de uma query executada com sucesso.
+
+    Returns:
+        Dicionário com 'timings', 'rows_per_sec', 'bytes' e 'bytes_per_sec' para o detalhe da query
+    """
+    labels = {"database": database, "query": query}
+    for phase, seconds in timer.phases.items():
+        metrics.observe("etl_query_phase_seconds", seconds, phase=phase, **labels)
+    metrics.observe("etl_query_seconds", elapsed, **labels)
+    metrics.inc("etl_query_runs_total", status="success", **labels)
+    metrics.inc("etl_query_rows_total", rows, **labels)
+    metrics.inc("etl_query_bytes_total", size_bytes, **labels)
+
+    rows_per_sec = rows / elapsed if elapsed > 0 else 0.0
+    bytes_per_sec = size_bytes / elapsed if elapsed > 0 else 0.0
+    metrics.set("etl_query_rows_per_second", rows_per_sec, **labels)
+    metrics.set("etl_query_bytes_per_second", bytes_per_sec, **labels)
+
+    return {
+        "timings": timer.as_dict(),
+        "rows_per_sec": round(rows_per_sec, 1),
+        "bytes": size_bytes,
+        "bytes_per_sec": round(bytes_per_sec, 1)
+    }
+
+
+def record_upload_metrics(target: str, destination: str, elapsed: float,
+                          size_bytes: int, status: str) -> Dict[str, float]:
+    """
+    Registra as métricas do upload de um arquivo.
+
+    As séries são rotuladas só por destino: um rótulo por arquivo criaria uma série
+    nova a cada parquet enviado. O tempo de cada arquivo fica no dicionário retornado.
+
+    Args:
+        target: Tipo de destino ('sftp' ou 'supabase')
+        destination: Pasta remota ou bucket
+        elapsed: Segundos gastos no upload
+        size_bytes: Tamanho do arquivo
+        status: 'success' ou 'failed'
+
+    Returns:
+        Dicionário com 'seconds', 'bytes' e 'bytes_per_sec' para o resultado do upload
+    """
+    labels = {"target": target, "destination": destination}
+    metrics.observe("etl_upload_seconds", elapsed, **labels)
+    metrics.inc("etl_upload_files_total", status=status, **labels)
+
+    bytes_per_sec = size_bytes / elapsed if elapsed > 0 else 0.0
+    if status == "success":
+        metrics.inc("etl_upload_bytes_total", size_bytes, **labels)
+        metrics.set("etl_upload_bytes_per_second", bytes_per_sec, **labels)
+
+    return {
+        "seconds": round(elapsed, 4),
+        "bytes": size_bytes,
+        "bytes_per_sec": round(bytes_per_sec, 1)
+    }
@@ -0,0 +1,69 @@
+"""
+Histórico de Duração das Queries
+Guarda, por database e query, a média móvel exponencial (EWMA) da duração das extrações,
+usada para despachar primeiro os pares mais demorados na execução paralela
+"""
+
+from datetime import datetime
+from typing import Optional, Dict
+
+from utils.state_files import JsonStateStore
+
+
+class QueryDurationStore(JsonStateStore):
+    """Persistência simples em JSON das durações esperadas por database/query."""
+
+    label = "durações"
+
+    def __init__(self, state_file: str = "state/query_durations.json", alpha: float = 0.3):
+        """
+        Args:
+            state_file: Arquivo JSON de estado
+            alpha: Peso da execução mais recente na média (0 < alpha <= 1)
+        """
+        super().__init__(state_file)
+        self.alpha = min(1.0, max(0.01, float(alpha)))
+
+    def durations(self) -> Dict[str, Dict[str, float]]:
+        """Retorna as durações esperadas registradas ({database: {query: segundos}})."""
+        with self._lock:
+            state = self._read()
+        return {
+            database: {query_name: entry["seconds"] for query_name, entry in queries.items()}
+            for database, queries in state.items()
+        }
+
+    def record(self, database: str, query_name: str, seconds: float):
+        """Atualiza a duração esperada de database/query com a execução mais recente."""
+        with self._lock:
+            state = self._read()
+            entry = state.setdefault(database, {}).get(query_name)
+            if entry:
+                seconds = self.alpha * seconds + (1 - self.alpha) * entry["seconds"]
+                runs = entry.get("runs", 0) + 1
+            else:
+                runs = 1
+            state[database][query_name] = {
+                "seconds": round(seconds, 3),
+                "runs": runs,
+                "updated_at": datetime.now().isoformat()
+            }
+            self._write(state)
+
+    @staticmethod
+    def estimate(durations: Dict[str, Dict[str, float]], database: str,
+                 query_name: str) -> Optional[float]:
+        """
+        Duração esperada de um par, com base no histórico.
+
+        Sem histórico do par, usa a média da mesma query nos outros databases.
+
+        Returns:
+            Segundos esperados, ou None se a query nunca foi executada
+        """
+        seconds = durations.get(database, {}).get(query_name)
+        if seconds is not None:
+            return seconds
+
+        others = [queries[query_name] for queries in durations.values() if query_name in queries]
+        return sum(others) / len(others) if others else None
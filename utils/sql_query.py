@@ -2,27 +2,74 @@
 Extrator de Dados de Volume Simplificado
 """
 
+import io
 import os
+import queue
+import shutil
+import threading
+import decimal
+import itertools
 import pandas as pd
-from datetime import datetime, timedelta
+import re
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, time as dt_time, timedelta
 import time
 from typing import Optional, Dict, List
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, create_engine, text
 from urllib.parse import quote_plus
 from pathlib import Path
 import yaml
 from glob import glob
 
+from utils.dtype_optimizer import column_types_from_cursor, decimal_arrow_type, optimize_dtypes
+from utils.watermarks import WatermarkStore
+from utils.query_durations import QueryDurationStore
+from utils.metrics import PhaseTimer, metrics, record_query_metrics
+
 load_dotenv()
 
+# Funções de extração das chaves de partição (hive) a partir de uma coluna de data
+PARTITION_KEY_FUNCTIONS = {
+    "year": pc.year,
+    "month": pc.month,
+    "day": pc.day,
+}
+
+# Parâmetros nomeados no SQL (mesma regra usada pelo text() do SQLAlchemy)
+BIND_PARAM_PATTERN = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+
+# Valor de :limite quando não há limite configurado (maior BIGINT do SQL Server)
+NO_ROW_LIMIT = 9223372036854775807
+
 class SQLQuery:
     """Extrator simplificado para consultar banco de dados e extrair dados de SQL."""
 
+    # Limite global de queries simultâneas no SQL Server, compartilhado por todas
+    # as instâncias do processo (ex.: vários jobs da API rodando ao mesmo tempo)
+    _global_query_slots: Optional[threading.BoundedSemaphore] = None
+    _global_slots_lock = threading.Lock()
+
+    # Registro de engines (com pool) por string de conexão, compartilhado pelo processo
+    _engine_registry: Dict[str, any] = {}
+    _engine_registry_lock = threading.Lock()
+
     def __init__(self, config_file: str = "config/databases.yaml"):
         """Inicializa conexão com banco de dados."""
         self.verbose = False
+        # Parâmetros das queries informados na execução (sobrepõem extraction.params)
+        self.param_overrides: Dict[str, any] = {}
         self.config = self._load_config(config_file)
+        # Arquivos de estado (watermarks, durações) criados sob demanda, sob lock
+        self._state_stores_lock = threading.Lock()
+        self._watermarks = None
+        self._durations = None
         self.engine = self._create_engine()
         self._ensure_dataset_dir()
 
@@ -60,29 +107,104 @@ class SQLQuery:
             print(f"❌ Erro ao carregar configurações: {e}")
             raise
 
+    def _build_odbc_connection_string(self, database: Optional[str] = None) -> str:
+        """Monta a string de conexão ODBC a partir do .env (opcionalmente com DATABASE)."""
+        driver = os.getenv('DB_DRIVER', 'ODBC Driver 18 for SQL Server')
+        server = os.getenv('DB_SERVER', 'localhost')
+        port = os.getenv('DB_PORT', '1433')
+        username = os.getenv('DB_UID')
+        password = os.getenv('DB_PWD')
+        
+        odbc_conn_str = (
+            f"DRIVER={{{driver}}};"
+            f"SERVER={server},{port};"
+            f"UID={username};"
+            f"PWD={password};"
+            f"TrustServerCertificate=yes;"
+        )
+        if database:
+            odbc_conn_str += f"DATABASE={database};"
+        return odbc_conn_str
+
+    def _max_split_workers(self) -> int:
+        """Maior número de faixas simultâneas entre as queries com 'split' (1 se nenhuma)."""
+        workers = [
+            max(1, int(query["split"].get("max_workers", 4)))
+            for query in (self.config.get("queries") or {}).values()
+            if query and query.get("split")
+        ]
+        return max(workers, default=1)
+
+    def _pool_config(self) -> dict:
+        """
+        Retorna as configurações do pool de conexões (seção 'connection').
+        
+        Cada faixa de uma query dividida (split) usa uma conexão própria; o overflow
+        é ampliado para comportar max_queries_per_database queries com todas as
+        faixas em paralelo (limitado a max_concurrent_queries).
+        """
+        connection = self.config.get("connection") or {}
+        execution = self._execution_config()
+        pool_size = int(connection.get("pool_size", 2))
+        needed = min(
+            execution["max_concurrent_queries"],
+            execution["max_queries_per_database"] * self._max_split_workers()
+        )
+        return {
+            "pool_size": pool_size,
+            "max_overflow": max(int(connection.get("max_overflow", 2)), needed - pool_size),
+            "pool_pre_ping": bool(connection.get("pool_pre_ping", True)),
+            "pool_recycle": int(connection.get("pool_recycle", 1800)),
+            "pool_timeout": int(connection.get("pool_timeout", 30)),
+        }
+
+    def _get_engine(self, database: Optional[str] = None):
+        """
+        Obtém (ou cria) a engine com pool de conexões para um database.
+        
+        As engines ficam em um registro compartilhado pelo processo, de modo que
+        queries e jobs subsequentes reutilizam conexões já autenticadas.
+        
+        Args:
+            database: Nome do database (None para a engine do servidor)
+            
+        Returns:
+            Engine SQLAlchemy
+        """
+        odbc_conn_str = self._build_odbc_connection_string(database)
+        cls = type(self)
+        
+        with cls._engine_registry_lock:
+            engine = cls._engine_registry.get(odbc_conn_str)
+            if engine is None:
+                quoted_conn_str = quote_plus(odbc_conn_str)
+                engine = create_engine(
+                    f"mssql+pyodbc:///?odbc_connect={quoted_conn_str}",
+                    **self._pool_config()
+                )
+                cls._engine_registry[odbc_conn_str] = engine
+                if self.verbose:
+                    print(f"🔌 Pool de conexões criado para '{database or 'servidor'}'")
+            return engine
+
+    @classmethod
+    def dispose_engines(cls):
+        """Fecha todas as conexões dos pools e limpa o registro de engines."""
+        with cls._engine_registry_lock:
+            engines = list(cls._engine_registry.values())
+            cls._engine_registry.clear()
+        
+        for engine in engines:
+            try:
+                engine.dispose()
+            except Exception as e:
+                print(f"⚠️ Erro ao fechar pool de conexões: {e}")
+
     def _create_engine(self):
         """Cria engine SQLAlchemy com configurações do .env."""
         try:
             start = time.perf_counter()
-            # Configurações do banco
-            driver = os.getenv('DB_DRIVER', 'ODBC Driver 18 for SQL Server')
-            server = os.getenv('DB_SERVER', 'localhost')
-            port = os.getenv('DB_PORT', '1433')
-            username = os.getenv('DB_UID')
-            password = os.getenv('DB_PWD')
-            
-            # String de conexão ODBC
-            odbc_conn_str = (
-                f"DRIVER={{{driver}}};"
-                f"SERVER={server},{port};"
-                f"UID={username};"
-                f"PWD={password};"
-                f"TrustServerCertificate=yes;"
-            )
-            
-            # Criar engine SQLAlchemy
-            quoted_conn_str = quote_plus(odbc_conn_str)
-            engine = create_engine(f"mssql+pyodbc:///?odbc_connect={quoted_conn_str}")
+            engine = self._get_engine()
             
             elapsed = time.perf_counter() - start
             if self.verbose:
@@ -97,41 +219,1171 @@ class SQLQuery:
         """Garante que a pasta dataset existe."""
         os.makedirs("data", exist_ok=True)
 
-    def _execute_query(self, database: str, query: str, params: dict = None) -> pd.DataFrame:
-        """Executa query em um database específico."""
+    def _execution_config(self) -> dict:
+        """Retorna as configurações de execução concorrente (seção 'execution')."""
+        execution = self.config.get("execution") or {}
+        return {
+            "parallel": bool(execution.get("parallel", False)),
+            "max_workers": max(1, int(execution.get("max_workers", 4))),
+            "max_concurrent_queries": max(1, int(execution.get("max_concurrent_queries", 6))),
+            "max_queries_per_database": max(1, int(execution.get("max_queries_per_database", 2))),
+            "schedule": execution.get("schedule", "longest_first"),
+            "duration_alpha": float(execution.get("duration_alpha", 0.3)),
+        }
+
+    def _get_global_query_slots(self) -> threading.BoundedSemaphore:
+        """Obtém o semáforo global que limita queries simultâneas no SQL Server."""
+        cls = type(self)
+        with cls._global_slots_lock:
+            if cls._global_query_slots is None:
+                limit = self._execution_config()["max_concurrent_queries"]
+                cls._global_query_slots = threading.BoundedSemaphore(limit)
+            return cls._global_query_slots
+
+    def _query_config(self, query_name: str) -> dict:
+        """
+        Retorna a configuração efetiva de uma query.
+        
+        Combina os padrões da seção 'extraction' com as sobreposições
+        definidas em 'queries.{query_name}' no YAML.
+        """
+        extraction = self.config.get("extraction") or {}
+        overrides = (self.config.get("queries") or {}).get(query_name) or {}
+        return {
+            "fetch_mode": extraction.get("fetch_mode", "pandas"),
+            "chunk_size": int(extraction.get("chunk_size", 50000)),
+            **overrides,
+            # Perfil de gravação: padrões de extraction.parquet + ajustes da query
+            "parquet": {**(extraction.get("parquet") or {}), **(overrides.get("parquet") or {})},
+            # Otimização de tipos (modo pandas; Decimals em todos os modos):
+            # padrões de extraction.dtypes + ajustes da query
+            "dtypes": {**(extraction.get("dtypes") or {}), **(overrides.get("dtypes") or {})}
+        }
+
+    def _optimize_frame(self, df: pd.DataFrame, query_config: dict) -> pd.DataFrame:
+        """
+        Aplica a otimização de tipos (categóricas, inteiros, decimais) ao DataFrame.
+        
+        Os tipos numéricos seguem os metadados do cursor guardados por _execute_query
+        em df.attrs['column_types'].
+        """
+        df, summary = optimize_dtypes(
+            df, query_config["dtypes"], column_types=df.attrs.get("column_types"),
+            measure_memory=self.verbose
+        )
+        if self.verbose and (summary["categorical"] or summary["integer"] or summary["decimal"]):
+            print(f"  🧮 Tipos otimizados: {len(summary['categorical'])} categóricas, "
+                  f"{len(summary['integer'])} inteiras, {len(summary['decimal'])} decimais | "
+                  f"memória {summary['memory_before'] / 1024 / 1024:.1f} → "
+                  f"{summary['memory_after'] / 1024 / 1024:.1f} MB")
+        return df
+
+    @staticmethod
+    def _frame_to_table(df: pd.DataFrame) -> pa.Table:
+        """
+        Converte o DataFrame extraído em tabela Arrow para gravação.
+        
+        Colunas categóricas (otimização de memória) voltam ao tipo dos valores: o
+        schema gravado não depende da cardinalidade de cada execução e o parquet
+        continua usando dictionary encoding nessas colunas. Os df.attrs (tipos do
+        cursor) não vão para os metadados pandas do parquet.
+        """
+        if df.attrs:
+            df = df.copy(deep=False)
+            df.attrs = {}
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for index, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(
+                    index, field.name, table.column(index).cast(field.type.value_type)
+                )
+        return table
+
+    @staticmethod
+    def _parquet_writer_options(profile: Optional[dict]) -> dict:
+        """
+        Converte o perfil de gravação parquet em opções do pyarrow.
+        
+        Chaves do perfil: compression, compression_level, dictionary_columns
+        (lista ou true/false) e statistics (lista ou true/false). Chaves ausentes
+        mantêm os padrões do pyarrow.
+        """
+        profile = profile or {}
+        options = {}
+        if profile.get("compression"):
+            options["compression"] = profile["compression"]
+        if profile.get("compression_level") is not None:
+            options["compression_level"] = int(profile["compression_level"])
+        if profile.get("dictionary_columns") is not None:
+            options["use_dictionary"] = profile["dictionary_columns"]
+        if profile.get("statistics") is not None:
+            options["write_statistics"] = profile["statistics"]
+        return options
+
+    @staticmethod
+    def _sort_table(table: pa.Table, profile: Optional[dict]) -> pa.Table:
+        """
+        Ordena a tabela pelas colunas de sort_by do perfil.
+        
+        Cada item é o nome da coluna (crescente) ou [coluna, ascending|descending].
+        Colunas dictionary (ex.: parquet antigo relido no merge incremental) são
+        ordenadas pelos valores decodificados.
+        
+        Ordena só a tabela recebida: nos modos stream/arrow cada lote é ordenado
+        isoladamente e o arquivo não fica ordenado por inteiro.
+        """
+        sort_by = (profile or {}).get("sort_by")
+        if not sort_by or table.num_rows == 0:
+            return table
+        keys = [(key, "ascending") if isinstance(key, str) else tuple(key) for key in sort_by]
+        if not any(pa.types.is_dictionary(table.schema.field(name).type) for name, _ in keys):
+            return table.sort_by(keys)
+        
+        sort_columns = {}
+        for name, _ in keys:
+            column = table[name]
+            if pa.types.is_dictionary(column.type):
+                column = column.cast(column.type.value_type)
+            sort_columns[name] = column
+        return table.take(pc.sort_indices(pa.table(sort_columns), sort_keys=keys))
+
+    def _open_parquet_writer(self, sink, schema: pa.Schema,
+                             profile: Optional[dict]) -> pq.ParquetWriter:
+        """Abre um ParquetWriter (arquivo ou buffer) com as opções do perfil."""
+        return pq.ParquetWriter(sink, schema, **self._parquet_writer_options(profile))
+
+    def _write_parquet_table(self, writer: pq.ParquetWriter, table: pa.Table,
+                             profile: Optional[dict]):
+        """Grava uma tabela no writer aplicando a ordenação e o row_group_size do perfil."""
+        row_group_size = (profile or {}).get("row_group_size")
+        writer.write_table(
+            self._sort_table(table, profile),
+            row_group_size=int(row_group_size) if row_group_size else None
+        )
+
+    def _write_parquet(self, sink, table: pa.Table, profile: Optional[dict]):
+        """Grava uma tabela completa como parquet (arquivo ou buffer) com o perfil."""
+        with self._open_parquet_writer(sink, table.schema, profile) as writer:
+            self._write_parquet_table(writer, table, profile)
+
+    def _dataset_write_options(self, profile: Optional[dict]) -> dict:
+        """Opções de ds.write_dataset equivalentes ao perfil (arquivos e row groups)."""
+        options = {
+            "file_options": ds.ParquetFileFormat().make_write_options(
+                **self._parquet_writer_options(profile)
+            )
+        }
+        row_group_size = (profile or {}).get("row_group_size")
+        if row_group_size:
+            options["max_rows_per_group"] = int(row_group_size)
+        return options
+
+    @staticmethod
+    def _bind_params(query: str, params: dict = None) -> dict:
+        """
+        Completa os parâmetros nomeados (:nome) usados pela query.
+        
+        Parâmetros declarados no SQL e não informados recebem None, o que
+        desativa filtros opcionais escritos como (:nome IS NULL OR ...).
+        """
+        bound = {name: None for name in BIND_PARAM_PATTERN.findall(query)}
+        bound.update(params or {})
+        return bound
+
+    @staticmethod
+    def _prepare_statement(query: str, params: dict = None) -> tuple:
+        """
+        Monta o text() da query e os parâmetros a enviar.
+        
+        Parâmetros com lista (ex.: :empresas) viram IN expandido, um marcador
+        por item, escrito no SQL como "coluna IN :empresas".
+        
+        Returns:
+            Tupla (statement, parâmetros)
+        """
+        bound = SQLQuery._bind_params(query, params)
+        statement = text(query)
+        expanding = [name for name, value in bound.items() if isinstance(value, (list, tuple))]
+        if expanding:
+            bound = {
+                name: list(value) if name in expanding else value for name, value in bound.items()
+            }
+            statement = statement.bindparams(
+                *(bindparam(name, expanding=True) for name in expanding)
+            )
+        return statement, bound
+
+    def _query_params(self, query_name: str, query_content: str) -> dict:
+        """
+        Resolve os valores dos parâmetros nomeados usados por uma query.
+        
+        Precedência: parâmetros da execução (param_overrides) > queries.{query}.params
+        > extraction.params. Apenas os parâmetros presentes no SQL são retornados.
+        
+        - :data_inicio / :data_fim: janela de datas; sem data_inicio explícita usa
+          hoje - days_back (execução, queries.{query}.days_back ou
+          extraction.default_days_back; null ou 0 = histórico completo)
+        - :empresas / :filtrar_empresas: lista de empresas (IN expandido) e 1/0
+          indicando se o filtro está ativo
+        - :limite: máximo de linhas (sem limite = NO_ROW_LIMIT)
+        """
+        names = set(BIND_PARAM_PATTERN.findall(query_content))
+        if not names:
+            return {}
+        
+        extraction = self.config.get("extraction") or {}
+        query_overrides = (self.config.get("queries") or {}).get(query_name) or {}
+        values = {
+            **(extraction.get("params") or {}),
+            **(query_overrides.get("params") or {}),
+            **self.param_overrides
+        }
+        
+        if "days_back" in self.param_overrides and "data_inicio" not in self.param_overrides:
+            # days_back da execução prevalece sobre uma data_inicio fixa na configuração
+            values.pop("data_inicio", None)
+        days_back = values.pop(
+            "days_back", query_overrides.get("days_back", extraction.get("default_days_back"))
+        )
+        for key in ("data_inicio", "data_fim"):
+            if isinstance(values.get(key), str):
+                values[key] = date.fromisoformat(values[key][:10])
+        if values.get("data_inicio") is None and days_back:
+            values["data_inicio"] = date.today() - timedelta(days=int(days_back))
+        
+        empresas = values.get("empresas") or []
+        values["empresas"] = [empresas] if isinstance(empresas, (str, int)) else list(empresas)
+        values["filtrar_empresas"] = 1 if values["empresas"] else 0
+        values["limite"] = int(values["limite"]) if values.get("limite") else NO_ROW_LIMIT
+        
+        return {name: values.get(name) for name in names}
+
+    def _execute_query(self, database: str, query: str, params: dict = None,
+                       timer: Optional[PhaseTimer] = None) -> pd.DataFrame:
+        """
+        Executa query em um database específico.
+        
+        Se informado, timer recebe os tempos de espera por vaga ('wait'), conexão
+        ('connect') e da execução ('execute', inclui a leitura das linhas).
+        
+        Decimals são mantidos como objetos (sem conversão para float) e os tipos
+        declarados das colunas numéricas ficam em df.attrs['column_types'], usados
+        pela otimização de tipos.
+        
+        Erros de conexão ou da query são propagados: um resultado vazio nunca
+        substitui uma falha (o chamador registra a query como 'failed').
+        """
         if not self.engine:
-            print("❌ Engine não disponível")
-            return pd.DataFrame()
+            raise RuntimeError("Engine não disponível")
         
+        timer = timer if timer is not None else PhaseTimer()
+        start_total = time.perf_counter()
+        # Engine com pool do database específico (reutilizada entre queries)
+        db_engine = self._get_engine(database)
+        
+        # Executar query (respeitando o limite global de queries simultâneas)
+        with timer.phase("wait"):
+            query_slots = self._get_global_query_slots()
+            query_slots.acquire()
         try:
-            start_total = time.perf_counter()
-            # Modificar conexão para usar database específico
-            connection_str = str(self.engine.url)
-            if "DATABASE=" not in connection_str:
-                # Adicionar database à string de conexão
-                odbc_part = connection_str.split("odbc_connect=")[1]
-                new_odbc = f"{odbc_part.rstrip('%3B')};DATABASE={database}"
-                connection_str = connection_str.split("odbc_connect=")[0] + f"odbc_connect={quote_plus(new_odbc)}"
+            start_connect = time.perf_counter()
+            with db_engine.connect() as conn:
+                start_query = time.perf_counter()
+                timer.add("connect", start_query - start_connect)
+                result = conn.execute(*self._prepare_statement(query, params))
+                column_types = column_types_from_cursor(result.cursor.description)
+                df = pd.DataFrame.from_records(
+                    result.fetchall(), columns=list(result.keys()), coerce_float=False
+                )
+                df.attrs["column_types"] = column_types
+                query_elapsed = time.perf_counter() - start_query
+                timer.add("execute", query_elapsed)
+        finally:
+            query_slots.release()
+        
+        total_elapsed = time.perf_counter() - start_total
+        if self.verbose:
+            print(f"🗄️ Query no DB '{database}' retornou {len(df):,} linhas "
+                  f"(execução: {query_elapsed:.2f}s, total: {total_elapsed:.2f}s)")
+        return df
+    
+    @staticmethod
+    def _arrow_type_from_cursor(column_description) -> Optional[pa.DataType]:
+        """Converte a descrição de coluna do cursor ODBC (PEP 249) em tipo Arrow."""
+        type_code = column_description[1]
+        precision = column_description[4]
+        scale = column_description[5]
+        
+        if type_code is str:
+            return pa.string()
+        if type_code is bool:
+            return pa.bool_()
+        if type_code is int:
+            return pa.int64()
+        if type_code is float:
+            return pa.float64()
+        if type_code is decimal.Decimal:
+            if precision and 0 < precision <= 38:
+                return pa.decimal128(precision, scale or 0)
+            return None
+        if type_code is datetime:
+            return pa.timestamp("us")
+        if type_code is date:
+            return pa.date32()
+        if type_code is dt_time:
+            return pa.time64("us")
+        if type_code in (bytes, bytearray):
+            return pa.binary()
+        return None
+
+    @staticmethod
+    def _arrow_types_from_cursor(description) -> List[Optional[pa.DataType]]:
+        """
+        Mapeia cada coluna de cursor.description para um tipo Arrow.
+        
+        Returns:
+            Tipos na ordem das colunas; None nas colunas cujo tipo não pode ser
+            mapeado (essas são inferidas dos valores de cada lote)
+        """
+        return [SQLQuery._arrow_type_from_cursor(column) for column in description or []]
+
+    @staticmethod
+    def _output_types(types: List[Optional[pa.DataType]],
+                      dtypes: Optional[dict] = None) -> List[Optional[pa.DataType]]:
+        """
+        Tipos gravados a partir dos tipos do cursor: Decimals seguem extraction.dtypes.
+        
+        Mesma regra do modo pandas (float64 por padrão, inteiro na escala 0, decimal128
+        só com decimals: fixed), para que os modos de leitura gravem o mesmo schema.
+        """
+        return [
+            decimal_arrow_type(arrow_type, dtypes)
+            if arrow_type is not None and pa.types.is_decimal(arrow_type) else arrow_type
+            for arrow_type in types
+        ]
+
+    @staticmethod
+    def _rows_to_record_batch(rows: list, columns: List[str],
+                              types: List[Optional[pa.DataType]]) -> pa.RecordBatch:
+        """
+        Constrói um RecordBatch Arrow diretamente das linhas do cursor, sem pandas.
+        
+        As colunas são transpostas e convertidas com os tipos do cursor (string,
+        decimal, date...), evitando colunas object intermediárias.
+        """
+        values_by_column = list(zip(*rows))
+        arrays = []
+        for index, arrow_type in enumerate(types or [None] * len(columns)):
+            arrays.append(pa.array(values_by_column[index], type=arrow_type))
+        return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+    @staticmethod
+    def _apply_cursor_types(table: pa.Table, types: List[Optional[pa.DataType]]) -> pa.Table:
+        """Converte as colunas de tipo mapeado pelo cursor; as demais mantêm o tipo inferido."""
+        if not any(types):
+            return table
+        fields = [
+            field if arrow_type is None else field.with_type(arrow_type)
+            for field, arrow_type in zip(table.schema, types)
+        ]
+        return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+    @staticmethod
+    def _unify_table_schemas(tables):
+        """
+        Produz os lotes em um schema único.
+        
+        Uma coluna de tipo inferido que chega só com nulos fica com tipo null;
+        os lotes são retidos até que um lote traga o tipo real da coluna e então
+        convertidos para o schema unificado, que vale para todos os lotes seguintes.
+        """
+        schema = None
+        held = []
+        for table in tables:
+            if schema is not None and not held:
+                yield table if table.schema == schema else table.cast(schema)
+                continue
+            
+            held.append(table)
+            schema = pa.unify_schemas([item.schema for item in held], promote_options="permissive")
+            if any(pa.types.is_null(field.type) for field in schema):
+                continue
+            for item in held:
+                yield item if item.schema == schema else item.cast(schema)
+            held = []
+        
+        # Colunas só com nulos na query inteira continuam com tipo null
+        for item in held:
+            yield item if item.schema == schema else item.cast(schema)
+
+    def _iter_query_tables(self, database: str, query: str, params: dict = None,
+                           chunk_size: int = 50000, arrow_native: bool = False,
+                           timer: Optional[PhaseTimer] = None, dtypes: Optional[dict] = None):
+        """
+        Executa uma query e produz o resultado em lotes de tabelas Arrow.
+        
+        A conexão (e a vaga no limite global) fica reservada enquanto o gerador
+        é consumido. Sempre produz ao menos uma tabela (vazia, com o schema,
+        quando a query não retorna linhas).
+        
+        Args:
+            database: Nome do database
+            query: Query SQL
+            params: Parâmetros da query
+            chunk_size: Número de linhas por lote
+            arrow_native: Montar os lotes direto em Arrow (sem DataFrame intermediário)
+            timer: Recebe os tempos de 'wait', 'connect', 'execute', 'fetch' e 'serialize'
+            dtypes: Opções de tipos da query (extraction.dtypes); definem o tipo gravado
+                    dos Decimals
+            
+        Yields:
+            pa.Table com até chunk_size linhas, todas no mesmo schema
+        """
+        if not self.engine:
+            raise RuntimeError("Engine não disponível")
+        
+        timer = timer if timer is not None else PhaseTimer()
+        db_engine = self._get_engine(database)
+        
+        with timer.phase("wait"):
+            query_slots = self._get_global_query_slots()
+            query_slots.acquire()
+        try:
+            start_connect = time.perf_counter()
+            with db_engine.connect() as conn:
+                timer.add("connect", time.perf_counter() - start_connect)
+                with timer.phase("execute"):
+                    result = conn.execution_options(stream_results=True).execute(
+                        *self._prepare_statement(query, params)
+                    )
+                columns = list(result.keys())
+                types = self._arrow_types_from_cursor(result.cursor.description)
+                types = types or [None] * len(columns)
+                output_types = self._output_types(types, dtypes)
+                # Os lotes Arrow são montados com o tipo do cursor e depois convertidos
+                conversions = [
+                    output if output != arrow_type else None
+                    for arrow_type, output in zip(types, output_types)
+                ]
                 
-                temp_engine = create_engine(connection_str)
+                def batches():
+                    while True:
+                        with timer.phase("fetch"):
+                            rows = result.fetchmany(chunk_size)
+                        if not rows:
+                            return
+                        
+                        with timer.phase("serialize"):
+                            if arrow_native:
+                                batch = self._rows_to_record_batch(rows, columns, types)
+                                table = self._apply_cursor_types(
+                                    pa.Table.from_batches([batch]), conversions
+                                )
+                            else:
+                                chunk = pd.DataFrame.from_records(rows, columns=columns)
+                                table = self._apply_cursor_types(
+                                    pa.Table.from_pandas(chunk, preserve_index=False), output_types
+                                )
+                        yield table
+                
+                produced = False
+                try:
+                    for table in self._unify_table_schemas(batches()):
+                        produced = True
+                        yield table
+                    
+                    if not produced:
+                        yield pa.schema([
+                            pa.field(name, arrow_type or pa.string())
+                            for name, arrow_type in zip(columns, output_types)
+                        ]).empty_table()
+                finally:
+                    result.close()
+        finally:
+            query_slots.release()
+
+    def _fetch_query_table(self, database: str, query: str, params: dict = None,
+                           chunk_size: int = 50000, arrow_native: bool = False,
+                           timer: Optional[PhaseTimer] = None,
+                           dtypes: Optional[dict] = None) -> pa.Table:
+        """Executa uma query e retorna o resultado completo como tabela Arrow."""
+        tables = list(self._iter_query_tables(
+            database, query, params, chunk_size, arrow_native, timer, dtypes
+        ))
+        return pa.concat_tables(tables)
+
+    @staticmethod
+    @contextmanager
+    def _removing_on_error(tmp_path: Path):
+        """Remove o temporário (arquivo ou diretório) se a gravação falhar e propaga o erro."""
+        try:
+            yield tmp_path
+        except BaseException:
+            if tmp_path.is_dir():
+                shutil.rmtree(tmp_path, ignore_errors=True)
             else:
-                temp_engine = self.engine
+                tmp_path.unlink(missing_ok=True)
+            raise
+
+    def _stream_query_to_parquet(self, database: str, query: str, output_file: Path,
+                                 params: dict = None, chunk_size: int = 50000,
+                                 arrow_native: bool = False,
+                                 timer: Optional[PhaseTimer] = None,
+                                 profile: Optional[dict] = None,
+                                 dtypes: Optional[dict] = None) -> Dict[str, int]:
+        """
+        Executa uma query lendo o cursor em lotes e gravando cada lote como row group.
+        
+        O uso de memória fica limitado ao tamanho do lote, independente do tamanho
+        da tabela. O arquivo é escrito em um temporário e movido ao final.
+        
+        Args:
+            database: Nome do database
+            query: Query SQL
+            output_file: Caminho do arquivo parquet de saída
+            params: Parâmetros da query
+            chunk_size: Número de linhas por lote / row group
+            arrow_native: Montar os lotes direto em Arrow (sem DataFrame intermediário)
+            timer: Recebe os tempos das fases da query e da gravação ('write')
+            profile: Perfil de gravação parquet (a ordenação vale dentro de cada lote)
+            dtypes: Opções de tipos da query (extraction.dtypes)
             
-            # Executar query
-            with temp_engine.connect() as conn:
-                start_query = time.perf_counter()
-                df = pd.read_sql(text(query), conn, params=params)
-                query_elapsed = time.perf_counter() - start_query
+        Returns:
+            Dicionário com 'rows' e 'cols' gravados
+        """
+        timer = timer if timer is not None else PhaseTimer()
+        start_total = time.perf_counter()
+        tmp_file = output_file.with_name(f"{output_file.name}.tmp")
+        
+        with self._removing_on_error(tmp_file):
+            written = self._write_tables_to_parquet(
+                self._iter_query_tables(
+                    database, query, params, chunk_size, arrow_native, timer, dtypes
+                ),
+                tmp_file,
+                profile,
+                timer
+            )
+            os.replace(tmp_file, output_file)
+        
+        total_elapsed = time.perf_counter() - start_total
+        if self.verbose:
+            print(f"🗄️ Query no DB '{database}' gravou {written['rows']:,} linhas em lotes de "
+                  f"{chunk_size:,} (total: {total_elapsed:.2f}s)")
+        return written
+
+    def _write_tables_to_parquet(self, tables, sink, profile: Optional[dict],
+                                 timer: PhaseTimer) -> Dict[str, int]:
+        """
+        Grava lotes de tabelas Arrow como row groups de um único parquet.
+        
+        Args:
+            tables: Iterável de tabelas Arrow (o primeiro lote define o schema)
+            sink: Caminho do arquivo ou buffer de saída
+            profile: Perfil de gravação parquet (a ordenação vale dentro de cada lote)
+            timer: Recebe o tempo de gravação ('write')
             
-            total_elapsed = time.perf_counter() - start_total
-            if self.verbose:
-                print(f"🗄️ Query no DB '{database}' retornou {len(df):,} linhas (execução: {query_elapsed:.2f}s, total: {total_elapsed:.2f}s)")
-            return df
+        Returns:
+            Dicionário com 'rows' e 'cols' gravados
+        """
+        total_rows = 0
+        cols = 0
+        writer = None
+        
+        try:
+            for table in tables:
+                with timer.phase("write"):
+                    if writer is None:
+                        writer = self._open_parquet_writer(sink, table.schema, profile)
+                        cols = table.num_columns
+                    if table.num_rows:
+                        self._write_parquet_table(writer, table, profile)
+                        total_rows += table.num_rows
+        finally:
+            if writer is not None:
+                with timer.phase("write"):
+                    writer.close()
+        
+        return {"rows": total_rows, "cols": cols}
+
+    def _query_slices(self, query_name: str, query_config: dict, params: dict) -> List[dict]:
+        """
+        Divide uma query em faixas disjuntas de parâmetros (configuração 'split').
+        
+        - by: month    → uma faixa por mês entre :data_inicio e :data_fim; sem
+                         :data_fim, as faixas vão até o mês atual e a última fica
+                         aberta (sem limite superior), como a query sem split
+        - by: empresas → uma faixa por empresa de :empresas (ou de split.values)
+        
+        Returns:
+            Lista de parâmetros por faixa, ou lista vazia quando a query não é dividida
+            (sem 'split', parâmetros ausentes no SQL, :limite definido ou uma única faixa)
+        """
+        split = query_config.get("split") or {}
+        by = split.get("by")
+        if not by:
+            return []
+        if params.get("limite", NO_ROW_LIMIT) != NO_ROW_LIMIT:
+            # O limite vale para a query inteira, não para cada faixa
+            return []
+        
+        slices = []
+        if by == "month":
+            start = params.get("data_inicio")
+            if start is None or "data_fim" not in params:
+                print(f"  ⚠️  Split por mês de {query_name} requer :data_inicio e :data_fim na "
+                      f"query e uma janela de datas")
+                return []
+            end = params.get("data_fim")
+            last_day = end or date.today()
+            while start <= last_day:
+                next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+                slice_end = next_month - timedelta(days=1)
+                if slice_end >= last_day:
+                    # Última faixa: até :data_fim, ou aberta quando a janela não tem fim
+                    slice_end = end
+                slices.append({**params, "data_inicio": start, "data_fim": slice_end})
+                start = next_month
+        elif by == "empresas":
+            if "empresas" not in params:
+                print(f"  ⚠️  Split por empresa de {query_name} requer :empresas na query")
+                return []
+            for empresa in params["empresas"] or split.get("values") or []:
+                slices.append({**params, "empresas": [empresa], "filtrar_empresas": 1})
+        else:
+            raise ValueError(f"Split não suportado: {by}")
+        
+        return slices if len(slices) > 1 else []
+
+    def _iter_split_tables(self, database: str, query: str, slices: List[dict],
+                           query_config: dict, timer: PhaseTimer):
+        """
+        Executa as faixas de uma query em paralelo e produz os lotes conforme chegam.
+        
+        Cada faixa roda em sua própria conexão, respeitando o limite global de
+        queries simultâneas; os lotes passam por uma fila limitada até o único
+        consumidor (gravação), que não precisa de lock. Uma falha em qualquer
+        faixa interrompe as demais e é relançada aqui.
+        
+        Args:
+            database: Nome do database
+            query: Query SQL
+            slices: Parâmetros de cada faixa (ver _query_slices)
+            query_config: Configuração efetiva da query (chunk_size, fetch_mode, split)
+            timer: Recebe a soma dos tempos das fases de todas as faixas
+            
+        Yields:
+            pa.Table com até chunk_size linhas, todas no mesmo schema
+        """
+        workers = min(len(slices), max(1, int(query_config["split"].get("max_workers", 4))))
+        batches = queue.Queue(maxsize=workers * 2)
+        stop = threading.Event()
+        timer_lock = threading.Lock()
+        finished = object()
+        
+        print(f"  🔀 Split: {len(slices)} faixas por {query_config['split']['by']} "
+              f"({workers} em paralelo)")
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def run_slice(slice_params: dict):
+            if stop.is_set():
+                return
+            slice_timer = PhaseTimer()
+            try:
+                tables = self._iter_query_tables(
+                    database,
+                    query,
+                    params=slice_params,
+                    chunk_size=query_config["chunk_size"],
+                    arrow_native=query_config["fetch_mode"] == "arrow",
+                    timer=slice_timer,
+                    dtypes=query_config["dtypes"]
+                )
+                try:
+                    for table in tables:
+                        if not put(table):
+                            break
+                finally:
+                    tables.close()
+                put(finished)
+            except Exception as e:
+                put(e)
+            finally:
+                with timer_lock:
+                    for phase, seconds in slice_timer.phases.items():
+                        timer.add(phase, seconds)
+        
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql-split")
+        try:
+            for slice_params in slices:
+                pool.submit(run_slice, slice_params)
+            
+            empty = []
+            
+            def arrived():
+                remaining = len(slices)
+                while remaining:
+                    item = batches.get()
+                    if item is finished:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    elif item.num_rows:
+                        yield item
+                    elif not empty:
+                        empty.append(item)
+            
+            # Faixas diferentes podem inferir tipos diferentes (ex.: colunas só com nulos)
+            produced = False
+            for table in self._unify_table_schemas(arrived()):
+                produced = True
+                yield table
+            
+            if not produced and empty:
+                yield empty[0]
+        finally:
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _query_to_parquet_buffer(self, database: str, query_name: str,
+                                 query_content: str) -> tuple:
+        """
+        Executa uma query e serializa o resultado como parquet em memória.
+        
+        Usado no pipeline direto para o Supabase: sempre extração completa, sem
+        incremental nem partições, pois não há arquivo local anterior.
+        
+        Args:
+            database: Nome do database
+            query_name: Nome da query (nome do arquivo SQL sem extensão)
+            query_content: Conteúdo da query
+            
+        Returns:
+            Tupla (buffer BytesIO posicionado no início ou None em falha, detalhes)
+        """
+        try:
+            query_config = self._query_config(query_name)
+            params = self._query_params(query_name, query_content)
+            query_start = time.perf_counter()
+            timer = PhaseTimer()
+            buffer = io.BytesIO()
+            
+            slices = self._query_slices(query_name, query_config, params)
+            
+            if slices or query_config["fetch_mode"] in ("stream", "arrow"):
+                if slices:
+                    tables = self._iter_split_tables(
+                        database, query_content, slices, query_config, timer
+                    )
+                else:
+                    tables = self._iter_query_tables(
+                        database,
+                        query_content,
+                        params=params,
+                        chunk_size=query_config["chunk_size"],
+                        arrow_native=query_config["fetch_mode"] == "arrow",
+                        timer=timer,
+                        dtypes=query_config["dtypes"]
+                    )
+                written = self._write_tables_to_parquet(
+                    tables, buffer, query_config["parquet"], timer
+                )
+                rows, cols = written["rows"], written["cols"]
+            else:
+                df = self._execute_query(database, query_content, params=params, timer=timer)
+                with timer.phase("serialize"):
+                    df = self._optimize_frame(df, query_config)
+                with timer.phase("write"):
+                    self._write_parquet(
+                        buffer, self._frame_to_table(df), query_config["parquet"]
+                    )
+                rows, cols = len(df), len(df.columns)
+            
+            query_elapsed = time.perf_counter() - query_start
+            buffer.seek(0)
+            size = buffer.getbuffer().nbytes
+            
+            if rows == 0:
+                print(f"  ⚠️  Query retornou 0 linhas - enviando arquivo vazio")
+            print(f"  ✅ Serializado em memória: {query_name}.parquet")
+            print(f"     📈 Linhas: {rows:,} | Colunas: {cols} | Tamanho: {size / 1024:.1f} KB | "
+                  f"Tempo: {query_elapsed:.2f}s")
+            
+            return buffer, {
+                "query": query_name,
+                "rows": rows,
+                "cols": cols,
+                "time": query_elapsed,
+                "status": "success",
+                **record_query_metrics(database, query_name, timer, query_elapsed, rows, size)
+            }
             
         except Exception as e:
-            print(f"❌ Erro executando query no {database}: {e}")
-            return pd.DataFrame()
-    
+            print(f"  ❌ Erro em {database}/{query_name}.sql: {str(e)}")
+            metrics.inc(
+                "etl_query_runs_total", status="failed", database=database, query=query_name
+            )
+            return None, {
+                "query": query_name,
+                "status": "failed",
+                "error": str(e)
+            }
+
+    @staticmethod
+    def _partition_keys(partition: dict) -> List[str]:
+        """Retorna as chaves de partição configuradas (ex.: ['year', 'month'])."""
+        keys = list(partition.get("by") or ["year", "month"])
+        for key in keys:
+            if key not in PARTITION_KEY_FUNCTIONS:
+                raise ValueError(f"Chave de partição não suportada: {key}")
+        return keys
+
+    def _partitioning(self, partition: dict) -> ds.Partitioning:
+        """Esquema de partição hive (ex.: year=2024/month=3)."""
+        keys = self._partition_keys(partition)
+        return ds.partitioning(pa.schema([(key, pa.int32()) for key in keys]), flavor="hive")
+
+    def _add_partition_columns(self, table: pa.Table, partition: dict) -> pa.Table:
+        """Adiciona as colunas de partição derivadas da coluna de data."""
+        column = partition.get("column", "Data")
+        for key in self._partition_keys(partition):
+            values = PARTITION_KEY_FUNCTIONS[key](table[column])
+            table = table.append_column(key, pc.cast(values, pa.int32()))
+        return table
+
+    def _write_partitioned_dataset(self, tables, dataset_dir: Path, partition: dict,
+                                   profile: Optional[dict] = None) -> Dict[str, int]:
+        """
+        Grava lotes de tabelas como dataset parquet particionado (hive).
+        
+        O dataset é escrito em um diretório temporário oculto e substitui o
+        anterior ao final.
+        
+        Args:
+            tables: Iterável de tabelas Arrow (mesmo schema)
+            dataset_dir: Diretório do dataset (ex.: data/{database}/vendas)
+            partition: Configuração de partição da query
+            profile: Perfil de gravação parquet (a ordenação vale dentro de cada lote)
+            
+        Returns:
+            Dicionário com 'rows' e 'cols' gravados
+        """
+        tmp_dir = dataset_dir.with_name(f".{dataset_dir.name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        
+        with self._removing_on_error(tmp_dir):
+            tables = iter(tables)
+            first = self._add_partition_columns(next(tables), partition)
+            total = {"rows": 0}
+            
+            def batches():
+                for table in itertools.chain([first], tables):
+                    if table is not first:
+                        table = self._add_partition_columns(table, partition)
+                    total["rows"] += table.num_rows
+                    yield from self._sort_table(table, profile).to_batches()
+            
+            ds.write_dataset(
+                batches(),
+                tmp_dir,
+                schema=first.schema,
+                format="parquet",
+                partitioning=self._partitioning(partition),
+                basename_template="part-{i}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                **self._dataset_write_options(profile)
+            )
+            
+            shutil.rmtree(dataset_dir, ignore_errors=True)
+            os.replace(tmp_dir, dataset_dir)
+        
+        return {
+            "rows": total["rows"],
+            "cols": first.num_columns - len(self._partition_keys(partition))
+        }
+
+    @staticmethod
+    def _partitions_after(keys: List[str], day: date, inclusive: bool = True) -> ds.Expression:
+        """Filtro lexicográfico: partições com chave >= (ou >, se não inclusive) à do dia."""
+        values = {"year": day.year, "month": day.month, "day": day.day}
+        expression = None
+        for index in reversed(range(len(keys))):
+            key = ds.field(keys[index])
+            value = values[keys[index]]
+            if expression is None:
+                expression = key >= value if inclusive else key > value
+            else:
+                expression = (key > value) | ((key == value) & expression)
+        return expression
+
+    def _merge_into_partitions(self, dataset_dir: Path, delta: pa.Table, column: str,
+                               cutoff: date, partition: dict,
+                               profile: Optional[dict] = None,
+                               window_start: Optional[date] = None) -> Optional[Dict[str, int]]:
+        """
+        Mescla linhas incrementais reescrevendo apenas as partições afetadas.
+        
+        Partições a partir do corte são lidas, as linhas com data >= corte são
+        substituídas pelo delta e somente essas partições são regravadas. Com
+        window_start, as partições até a do início da janela também são lidas e
+        as linhas anteriores a ele descartadas, como numa extração completa.
+        
+        Returns:
+            Dicionário com 'rows', 'cols' e 'new_rows', ou None se o schema mudou
+        """
+        keys = self._partition_keys(partition)
+        dataset = ds.dataset(
+            dataset_dir, format="parquet", partitioning=self._partitioning(partition)
+        )
+        data_schema = pa.schema([field for field in dataset.schema if field.name not in keys])
+        
+        try:
+            delta = delta.select(data_schema.names).cast(data_schema)
+        except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            print(f"  ⚠️  Schema mudou ({e}); executando extração completa")
+            return None
+        
+        affected_filter = self._partitions_after(keys, cutoff)
+        if window_start is not None and window_start < cutoff:
+            # Partições que ainda guardam linhas anteriores ao início da janela
+            before_window = ~self._partitions_after(keys, window_start, inclusive=False)
+            affected_filter = affected_filter | before_window
+        
+        existing = dataset.to_table(filter=affected_filter)
+        kept = existing.filter(
+            self._retained_rows(existing, column, cutoff, window_start)
+        ).select(data_schema.names)
+        rewritten = self._add_partition_columns(pa.concat_tables([kept, delta]), partition)
+        
+        affected = set()
+        for table in (existing, rewritten):
+            for row in table.select(keys).group_by(keys).aggregate([]).to_pylist():
+                affected.add(tuple(row[key] for key in keys))
+        
+        tmp_dir = dataset_dir.with_name(f".{dataset_dir.name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        with self._removing_on_error(tmp_dir):
+            ds.write_dataset(
+                self._sort_table(rewritten, profile),
+                tmp_dir,
+                format="parquet",
+                partitioning=self._partitioning(partition),
+                basename_template="part-{i}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                **self._dataset_write_options(profile)
+            )
+            
+            # Substituir somente as partições afetadas
+            for values in affected:
+                relative = Path(*[f"{key}={value}" for key, value in zip(keys, values)])
+                shutil.rmtree(dataset_dir / relative, ignore_errors=True)
+                if (tmp_dir / relative).exists():
+                    (dataset_dir / relative).parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_dir / relative, dataset_dir / relative)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        print(f"  🗂️  Partições regravadas: {len(affected)}")
+        total_rows = ds.dataset(
+            dataset_dir, format="parquet", partitioning=self._partitioning(partition)
+        ).count_rows()
+        return {"rows": total_rows, "cols": len(data_schema), "new_rows": delta.num_rows}
+
+    def _get_watermarks(self) -> WatermarkStore:
+        """Obtém o armazenamento de watermarks (criado sob demanda)."""
+        with self._state_stores_lock:
+            if self._watermarks is None:
+                state_dir = (self.config.get("extraction") or {}).get("state_dir", "state")
+                self._watermarks = WatermarkStore(str(Path(state_dir) / "watermarks.json"))
+            return self._watermarks
+
+    def _get_durations(self) -> QueryDurationStore:
+        """Obtém o histórico de durações das queries (criado sob demanda)."""
+        with self._state_stores_lock:
+            if self._durations is None:
+                state_dir = (self.config.get("extraction") or {}).get("state_dir", "state")
+                self._durations = QueryDurationStore(
+                    str(Path(state_dir) / "query_durations.json"),
+                    alpha=self._execution_config()["duration_alpha"]
+                )
+            return self._durations
+
+    def _record_duration(self, database: str, query_name: str, seconds: float):
+        """Registra a duração de uma query bem-sucedida (falhas no histórico só geram aviso)."""
+        try:
+            self._get_durations().record(database, query_name, seconds)
+        except Exception as e:
+            print(f"  ⚠️  Erro ao registrar duração de {database}/{query_name}: {e}")
+
+    @staticmethod
+    def _max_value_from_parquet(parquet_file: Path, column: str) -> Optional[str]:
+        """
+        Obtém o valor máximo de uma coluna do parquet (ISO string).
+        
+        Usa as estatísticas min/max dos row groups (arquivo único ou todos os arquivos
+        do dataset particionado), sem ler os dados. Se algum row group com valores
+        não tiver estatísticas da coluna (ex.: perfil com statistics restrito), lê a
+        coluna inteira.
+        """
+        files = sorted(parquet_file.rglob("*.parquet")) if parquet_file.is_dir() else [parquet_file]
+        maxima = []
+        for file in files:
+            metadata = pq.ParquetFile(file).metadata
+            names = [metadata.schema.column(i).path for i in range(metadata.num_columns)]
+            if column not in names:
+                maxima = None
+                break
+            index = names.index(column)
+            for row_group in range(metadata.num_row_groups):
+                chunk = metadata.row_group(row_group).column(index)
+                statistics = chunk.statistics
+                if statistics is not None and statistics.has_min_max:
+                    maxima.append(statistics.max)
+                elif (statistics is None
+                      or statistics.null_count != metadata.row_group(row_group).num_rows):
+                    maxima = None
+                    break
+            if maxima is None:
+                break
+        
+        if maxima is None:
+            max_value = pc.max(pq.read_table(parquet_file, columns=[column])[column]).as_py()
+        else:
+            max_value = max(maxima, default=None)
+        if max_value is None:
+            return None
+        return max_value.isoformat() if hasattr(max_value, "isoformat") else str(max_value)
+
+    def _run_incremental_query(self, database: str, query_name: str, query_content: str,
+                               output_file: Path, query_config: dict,
+                               timer: Optional[PhaseTimer] = None) -> Optional[Dict[str, int]]:
+        """
+        Extrai apenas as linhas a partir do watermark (menos a janela de look-back)
+        e mescla com o parquet existente.
+        
+        Linhas do arquivo existente com data >= corte são substituídas pelas
+        linhas recém-extraídas, e as anteriores ao início da janela (data_inicio
+        de uma extração completa) são descartadas.
+        
+        Args:
+            database: Nome do database
+            query_name: Nome da query
+            query_content: Conteúdo da query (deve usar o parâmetro de corte)
+            output_file: Parquet existente a ser atualizado
+            query_config: Configuração efetiva da query
+            timer: Recebe os tempos das fases da query
+            
+        Returns:
+            Dicionário com 'rows', 'cols' e 'new_rows', ou None se não houver
+            base para incremental (extração completa necessária)
+        """
+        incremental = query_config.get("incremental") or {}
+        column = incremental.get("column", "Data")
+        param = incremental.get("param", "data_inicio")
+        lookback_days = int(incremental.get("lookback_days", 7))
+        watermarks = self._get_watermarks()
+        
+        if not output_file.exists():
+            return None
+        if watermarks.is_partial(database, query_name, output=str(output_file)):
+            print(f"  🔁 {output_file.name} foi gravado por uma execução filtrada; "
+                  f"extração completa")
+            return None
+        
+        watermark = watermarks.get(database, query_name, output=str(output_file))
+        if watermark is None:
+            # Sem watermark registrado para este arquivo: usa o máximo do próprio parquet
+            watermark = self._max_value_from_parquet(output_file, column)
+        if watermark is None:
+            return None
+        
+        cutoff = date.fromisoformat(watermark[:10]) - timedelta(days=lookback_days)
+        print(f"  🔁 Incremental: {column} >= {cutoff.isoformat()} "
+              f"(watermark {watermark[:10]}, look-back {lookback_days}d)")
+        
+        params = self._query_params(query_name, query_content)
+        # Início da janela de uma extração completa: linhas armazenadas anteriores a ele
+        # saem no merge
+        window_start = params.get("data_inicio")
+        delta = self._fetch_query_table(
+            database,
+            query_content,
+            # O corte do watermark substitui a janela de data_inicio da configuração
+            params={**params, param: cutoff},
+            chunk_size=query_config["chunk_size"],
+            arrow_native=query_config["fetch_mode"] == "arrow",
+            timer=timer,
+            dtypes=query_config["dtypes"]
+        )
+        
+        partition = query_config.get("partition")
+        if partition:
+            merged = self._merge_into_partitions(
+                output_file, delta, column, cutoff, partition, query_config["parquet"], window_start
+            )
+        else:
+            merged = self._merge_into_file(
+                output_file, delta, column, cutoff, query_config["parquet"], window_start
+            )
+        
+        if merged is None:
+            return None
+        
+        new_watermark = self._max_value_from_parquet(output_file, column)
+        if new_watermark:
+            watermarks.set(database, query_name, new_watermark, output=str(output_file))
+        
+        return merged
+
+    @staticmethod
+    def _retained_rows(existing: pa.Table, column: str, cutoff: date,
+                       window_start: Optional[date] = None) -> pa.ChunkedArray:
+        """Máscara das linhas armazenadas mantidas no merge: antes do corte e dentro da janela."""
+        column_type = existing.schema.field(column).type
+        mask = pc.less(existing[column], pa.scalar(cutoff).cast(column_type))
+        if window_start is not None:
+            start = pa.scalar(window_start).cast(column_type)
+            mask = pc.and_(mask, pc.greater_equal(existing[column], start))
+        return mask
+
+    def _merge_into_file(self, output_file: Path, delta: pa.Table, column: str,
+                         cutoff: date, profile: Optional[dict] = None,
+                         window_start: Optional[date] = None) -> Optional[Dict[str, int]]:
+        """
+        Mescla linhas incrementais em um parquet único.
+        
+        Linhas armazenadas anteriores a window_start (início da janela de
+        data_inicio da configuração) são descartadas, como numa extração completa.
+        
+        Returns:
+            Dicionário com 'rows', 'cols' e 'new_rows', ou None se o schema mudou
+        """
+        existing = pq.read_table(output_file)
+        try:
+            delta = delta.select(existing.column_names).cast(existing.schema)
+        except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            print(f"  ⚠️  Schema mudou ({e}); executando extração completa")
+            return None
+        
+        kept = existing.filter(self._retained_rows(existing, column, cutoff, window_start))
+        merged = pa.concat_tables([kept, delta])
+        
+        tmp_file = output_file.with_name(f"{output_file.name}.tmp")
+        with self._removing_on_error(tmp_file):
+            self._write_parquet(tmp_file, merged, profile)
+            os.replace(tmp_file, output_file)
+        
+        return {"rows": merged.num_rows, "cols": merged.num_columns, "new_rows": delta.num_rows}
+
     def _load_sql_files(self, sql_dir: str = "sql") -> Dict[str, str]:
         """
         Carrega todos os arquivos SQL de um diretório.
@@ -167,13 +1419,318 @@ class SQLQuery:
         
         return sql_files
     
-    def execute_all_queries(self, output_base_dir: str = "data") -> Dict[str, any]:
+    def _run_query_to_parquet(self, database: str, query_name: str, query_content: str,
+                              db_output_dir: Path) -> Dict[str, any]:
+        """
+        Executa uma query em um database e salva o resultado como parquet.
+        
+        Args:
+            database: Nome do database
+            query_name: Nome da query (nome do arquivo SQL sem extensão)
+            query_content: Conteúdo da query
+            db_output_dir: Diretório de saída do database
+            
+        Returns:
+            Dicionário com os detalhes da execução (status 'success' ou 'failed')
+        """
+        try:
+            query_config = self._query_config(query_name)
+            params = self._query_params(query_name, query_content)
+            partition = query_config.get("partition")
+            # Particionado: dataset em data/{database}/{query}/; senão arquivo único
+            output_file = db_output_dir / (query_name if partition else f"{query_name}.parquet")
+            query_start = time.perf_counter()
+            timer = PhaseTimer()
+            merged = None
+            
+            if (query_config.get("incremental") or {}).get("enabled") and not self.param_overrides:
+                # Extração incremental a partir do watermark (None = extração completa);
+                # parâmetros informados na execução forçam a extração completa com eles
+                merged = self._run_incremental_query(
+                    database, query_name, query_content, output_file, query_config, timer
+                )
+            
+            # Extração completa dividida em faixas paralelas (configuração 'split')
+            slices = self._query_slices(query_name, query_config, params) if merged is None else []
+            
+            if merged is not None:
+                rows, cols = merged["rows"], merged["cols"]
+                query_elapsed = time.perf_counter() - query_start
+            elif partition:
+                # Dataset particionado (hive) pela coluna de data configurada
+                if slices:
+                    tables = self._iter_split_tables(
+                        database, query_content, slices, query_config, timer
+                    )
+                elif query_config["fetch_mode"] in ("stream", "arrow"):
+                    tables = self._iter_query_tables(
+                        database,
+                        query_content,
+                        params=params,
+                        chunk_size=query_config["chunk_size"],
+                        arrow_native=query_config["fetch_mode"] == "arrow",
+                        timer=timer,
+                        dtypes=query_config["dtypes"]
+                    )
+                else:
+                    df = self._execute_query(database, query_content, params=params, timer=timer)
+                    with timer.phase("serialize"):
+                        df = self._optimize_frame(df, query_config)
+                        tables = [self._frame_to_table(df)]
+                
+                written = self._write_partitioned_dataset(
+                    tables, output_file, partition, query_config["parquet"]
+                )
+                rows, cols = written["rows"], written["cols"]
+                query_elapsed = time.perf_counter() - query_start
+                
+                # Remove o arquivo único de execuções anteriores sem partição
+                legacy_file = db_output_dir / f"{query_name}.parquet"
+                if legacy_file.exists():
+                    legacy_file.unlink()
+            elif slices:
+                # Faixas paralelas gravadas como row groups de um único arquivo
+                tmp_file = output_file.with_name(f"{output_file.name}.tmp")
+                with self._removing_on_error(tmp_file):
+                    written = self._write_tables_to_parquet(
+                        self._iter_split_tables(
+                            database, query_content, slices, query_config, timer
+                        ),
+                        tmp_file,
+                        query_config["parquet"],
+                        timer
+                    )
+                    os.replace(tmp_file, output_file)
+                rows, cols = written["rows"], written["cols"]
+                query_elapsed = time.perf_counter() - query_start
+            elif query_config["fetch_mode"] in ("stream", "arrow"):
+                # Leitura em lotes gravando direto em row groups
+                written = self._stream_query_to_parquet(
+                    database,
+                    query_content,
+                    output_file,
+                    params=params,
+                    chunk_size=query_config["chunk_size"],
+                    arrow_native=query_config["fetch_mode"] == "arrow",
+                    timer=timer,
+                    profile=query_config["parquet"],
+                    dtypes=query_config["dtypes"]
+                )
+                rows, cols = written["rows"], written["cols"]
+                query_elapsed = time.perf_counter() - query_start
+            else:
+                # Executar query
+                df = self._execute_query(database, query_content, params=params, timer=timer)
+                with timer.phase("serialize"):
+                    df = self._optimize_frame(df, query_config)
+                query_elapsed = time.perf_counter() - query_start
+                
+                # Salvar como parquet
+                with timer.phase("write"):
+                    self._write_parquet(
+                        output_file, self._frame_to_table(df), query_config["parquet"]
+                    )
+                rows, cols = len(df), len(df.columns)
+            
+            incremental = query_config.get("incremental") or {}
+            if self.param_overrides:
+                # Arquivo filtrado pelos parâmetros da execução (empresas, limite, datas):
+                # não serve de base para o incremental, a próxima execução normal é completa
+                self._get_watermarks().mark_partial(database, query_name, output=str(output_file))
+            elif incremental.get("enabled") and merged is None and rows > 0:
+                # Extração completa: registra o watermark para as próximas execuções
+                watermark = self._max_value_from_parquet(
+                    output_file, incremental.get("column", "Data")
+                )
+                if watermark:
+                    self._get_watermarks().set(
+                        database, query_name, watermark, output=str(output_file)
+                    )
+            
+            if rows == 0:
+                print(f"  ⚠️  Query retornou 0 linhas - salvando arquivo vazio")
+            
+            if output_file.is_dir():
+                size_bytes = sum(f.stat().st_size for f in output_file.rglob("*.parquet"))
+            else:
+                size_bytes = output_file.stat().st_size
+            file_size = size_bytes / 1024  # KB
+            
+            # Gravação intercalada com a leitura (dataset particionado/merge incremental)
+            # não é medida por fase: o restante do tempo é atribuído a 'write'
+            total_elapsed = time.perf_counter() - query_start
+            if "write" not in timer.phases:
+                timer.add("write", max(0.0, total_elapsed - timer.total()))
+            
+            print(f"  ✅ Salvo: {output_file}")
+            print(f"     📈 Linhas: {rows:,} | Colunas: {cols} | Tamanho: {file_size:.1f} KB | "
+                  f"Tempo: {query_elapsed:.2f}s")
+            
+            detail = {
+                "query": query_name,
+                "rows": rows,
+                "cols": cols,
+                "time": query_elapsed,
+                "status": "success",
+                **record_query_metrics(database, query_name, timer, total_elapsed, rows, size_bytes)
+            }
+            if merged is not None:
+                detail["mode"] = "incremental"
+                detail["new_rows"] = merged["new_rows"]
+            
+        except Exception as e:
+            print(f"  ❌ Erro em {database}/{query_name}.sql: {str(e)}")
+            metrics.inc(
+                "etl_query_runs_total", status="failed", database=database, query=query_name
+            )
+            return {
+                "query": query_name,
+                "status": "failed",
+                "error": str(e)
+            }
+        
+        # Histórico usado para despachar primeiro os pares mais demorados
+        self._record_duration(database, query_name, total_elapsed)
+        return detail
+    
+    @staticmethod
+    def _succeeded_queries(stats: Dict[str, any], database: Optional[str] = None) -> set:
+        """Queries concluídas com sucesso registradas em stats (opcionalmente de um database)."""
+        return {
+            detail["query"] for detail in stats["details"]
+            if detail["status"] == "success"
+            and (database is None or detail.get("database") == database)
+        }
+
+    def _record_detail(self, stats: Dict[str, any], detail: Dict[str, any],
+                       database: Optional[str] = None):
+        """Contabiliza o resultado de uma execução no dicionário de estatísticas."""
+        stats["total_executions"] += 1
+        
+        if detail["status"] == "success":
+            stats["successful"] += 1
+        else:
+            error_msg = f"Query: {detail['query']}.sql, Error: {detail['error']}"
+            if database:
+                error_msg = f"Database: {database}, {error_msg}"
+            stats["failed"] += 1
+            stats["errors"].append(error_msg)
+        
+        if database:
+            detail = {"database": database, **detail}
+        stats["details"].append(detail)
+    
+    def _order_longest_first(self, pending: List[tuple]) -> List[tuple]:
+        """
+        Ordena os pares (database, query, conteúdo) pela duração esperada, maior primeiro.
+        
+        A duração vem do histórico (EWMA das execuções anteriores). Pares sem histórico
+        vão à frente, pois podem ser longos; a ordenação é estável, então empates
+        mantêm a ordem do YAML/arquivos.
+        """
+        durations = self._get_durations().durations()
+        
+        def expected(item):
+            seconds = QueryDurationStore.estimate(durations, item[0], item[1])
+            return float("inf") if seconds is None else seconds
+        
+        ordered = sorted(pending, key=expected, reverse=True)
+        known = sum(1 for item in ordered if expected(item) != float("inf"))
+        print(f"📐 Ordem de despacho: maior duração esperada primeiro "
+              f"({known}/{len(ordered)} pares com histórico)")
+        return ordered
+    
+    def _execute_all_parallel(self, databases: List[str], sql_files: Dict[str, str],
+                              output_base_dir: str, stats: Dict[str, any], max_workers: int,
+                              on_database_complete=None):
+        """
+        Executa as combinações (database, query) em paralelo com limites de concorrência.
+        
+        O despacho respeita o número de workers e o limite de queries simultâneas por
+        database; o limite global (por processo) é aplicado em _execute_query. Com
+        execution.schedule = longest_first, os pares mais demorados saem primeiro.
+        
+        Args:
+            databases: Lista de databases
+            sql_files: Dicionário {nome_query: conteúdo}
+            output_base_dir: Diretório base de saída
+            stats: Dicionário de estatísticas a ser preenchido
+            max_workers: Número de threads de trabalho
+            on_database_complete: Função chamada com (database, diretório de saída, queries
+                                  concluídas com sucesso) quando todas as queries do
+                                  database terminam
+        """
+        per_database_limit = self._execution_config()["max_queries_per_database"]
+        
+        pending = [
+            (database, query_name, query_content)
+            for database in databases
+            for query_name, query_content in sql_files.items()
+        ]
+        if self._execution_config()["schedule"] == "longest_first":
+            pending = self._order_longest_first(pending)
+        running = {}
+        running_per_database = defaultdict(int)
+        # Queries restantes por database (on_database_complete roda quando todas terminam)
+        remaining_per_database = defaultdict(int)
+        for database, _, _ in pending:
+            remaining_per_database[database] += 1
+        
+        print(f"\n⚡ Execução paralela: {max_workers} workers | "
+              f"{per_database_limit} queries por database | "
+              f"{self._execution_config()['max_concurrent_queries']} queries globais")
+        
+        for database in databases:
+            (Path(output_base_dir) / database).mkdir(parents=True, exist_ok=True)
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sql-query") as pool:
+            while pending or running:
+                # Despachar tarefas cujo database ainda tem capacidade livre
+                index = 0
+                while index < len(pending) and len(running) < max_workers:
+                    database, query_name, query_content = pending[index]
+                    if running_per_database[database] >= per_database_limit:
+                        index += 1
+                        continue
+                    
+                    pending.pop(index)
+                    print(f"\n  ▶️  [{database}] Executando: {query_name}.sql")
+                    future = pool.submit(
+                        self._run_query_to_parquet,
+                        database,
+                        query_name,
+                        query_content,
+                        Path(output_base_dir) / database
+                    )
+                    running[future] = database
+                    running_per_database[database] += 1
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    database = running.pop(future)
+                    running_per_database[database] -= 1
+                    self._record_detail(stats, future.result(), database=database)
+                    
+                    remaining_per_database[database] -= 1
+                    if remaining_per_database[database] == 0 and on_database_complete is not None:
+                        successful = len(self._succeeded_queries(stats, database))
+                        on_database_complete(database, Path(output_base_dir) / database, successful)
+    
+    def execute_all_queries(self, output_base_dir: str = "data", parallel: Optional[bool] = None,
+                            max_workers: Optional[int] = None,
+                            on_database_complete=None) -> Dict[str, any]:
         """
         Executa todas as queries SQL contra todos os databases configurados.
         Salva os resultados como arquivos parquet em data/{database}/ folders.
         
         Args:
             output_base_dir: Diretório base para salvar os arquivos (padrão: 'data')
+            parallel: Executar em paralelo (padrão: valor de execution.parallel no YAML)
+            max_workers: Número de workers no modo paralelo (padrão: execution.max_workers)
+            on_database_complete: Função chamada com (database, diretório de saída, queries
+                                  concluídas com sucesso) assim que todas as queries de um
+                                  database terminam; permite enviar os arquivos enquanto os
+                                  demais databases são extraídos
             
         Returns:
             Dicionário com estatísticas de execução e erros
@@ -209,64 +1766,42 @@ class SQLQuery:
             "details": []
         }
         
+        execution_config = self._execution_config()
+        if parallel is None:
+            parallel = execution_config["parallel"]
+        if max_workers is None:
+            max_workers = execution_config["max_workers"]
+        
         start_time = time.perf_counter()
         
-        # Iterar sobre cada database
-        for db_index, database in enumerate(databases, 1):
-            print(f"\n{'=' * 80}")
-            print(f"📊 Database [{db_index}/{len(databases)}]: {database}")
-            print(f"{'=' * 80}")
-            
-            # Criar diretório para o database
-            db_output_dir = Path(output_base_dir) / database
-            db_output_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Iterar sobre cada query SQL
-            for query_index, (query_name, query_content) in enumerate(sql_files.items(), 1):
-                stats["total_executions"] += 1
+        if parallel:
+            self._execute_all_parallel(
+                databases, sql_files, output_base_dir, stats, max(1, max_workers),
+                on_database_complete
+            )
+        else:
+            # Iterar sobre cada database
+            for db_index, database in enumerate(databases, 1):
+                print(f"\n{'=' * 80}")
+                print(f"📊 Database [{db_index}/{len(databases)}]: {database}")
+                print(f"{'=' * 80}")
                 
-                print(f"\n  [{query_index}/{len(sql_files)}] Executando: {query_name}.sql")
+                # Criar diretório para o database
+                db_output_dir = Path(output_base_dir) / database
+                db_output_dir.mkdir(parents=True, exist_ok=True)
                 
-                try:
-                    # Executar query
-                    query_start = time.perf_counter()
-                    df = self._execute_query(database, query_content)
-                    query_elapsed = time.perf_counter() - query_start
-                    
-                    if df.empty:
-                        print(f"  ⚠️  Query retornou 0 linhas - salvando arquivo vazio")
-                    
-                    # Salvar como parquet
-                    output_file = db_output_dir / f"{query_name}.parquet"
-                    df.to_parquet(output_file, index=False, engine='pyarrow')
-                    
-                    file_size = output_file.stat().st_size / 1024  # KB
-                    
-                    print(f"  ✅ Salvo: {output_file}")
-                    print(f"     📈 Linhas: {len(df):,} | Colunas: {len(df.columns)} | Tamanho: {file_size:.1f} KB | Tempo: {query_elapsed:.2f}s")
-                    
-                    stats["successful"] += 1
-                    stats["details"].append({
-                        "database": database,
-                        "query": query_name,
-                        "rows": len(df),
-                        "cols": len(df.columns),
-                        "time": query_elapsed,
-                        "status": "success"
-                    })
-                    
-                except Exception as e:
-                    error_msg = f"Database: {database}, Query: {query_name}.sql, Error: {str(e)}"
-                    print(f"  ❌ Erro: {str(e)}")
+                # Iterar sobre cada query SQL
+                for query_index, (query_name, query_content) in enumerate(sql_files.items(), 1):
+                    print(f"\n  [{query_index}/{len(sql_files)}] Executando: {query_name}.sql")
                     
-                    stats["failed"] += 1
-                    stats["errors"].append(error_msg)
-                    stats["details"].append({
-                        "database": database,
-                        "query": query_name,
-                        "status": "failed",
-                        "error": str(e)
-                    })
+                    detail = self._run_query_to_parquet(
+                        database, query_name, query_content, db_output_dir
+                    )
+                    self._record_detail(stats, detail, database=database)
+                
+                if on_database_complete is not None:
+                    succeeded = len(self._succeeded_queries(stats, database))
+                    on_database_complete(database, db_output_dir, succeeded)
         
         total_elapsed = time.perf_counter() - start_time
         
@@ -346,48 +1881,10 @@ class SQLQuery:
         
         # Iterar sobre cada query SQL
         for query_index, (query_name, query_content) in enumerate(sql_files.items(), 1):
-            stats["total_executions"] += 1
-            
             print(f"\n[{query_index}/{len(sql_files)}] Executando: {query_name}.sql")
             
-            try:
-                # Executar query
-                query_start = time.perf_counter()
-                df = self._execute_query(database, query_content)
-                query_elapsed = time.perf_counter() - query_start
-                
-                if df.empty:
-                    print(f"  ⚠️  Query retornou 0 linhas - salvando arquivo vazio")
-                
-                # Salvar como parquet
-                output_file = db_output_dir / f"{query_name}.parquet"
-                df.to_parquet(output_file, index=False, engine='pyarrow')
-                
-                file_size = output_file.stat().st_size / 1024  # KB
-                
-                print(f"  ✅ Salvo: {output_file}")
-                print(f"     📈 Linhas: {len(df):,} | Colunas: {len(df.columns)} | Tamanho: {file_size:.1f} KB | Tempo: {query_elapsed:.2f}s")
-                
-                stats["successful"] += 1
-                stats["details"].append({
-                    "query": query_name,
-                    "rows": len(df),
-                    "cols": len(df.columns),
-                    "time": query_elapsed,
-                    "status": "success"
-                })
-                
-            except Exception as e:
-                error_msg = f"Query: {query_name}.sql, Error: {str(e)}"
-                print(f"  ❌ Erro: {str(e)}")
-                
-                stats["failed"] += 1
-                stats["errors"].append(error_msg)
-                stats["details"].append({
-                    "query": query_name,
-                    "status": "failed",
-                    "error": str(e)
-                })
+            detail = self._run_query_to_parquet(database, query_name, query_content, db_output_dir)
+            self._record_detail(stats, detail)
         
         total_elapsed = time.perf_counter() - start_time
         
@@ -413,6 +1910,87 @@ class SQLQuery:
         
         return stats
     
+    def execute_queries_to_buffers(self, database: str, on_query_buffer) -> Dict[str, any]:
+        """
+        Executa todas as queries de um database serializando cada resultado em memória.
+        
+        Cada parquet é entregue a on_query_buffer assim que fica pronto, sem passar
+        pelo disco; se o callback apenas agenda o envio, o upload de uma query
+        ocorre enquanto a próxima é extraída.
+        
+        Args:
+            database: Nome do database para executar as queries
+            on_query_buffer: Função chamada com (query_name, buffer BytesIO) para
+                             cada query executada com sucesso
+            
+        Returns:
+            Dicionário com estatísticas de execução e erros (mesmo formato de
+            execute_queries_for_database)
+        """
+        print("=" * 80)
+        print(f"🚀 Iniciando execução em memória no database: {database}")
+        print("=" * 80)
+        
+        databases = self.config.get('databases', [])
+        if database not in databases:
+            print(f"❌ Database '{database}' não encontrado na configuração")
+            print(f"   Databases disponíveis: {', '.join(databases)}")
+            return {
+                "success": False, 
+                "error": f"Database '{database}' not configured",
+                "available_databases": databases
+            }
+        
+        sql_files = self._load_sql_files()
+        if not sql_files:
+            print("❌ Nenhum arquivo SQL encontrado na pasta sql/")
+            return {"success": False, "error": "No SQL files found"}
+        
+        print(f"\n📊 Total de queries a executar: {len(sql_files)}")
+        print(f"   Arquivos: {', '.join(sql_files.keys())}")
+        print(f"🗄️  Database: {database}")
+        
+        stats = {
+            "database": database,
+            "total_executions": 0,
+            "successful": 0,
+            "failed": 0,
+            "errors": [],
+            "details": []
+        }
+        
+        start_time = time.perf_counter()
+        
+        for query_index, (query_name, query_content) in enumerate(sql_files.items(), 1):
+            print(f"\n[{query_index}/{len(sql_files)}] Executando: {query_name}.sql")
+            
+            buffer, detail = self._query_to_parquet_buffer(database, query_name, query_content)
+            self._record_detail(stats, detail)
+            if buffer is not None:
+                on_query_buffer(query_name, buffer)
+        
+        total_elapsed = time.perf_counter() - start_time
+        
+        print(f"\n{'=' * 80}")
+        print("📊 SUMÁRIO DA EXECUÇÃO")
+        print(f"{'=' * 80}")
+        print(f"🗄️  Database: {database}")
+        print(f"✅ Sucesso: {stats['successful']}/{stats['total_executions']}")
+        print(f"❌ Falhas: {stats['failed']}/{stats['total_executions']}")
+        print(f"⏱️  Tempo total: {total_elapsed:.2f}s")
+        
+        if stats['errors']:
+            print(f"\n⚠️  Erros encontrados:")
+            for error in stats['errors']:
+                print(f"   - {error}")
+        
+        print(f"\n{'=' * 80}")
+        
+        stats["total_time"] = total_elapsed
+        stats["success"] = True
+        
+        return stats
+    
 if __name__ == '__main__':
     # Exemplo de uso: executar todas as queries em todos os databases
     extractor = SQLQuery()
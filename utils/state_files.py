@@ -0,0 +1,78 @@
+"""
+Arquivos de Estado Locais
+Lock por arquivo compartilhado pelo processo, gravação atômica e base comum dos JSONs
+de estado (watermarks, manifesto de uploads, durações das queries)
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+# Um lock por caminho absoluto: instâncias diferentes que apontam para o mesmo
+# arquivo (ex.: jobs simultâneos da API) serializam a leitura-modificação-gravação
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+
+
+def state_lock(state_file: Path) -> threading.Lock:
+    """Retorna o lock do processo associado a um arquivo de estado."""
+    key = os.path.abspath(state_file)
+    with _path_locks_guard:
+        return _path_locks.setdefault(key, threading.Lock())
+
+
+def write_json_atomic(state_file: Path, data: Dict[str, Any]):
+    """
+    Grava um JSON de forma atômica.
+
+    O conteúdo vai para um temporário exclusivo no mesmo diretório, que então
+    substitui o arquivo; leitores nunca veem um arquivo parcial.
+    """
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=state_file.parent,
+                                      prefix=f".{state_file.name}.", suffix=".tmp", delete=False)
+    try:
+        with tmp as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp.name, state_file)
+    except Exception:
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+        raise
+
+
+class JsonStateStore:
+    """
+    Base dos arquivos de estado em JSON.
+
+    As subclasses implementam só os métodos do domínio, fazendo a
+    leitura-modificação-gravação com self._read()/self._write() sob self._lock.
+    """
+
+    # Nome do estado nas mensagens de erro
+    label = "estado"
+
+    def __init__(self, state_file: str):
+        self.state_file = Path(state_file)
+        # Lock do processo por arquivo (compartilhado entre instâncias)
+        self._lock = state_lock(self.state_file)
+
+    def _read(self) -> Dict[str, Any]:
+        """Lê o arquivo de estado (vazio se não existir ou estiver corrompido)."""
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Erro ao ler {self.label} em {self.state_file}: {e}")
+            return {}
+
+    def _write(self, state: Dict[str, Any]):
+        """Grava o arquivo de estado de forma atômica."""
+        write_json_atomic(self.state_file, state)
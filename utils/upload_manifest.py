@@ -0,0 +1,93 @@
+"""
+Manifesto de Uploads
+Registra o hash de conteúdo (e número de linhas) dos arquivos enviados para cada
+destino (pasta SFTP ou bucket Supabase), permitindo pular arquivos inalterados.
+"""
+
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.state_files import JsonStateStore
+
+
+class UploadManifest(JsonStateStore):
+    """Manifesto local em JSON: {destino: {arquivo: {sha256, size, rows, uploaded_at}}}."""
+
+    label = "manifesto de uploads"
+
+    def __init__(self, manifest_file: str = "state/upload_manifest.json"):
+        super().__init__(manifest_file)
+
+    @staticmethod
+    def fingerprint(file_path: str) -> Dict[str, Any]:
+        """
+        Calcula a impressão digital de um arquivo.
+
+        Args:
+            file_path: Caminho local do arquivo
+
+        Returns:
+            Dicionário com 'sha256', 'size' e 'rows' (None se não for parquet legível)
+        """
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(block)
+
+        try:
+            rows = pq.ParquetFile(file_path).metadata.num_rows
+        except Exception:
+            rows = None
+
+        return {
+            "sha256": sha256.hexdigest(),
+            "size": Path(file_path).stat().st_size,
+            "rows": rows
+        }
+
+    @staticmethod
+    def fingerprint_bytes(data: bytes) -> Dict[str, Any]:
+        """
+        Calcula a impressão digital de um parquet em memória.
+
+        Args:
+            data: Conteúdo do arquivo
+
+        Returns:
+            Dicionário com 'sha256', 'size' e 'rows' (None se não for parquet legível)
+        """
+        try:
+            rows = pq.ParquetFile(pa.BufferReader(data)).metadata.num_rows
+        except Exception:
+            rows = None
+
+        return {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+            "rows": rows
+        }
+
+    def get(self, target: str, file_key: str) -> Optional[Dict[str, Any]]:
+        """Retorna o registro do último upload bem-sucedido de um arquivo."""
+        with self._lock:
+            return self._read().get(target, {}).get(file_key)
+
+    def is_unchanged(self, target: str, file_key: str, fingerprint: Dict[str, Any]) -> bool:
+        """Verifica se o arquivo tem o mesmo hash do último upload bem-sucedido."""
+        entry = self.get(target, file_key)
+        return bool(entry) and entry.get("sha256") == fingerprint["sha256"]
+
+    def record(self, target: str, file_key: str, fingerprint: Dict[str, Any]):
+        """Registra um upload bem-sucedido."""
+        with self._lock:
+            manifest = self._read()
+            manifest.setdefault(target, {})[file_key] = {
+                **fingerprint,
+                "uploaded_at": datetime.now().isoformat()
+            }
+            self._write(manifest)
@@ -5,13 +5,19 @@ This module provides a simple class for uploading and downloading Parquet files
 to/from Supabase storage buckets.
 """
 
+import hashlib
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Union
 import pandas as pd
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from utils.metrics import record_upload_metrics
+from utils.upload_manifest import UploadManifest
+
 class SupabaseUploader:
     """
     A simple class for handling Parquet file uploads and downloads to Supabase storage.
@@ -28,7 +34,8 @@ class SupabaseUploader:
     DEFAULT_URL = "https://supabase.agendai.cc/"
     DEFAULT_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.ewogICJyb2xlIjogInNlcnZpY2Vfcm9sZSIsCiAgImlzcyI6ICJzdXBhYmFzZSIsCiAgImlhdCI6IDE3NDM5OTQ4MDAsCiAgImV4cCI6IDE5MDE3NjEyMDAKfQ.CcQ_oefiHWsvTbtGzq9GL6kRu5uv38U8oS6HSKeG2Ao"
     
-    def __init__(self, url: Optional[str] = None, key: Optional[str] = None):
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None,
+                 manifest_file: str = "state/upload_manifest.json"):
         """
         Initialize the Supabase client.
         
@@ -40,6 +47,7 @@ class SupabaseUploader:
         Args:
             url: Supabase URL (overrides environment variable and default)
             key: Supabase service key (overrides environment variable and default)
+            manifest_file: Local manifest of uploaded content hashes
         """
         # Load environment variables from .env file
         load_dotenv()
@@ -53,14 +61,17 @@ class SupabaseUploader:
             raise ValueError("Supabase URL and KEY must be provided either as parameters or environment variables")
         
         self.supabase: Client = create_client(self.url, self.key)
+        self.manifest = UploadManifest(manifest_file)
     
-    def upload_parquet(self, bucket_name: str, file_path: str) -> Optional[dict]:
+    def upload_parquet(self, bucket_name: str, file_path: str,
+                       storage_path: Optional[str] = None) -> Optional[dict]:
         """
         Upload a Parquet file to Supabase storage.
         
         Args:
             bucket_name: Name of the Supabase storage bucket
             file_path: Local path to the Parquet file
+            storage_path: Path inside the bucket (default: the file name)
             
         Returns:
             Response dictionary from Supabase on success, None on failure
@@ -70,19 +81,17 @@ class SupabaseUploader:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"Arquivo {file_path} não encontrado para upload")
             
-            # Read file data
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-            
-            # Extract only the filename for storage path
-            file_name = os.path.basename(file_path)
+            # Storage path: explicit (e.g. partitioned datasets) or only the filename
+            file_name = storage_path or os.path.basename(file_path)
             
-            # Upload to Supabase storage
-            response = self.supabase.storage.from_(bucket_name).upload(
-                file_name,  # Use only the filename
-                file_data,
-                {'upsert': 'true'}  # Allow overwriting existing files
-            )
+            # Upload to Supabase storage, streaming the request body from the open
+            # file handle instead of loading the whole file into memory
+            with open(file_path, "rb") as file_data:
+                response = self.supabase.storage.from_(bucket_name).upload(
+                    file_name,  # storage_path or the bare filename (see above)
+                    file_data,
+                    {'upsert': 'true'}  # Allow overwriting existing files
+                )
             
             print(f"Arquivo {file_name} enviado com sucesso para o bucket {bucket_name}")
             return response
@@ -91,6 +100,67 @@ class SupabaseUploader:
             print(f"Erro no upload do arquivo {file_path}: {str(e)}")
             return None
     
+    def upload_parquet_buffer(self, bucket_name: str, buffer, storage_path: str,
+                              skip_unchanged: bool = True,
+                              timings: Optional[dict] = None) -> str:
+        """
+        Upload an in-memory Parquet buffer to Supabase storage (no temp file on disk).
+        
+        Args:
+            bucket_name: Name of the Supabase storage bucket
+            buffer: Binary file-like object (e.g. BytesIO) with the Parquet content
+            storage_path: Path inside the bucket
+            skip_unchanged: Skip the upload if the content hash matches the last
+                            successful upload to the same bucket
+            timings: Optional dict that receives the upload time/throughput under storage_path
+            
+        Returns:
+            'success', 'failed' or 'skipped'
+        """
+        manifest_target = f"supabase://{self.url.rstrip('/')}/{bucket_name}"
+        
+        file_data = buffer.getvalue()
+        start = None
+        try:
+            fingerprint = self.manifest.fingerprint_bytes(file_data)
+            if skip_unchanged and self.manifest.is_unchanged(
+                manifest_target, storage_path, fingerprint
+            ):
+                print(f"   ⏭️  {storage_path} - Sem alteração desde o último upload")
+                return "skipped"
+            
+            start = time.perf_counter()
+            self.supabase.storage.from_(bucket_name).upload(
+                storage_path,
+                file_data,
+                {'upsert': 'true'}  # Allow overwriting existing files
+            )
+            self._record_timing(
+                timings, bucket_name, storage_path, start, len(file_data), "success"
+            )
+            
+            self.manifest.record(manifest_target, storage_path, fingerprint)
+            print(f"   ✅ {storage_path} - Upload realizado com sucesso")
+            return "success"
+            
+        except Exception as e:
+            if start is not None:
+                self._record_timing(
+                    timings, bucket_name, storage_path, start, len(file_data), "failed"
+                )
+            print(f"   ❌ {storage_path} - Erro: {str(e)}")
+            return "failed"
+    
+    @staticmethod
+    def _record_timing(timings: Optional[dict], bucket_name: str, storage_path: str,
+                       start: float, size_bytes: int, status: str):
+        """Record upload metrics and, if requested, store them in the timings dict."""
+        timing = record_upload_metrics(
+            "supabase", bucket_name, time.perf_counter() - start, size_bytes, status
+        )
+        if timings is not None:
+            timings[storage_path] = timing
+    
     def download_parquet(self, bucket_name: str, file_name: str, local_path: str) -> Optional[pd.DataFrame]:
         """
         Download a Parquet file from Supabase storage and return as DataFrame.
@@ -104,20 +174,7 @@ class SupabaseUploader:
             Pandas DataFrame on success, None on failure
         """
         try:
-            # Download file from Supabase storage
-            response = self.supabase.storage.from_(bucket_name).download(file_name)
-            
-            if response is None:
-                raise Exception("Arquivo não encontrado no storage")
-            
-            # Create local directory if it doesn't exist
-            os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            
-            # Write file locally
-            with open(local_path, "wb") as f:
-                f.write(response)
-            
-            print(f"Arquivo {file_name} baixado com sucesso em: {local_path}")
+            self._download_file(bucket_name, file_name, local_path)
             
             # Read and return as DataFrame
             file_data = pd.read_parquet(local_path)
@@ -127,6 +184,60 @@ class SupabaseUploader:
             print(f"Erro no download do arquivo {file_name}: {str(e)}")
             return None
     
+    def _download_file(self, bucket_name: str, file_name: str, local_path: str) -> str:
+        """
+        Download a file from Supabase storage to a local path (without parsing it).
+        
+        Returns:
+            The local path; raises on failure
+        """
+        # Download file from Supabase storage
+        response = self.supabase.storage.from_(bucket_name).download(file_name)
+        
+        if response is None:
+            raise Exception("Arquivo não encontrado no storage")
+        
+        # Create local directory if it doesn't exist
+        local_dir = os.path.dirname(local_path)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+        
+        # Write to a temporary file first so a failed download never leaves a
+        # truncated copy that would later be considered up to date
+        tmp_path = f"{local_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(response)
+        os.replace(tmp_path, local_path)
+        
+        print(f"Arquivo {file_name} baixado com sucesso em: {local_path}")
+        return local_path
+    
+    @staticmethod
+    def _is_local_copy_current(file_info: dict, local_path: str) -> bool:
+        """
+        Check whether a local file already matches the remote object.
+        
+        The remote size must match; when the eTag is a plain MD5 (single-part
+        upload) the local content hash must match it as well.
+        """
+        if not os.path.exists(local_path):
+            return False
+        
+        metadata = file_info.get("metadata") or {}
+        remote_size = metadata.get("size", metadata.get("contentLength"))
+        if remote_size is None or int(remote_size) != os.path.getsize(local_path):
+            return False
+        
+        etag = (metadata.get("eTag") or "").strip('"')
+        if etag and "-" not in etag:
+            md5 = hashlib.md5()
+            with open(local_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    md5.update(block)
+            return md5.hexdigest() == etag
+        
+        return True
+    
     def list_files(self, bucket_name: str, folder_path: str = "") -> Optional[list]:
         """
         List files in a Supabase storage bucket.
@@ -164,22 +275,65 @@ class SupabaseUploader:
             print(f"Erro ao remover arquivo {file_name}: {str(e)}")
             return False
     
-    def upload_directory_parquet(self, directory_path: str, bucket_name: str) -> dict:
+    def _upload_directory_file(self, bucket_name: str, file_path: str, file_name: str,
+                               manifest_target: str, skip_unchanged: bool,
+                               timings: Optional[dict] = None) -> str:
+        """
+        Upload a single file of a directory batch.
+        
+        Returns:
+            'success', 'failed' or 'skipped'
+        """
+        start = None
+        try:
+            # Skip files identical to the last successful upload
+            fingerprint = self.manifest.fingerprint(file_path)
+            if skip_unchanged and self.manifest.is_unchanged(
+                manifest_target, file_name, fingerprint
+            ):
+                print(f"   ⏭️  {file_name} - Sem alteração desde o último upload")
+                return "skipped"
+            
+            start = time.perf_counter()
+            result = self.upload_parquet(bucket_name, file_path, storage_path=file_name)
+            status = "success" if result else "failed"
+            self._record_timing(timings, bucket_name, file_name, start, fingerprint["size"], status)
+            if result:
+                self.manifest.record(manifest_target, file_name, fingerprint)
+                print(f"   ✅ {file_name} - Upload realizado com sucesso")
+                return "success"
+            
+            print(f"   ❌ {file_name} - Falha no upload")
+            return "failed"
+        except Exception as e:
+            if start is not None:
+                self._record_timing(
+                    timings, bucket_name, file_name, start, os.path.getsize(file_path), "failed"
+                )
+            print(f"   ❌ {file_name} - Erro: {str(e)}")
+            return "failed"
+    
+    def upload_directory_parquet(self, directory_path: str, bucket_name: str,
+                                 skip_unchanged: bool = True, max_workers: int = 4) -> dict:
         """
         Upload all Parquet files from a directory to Supabase storage.
         
         Args:
             directory_path: Path to the directory containing Parquet files
             bucket_name: Name of the Supabase storage bucket
+            skip_unchanged: Skip files whose content hash matches the last
+                            successful upload to the same bucket
+            max_workers: Maximum number of concurrent uploads (1 = sequential)
             
         Returns:
             dict: Summary with success count, failure count, and details
         """
         import glob
         
-        # Find all .parquet files in the directory
-        parquet_pattern = os.path.join(directory_path, "*.parquet")
-        parquet_files = glob.glob(parquet_pattern)
+        # Find all .parquet files in the directory, including partitioned datasets
+        # (hidden paths such as temporary '.vendas.tmp' directories are skipped)
+        parquet_pattern = os.path.join(directory_path, "**", "*.parquet")
+        parquet_files = sorted(glob.glob(parquet_pattern, recursive=True))
         
         if not parquet_files:
             print(f"❌ Nenhum arquivo .parquet encontrado em {directory_path}")
@@ -187,40 +341,53 @@ class SupabaseUploader:
                 "total_files": 0,
                 "successful_uploads": 0,
                 "failed_uploads": 0,
+                "skipped_uploads": 0,
                 "successful_files": [],
-                "failed_files": []
+                "failed_files": [],
+                "skipped_files": [],
+                "timings": {}
             }
         
         print(f"📁 Encontrados {len(parquet_files)} arquivos .parquet em {directory_path}")
         print("=" * 60)
         
-        # Initialize counters
-        successful_uploads = 0
-        failed_uploads = 0
-        successful_files = []
-        failed_files = []
+        manifest_target = f"supabase://{self.url.rstrip('/')}/{bucket_name}"
+        file_names = [
+            os.path.relpath(file_path, directory_path).replace(os.sep, "/")
+            for file_path in parquet_files
+        ]
+        
+        timings = {}
         
-        # Process each file
-        for i, file_path in enumerate(parquet_files, 1):
-            file_name = os.path.basename(file_path)
+        def upload_one(item):
+            i, (file_path, file_name) = item
             print(f"📤 [{i}/{len(parquet_files)}] Processando: {file_name}")
-            
-            try:
-                result = self.upload_parquet(bucket_name, file_path)
-                if result:
-                    successful_uploads += 1
-                    successful_files.append(file_name)
-                    print(f"   ✅ {file_name} - Upload realizado com sucesso")
-                else:
-                    failed_uploads += 1
-                    failed_files.append(file_name)
-                    print(f"   ❌ {file_name} - Falha no upload")
-            except Exception as e:
-                failed_uploads += 1
-                failed_files.append(file_name)
-                print(f"   ❌ {file_name} - Erro: {str(e)}")
-            
-            print()  # Empty line for readability
+            return self._upload_directory_file(
+                bucket_name, file_path, file_name, manifest_target, skip_unchanged, timings
+            )
+        
+        # Process files with a bounded worker pool (results keep the file order)
+        items = list(enumerate(zip(parquet_files, file_names), 1))
+        workers = max(1, min(max_workers, len(items)))
+        if workers > 1:
+            print(f"🔀 Upload paralelo com {workers} workers")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                statuses = list(executor.map(upload_one, items))
+        else:
+            statuses = [upload_one(item) for item in items]
+        print()  # Empty line for readability
+        
+        successful_files = [
+            name for name, status in zip(file_names, statuses) if status == "success"
+        ]
+        failed_files = [
+            name for name, status in zip(file_names, statuses) if status == "failed"
+        ]
+        skipped_files = [
+            name for name, status in zip(file_names, statuses) if status == "skipped"
+        ]
+        successful_uploads = len(successful_files)
+        failed_uploads = len(failed_files)
         
         # Print summary
         print("=" * 60)
@@ -229,6 +396,7 @@ class SupabaseUploader:
         print(f"📁 Total de arquivos: {len(parquet_files)}")
         print(f"✅ Uploads bem-sucedidos: {successful_uploads}")
         print(f"❌ Uploads com falha: {failed_uploads}")
+        print(f"⏭️  Sem alteração: {len(skipped_files)}")
         
         if successful_files:
             print(f"\n✅ Arquivos enviados com sucesso:")
@@ -244,11 +412,17 @@ class SupabaseUploader:
             "total_files": len(parquet_files),
             "successful_uploads": successful_uploads,
             "failed_uploads": failed_uploads,
+            "skipped_uploads": len(skipped_files),
             "successful_files": successful_files,
-            "failed_files": failed_files
+            "failed_files": failed_files,
+            "skipped_files": skipped_files,
+            "timings": {name: timings[name] for name in file_names if name in timings}
         }
     
-    def download_directory_parquet(self, bucket_name: str, local_directory: str, file_filter: str = "*") -> dict:
+    def download_directory_parquet(self, bucket_name: str, local_directory: str,
+                                   file_filter: str = "*", max_workers: int = 4,
+                                   skip_existing: bool = True,
+                                   return_dataframes: bool = False) -> dict:
         """
         Download all Parquet files from a Supabase storage bucket to a local directory.
         
@@ -256,24 +430,31 @@ class SupabaseUploader:
             bucket_name: Name of the Supabase storage bucket
             local_directory: Local directory to save downloaded files
             file_filter: Filter pattern for files (default: "*" for all files)
+            max_workers: Maximum number of concurrent downloads (1 = sequential)
+            skip_existing: Skip files whose local copy matches the remote size/eTag
+            return_dataframes: Parse the files and return them under "dataframes"
             
         Returns:
             dict: Summary with success count, failure count, and details
         """
+        empty_result = {
+            "total_files": 0,
+            "successful_downloads": 0,
+            "failed_downloads": 0,
+            "skipped_downloads": 0,
+            "successful_files": [],
+            "failed_files": [],
+            "skipped_files": [],
+            "local_directory": local_directory
+        }
+        
         try:
             # List all files in the bucket
             files_in_bucket = self.list_files(bucket_name)
             
             if not files_in_bucket:
                 print(f"❌ Nenhum arquivo encontrado no bucket {bucket_name}")
-                return {
-                    "total_files": 0,
-                    "successful_downloads": 0,
-                    "failed_downloads": 0,
-                    "successful_files": [],
-                    "failed_files": [],
-                    "local_directory": local_directory
-                }
+                return empty_result
             
             # Filter files if needed
             if file_filter != "*":
@@ -282,14 +463,7 @@ class SupabaseUploader:
             
             if not files_in_bucket:
                 print(f"❌ Nenhum arquivo correspondente ao filtro '{file_filter}' encontrado no bucket {bucket_name}")
-                return {
-                    "total_files": 0,
-                    "successful_downloads": 0,
-                    "failed_downloads": 0,
-                    "successful_files": [],
-                    "failed_files": [],
-                    "local_directory": local_directory
-                }
+                return empty_result
             
             print(f"📁 Encontrados {len(files_in_bucket)} arquivo(s) no bucket {bucket_name}")
             print(f"📂 Diretório local: {local_directory}")
@@ -298,39 +472,47 @@ class SupabaseUploader:
             # Create local directory if it doesn't exist
             os.makedirs(local_directory, exist_ok=True)
             
-            # Initialize counters
-            successful_downloads = 0
-            failed_downloads = 0
-            successful_files = []
-            failed_files = []
-            
-            # Process each file
-            for i, file_info in enumerate(files_in_bucket, 1):
+            def download_one(item):
+                i, file_info = item
                 file_name = file_info.get('name', '')
-                print(f"📥 [{i}/{len(files_in_bucket)}] Baixando: {file_name}")
+                local_file_path = os.path.join(local_directory, file_name)
                 
                 try:
-                    # Construct local file path
-                    local_file_path = os.path.join(local_directory, file_name)
+                    if skip_existing and self._is_local_copy_current(file_info, local_file_path):
+                        print(f"   ⏭️  {file_name} - Cópia local já atualizada")
+                        return "skipped"
                     
-                    # Download file
-                    df = self.download_parquet(bucket_name, file_name, local_file_path)
-                    
-                    if df is not None:
-                        successful_downloads += 1
-                        successful_files.append(file_name)
-                        print(f"   ✅ {file_name} - Download realizado com sucesso")
-                    else:
-                        failed_downloads += 1
-                        failed_files.append(file_name)
-                        print(f"   ❌ {file_name} - Falha no download")
-                        
+                    print(f"📥 [{i}/{len(files_in_bucket)}] Baixando: {file_name}")
+                    self._download_file(bucket_name, file_name, local_file_path)
+                    print(f"   ✅ {file_name} - Download realizado com sucesso")
+                    return "success"
                 except Exception as e:
-                    failed_downloads += 1
-                    failed_files.append(file_name)
                     print(f"   ❌ {file_name} - Erro: {str(e)}")
-                
-                print()  # Empty line for readability
+                    return "failed"
+            
+            # Process files with a bounded worker pool (results keep the listing order)
+            items = list(enumerate(files_in_bucket, 1))
+            workers = max(1, min(max_workers, len(items)))
+            if workers > 1:
+                print(f"🔀 Download paralelo com {workers} workers")
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    statuses = list(executor.map(download_one, items))
+            else:
+                statuses = [download_one(item) for item in items]
+            print()  # Empty line for readability
+            
+            file_names = [file_info.get('name', '') for file_info in files_in_bucket]
+            successful_files = [
+                name for name, status in zip(file_names, statuses) if status == "success"
+            ]
+            failed_files = [
+                name for name, status in zip(file_names, statuses) if status == "failed"
+            ]
+            skipped_files = [
+                name for name, status in zip(file_names, statuses) if status == "skipped"
+            ]
+            successful_downloads = len(successful_files)
+            failed_downloads = len(failed_files)
             
             # Print summary
             print("=" * 60)
@@ -339,6 +521,7 @@ class SupabaseUploader:
             print(f"📁 Total de arquivos: {len(files_in_bucket)}")
             print(f"✅ Downloads bem-sucedidos: {successful_downloads}")
             print(f"❌ Downloads com falha: {failed_downloads}")
+            print(f"⏭️  Já atualizados: {len(skipped_files)}")
             print(f"📂 Diretório local: {local_directory}")
             
             if successful_files:
@@ -351,27 +534,29 @@ class SupabaseUploader:
                 for file_name in failed_files:
                     print(f"   • {file_name}")
             
-            return {
+            result = {
                 "total_files": len(files_in_bucket),
                 "successful_downloads": successful_downloads,
                 "failed_downloads": failed_downloads,
+                "skipped_downloads": len(skipped_files),
                 "successful_files": successful_files,
                 "failed_files": failed_files,
+                "skipped_files": skipped_files,
                 "local_directory": local_directory
             }
             
+            # Parse only when the caller asks for DataFrames
+            if return_dataframes:
+                result["dataframes"] = {
+                    file_name: pd.read_parquet(os.path.join(local_directory, file_name))
+                    for file_name in successful_files + skipped_files
+                }
+            
+            return result
+            
         except Exception as e:
             print(f"❌ Erro durante o download em lote: {str(e)}")
-            return {
-                "total_files": 0,
-                "successful_downloads": 0,
-                "failed_downloads": 0,
-                "successful_files": [],
-                "failed_files": [],
-                "local_directory": local_directory,
-                "error": str(e)
-            }
-
+            return {**empty_result, "error": str(e)}
 
 
 def show_menu():
@@ -0,0 +1,77 @@
+"""
+Armazenamento de Watermarks para Extração Incremental
+Guarda, por database e query, o último valor extraído (ex.: última Data de vendas)
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from utils.state_files import JsonStateStore
+
+
+class WatermarkStore(JsonStateStore):
+    """Persistência simples em JSON dos watermarks por database/query."""
+
+    label = "watermarks"
+
+    def __init__(self, state_file: str = "state/watermarks.json"):
+        super().__init__(state_file)
+
+    def get(self, database: str, query_name: str, output: Optional[str] = None) -> Optional[str]:
+        """
+        Retorna o watermark registrado para database/query.
+
+        Args:
+            database: Nome do database
+            query_name: Nome da query
+            output: Caminho de saída; se informado, o watermark só é válido
+                    quando foi registrado para o mesmo arquivo
+
+        Returns:
+            Valor do watermark (ISO string) ou None
+        """
+        with self._lock:
+            entry = self._read().get(database, {}).get(query_name)
+
+        if not entry:
+            return None
+        if output is not None and entry.get("output") != output:
+            return None
+        return entry.get("value")
+
+    def set(self, database: str, query_name: str, value: str, output: Optional[str] = None):
+        """Registra o watermark de database/query."""
+        with self._lock:
+            state = self._read()
+            state.setdefault(database, {})[query_name] = {
+                "value": value,
+                "output": output,
+                "updated_at": datetime.now().isoformat()
+            }
+            self._write(state)
+
+    def mark_partial(self, database: str, query_name: str, output: Optional[str] = None):
+        """
+        Marca o arquivo de database/query como parcial (gravado por uma execução filtrada).
+
+        Remove o watermark: a próxima execução normal deve ser completa, sem usar
+        nem o watermark nem o máximo do próprio arquivo.
+        """
+        with self._lock:
+            state = self._read()
+            state.setdefault(database, {})[query_name] = {
+                "value": None,
+                "output": output,
+                "partial": True,
+                "updated_at": datetime.now().isoformat()
+            }
+            self._write(state)
+
+    def is_partial(self, database: str, query_name: str, output: Optional[str] = None) -> bool:
+        """Verifica se o arquivo de database/query foi marcado como parcial."""
+        with self._lock:
+            entry = self._read().get(database, {}).get(query_name)
+
+        if not entry or (output is not None and entry.get("output") != output):
+            return False
+        return bool(entry.get("partial"))